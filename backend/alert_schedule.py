@@ -0,0 +1,202 @@
+"""
+Materialized alert schedule.
+
+Each subscription carries `next_alert_at` (the date its next reminder is due)
+and `next_alert_offset` (days-before-renewal that reminder represents), so the
+scheduler only has to do an indexed range scan `next_alert_at <= today`
+instead of re-deriving due dates from the offsets on every run.
+
+Offsets live in the alert_offsets table. A subscription with
+custom_alert_offsets set uses its own rows (none means no reminders);
+otherwise its owner's default rows if the owner has custom_alert_offsets set;
+otherwise the ALERT_OFFSETS setting. effective_offsets() resolves all three in
+one UNION ALL, so rescheduling a chunk is a single query however many
+different offset lists its subscriptions use.
+
+The columns are kept up to date by crud (subscription writes and offset
+changes) and the reminder sweep. After changing ALERT_OFFSETS, recompute every
+row with:
+
+    python -m backend.alert_schedule
+"""
+from datetime import datetime, timedelta
+import logging
+import os
+
+from sqlalchemy import select, update, bindparam, literal, union_all, and_, true, Integer
+
+from .models import Subscription, User, AlertOffset
+
+# Default alert offsets (days before renewal) for users who haven't chosen their own —
+# adjustable via ENV var ALERT_OFFSETS as CSV
+# Common schedule: 30 (1 month), 25, 20, 10 days before renewal
+DEFAULT_ALERT_OFFSETS = [30, 25, 20, 10]
+
+# Largest offset a user may choose
+MAX_ALERT_OFFSET = 365
+
+RECOMPUTE_BATCH_SIZE = 1000
+
+
+def get_alert_offsets():
+    raw = os.getenv("ALERT_OFFSETS")
+    if not raw:
+        return DEFAULT_ALERT_OFFSETS
+    try:
+        parts = [int(x.strip()) for x in raw.split(",") if x.strip()]
+        return sorted(set(parts), reverse=True)
+    except Exception:
+        logging.getLogger(__name__).warning("Invalid ALERT_OFFSETS=%r, using defaults", raw)
+        return DEFAULT_ALERT_OFFSETS
+
+
+def literal_table(name, rows, columns):
+    """Build an inline derived table (e.g. the list of channels) from python values.
+
+    Rendered as a UNION ALL of literal SELECTs so it works on SQLite and Postgres alike.
+    """
+    selects = [
+        select(*[literal(value, type_).label(col) for value, (col, type_) in zip(row, columns)])
+        for row in rows
+    ]
+    if len(selects) == 1:
+        return selects[0].subquery(name)
+    return union_all(*selects).subquery(name)
+
+
+def effective_offsets(*criteria):
+    """SELECT (subscription_id, offset) for every alert offset that applies to the matching subscriptions.
+
+    `criteria` filter Subscription (and may refer to User). A subscription
+    with no row in the result gets no reminders.
+    """
+    own = (
+        select(Subscription.id.label("subscription_id"), AlertOffset.offset)
+        .join(AlertOffset, AlertOffset.subscription_id == Subscription.id)
+        .where(Subscription.custom_alert_offsets, *criteria)
+    )
+    owners_default = (
+        select(Subscription.id, AlertOffset.offset)
+        .join(User, User.id == Subscription.user_id)
+        .join(AlertOffset, and_(AlertOffset.user_id == User.id, AlertOffset.subscription_id.is_(None)))
+        .where(~Subscription.custom_alert_offsets, User.custom_alert_offsets, *criteria)
+    )
+    parts = [own, owners_default]
+    defaults = get_alert_offsets()
+    if defaults:
+        default_table = literal_table("default_offsets", [(offset,) for offset in defaults], [("offset", Integer)])
+        parts.append(
+            select(Subscription.id, default_table.c.offset)
+            .join(User, User.id == Subscription.user_id)
+            .join(default_table, true())
+            .where(~Subscription.custom_alert_offsets, ~User.custom_alert_offsets, *criteria)
+        )
+    return union_all(*parts)
+
+
+def get_user_offsets(db, user_id):
+    """The user's default offsets, largest first: their own if they set any, else ALERT_OFFSETS."""
+    if not db.scalar(select(User.custom_alert_offsets).where(User.id == user_id)):
+        return get_alert_offsets()
+    return sorted(db.scalars(select(AlertOffset.offset).where(AlertOffset.user_id == user_id,
+                                                              AlertOffset.subscription_id.is_(None))),
+                  reverse=True)
+
+
+def compute_next_alert(renewal_date, offsets=None, today=None):
+    """Return (alert_date, offset) of the first alert on or after `today`, or (None, None)."""
+    today = today or datetime.utcnow().date()
+    offsets = get_alert_offsets() if offsets is None else offsets
+    for offset in sorted(offsets, reverse=True):
+        alert_date = renewal_date - timedelta(days=offset)
+        if alert_date >= today:
+            return alert_date, offset
+    return None, None
+
+
+def schedule_subscription(sub, offsets=None, today=None):
+    """Set next_alert_at/next_alert_offset on a Subscription instance (caller commits).
+
+    `offsets` are the ones that apply to it (see effective_offsets); default ALERT_OFFSETS.
+    """
+    sub.next_alert_at, sub.next_alert_offset = compute_next_alert(sub.renewal_date, offsets, today)
+    return sub
+
+
+_bulk_update = (
+    update(Subscription)
+    .where(Subscription.id == bindparam("sid"))
+    .values(next_alert_at=bindparam("next_at"), next_alert_offset=bindparam("next_offset"))
+)
+
+
+def shard_clause(shard, shards):
+    """Filter selecting one of `shards` disjoint slices of subscriptions (by id modulo)."""
+    if shard is None or shards <= 1:
+        return true()
+    return Subscription.id % shards == shard
+
+
+def _write_schedule(db, rows, today):
+    """Reschedule (id, renewal_date) rows, fetching all their offsets in one query."""
+    if not rows:
+        return
+    offsets = {sid: [] for sid, _ in rows}
+    for sid, offset in db.execute(effective_offsets(Subscription.id.in_(list(offsets)))):
+        offsets[sid].append(offset)
+    params = []
+    for sid, renewal_date in rows:
+        next_at, next_offset = compute_next_alert(renewal_date, offsets[sid], today)
+        params.append({"sid": sid, "next_at": next_at, "next_offset": next_offset})
+    db.connection().execute(_bulk_update, params)
+
+
+def _reschedule(db, today, *criteria):
+    """Recompute the schedule (as of `today`) of every subscription matching `criteria`, in id-keyset chunks."""
+    last_id, total = 0, 0
+    while True:
+        rows = db.execute(
+            select(Subscription.id, Subscription.renewal_date)
+            .where(Subscription.id > last_id, *criteria)
+            .order_by(Subscription.id)
+            .limit(RECOMPUTE_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        _write_schedule(db, rows, today)
+        db.commit()
+        total += len(rows)
+        last_id = rows[-1][0]
+    return total
+
+
+def advance_schedule(db, today=None, shard=None, shards=1):
+    """Move every subscription whose alert came due on or before `today` to its following alert.
+
+    Called by the sweep once the due alerts have been queued. Works through
+    RECOMPUTE_BATCH_SIZE rows at a time, so memory doesn't grow with the
+    number of due subscriptions. Returns the number of rows moved.
+    """
+    today = today or datetime.utcnow().date()
+    return _reschedule(db, today + timedelta(days=1), Subscription.next_alert_at <= today, shard_clause(shard, shards))
+
+
+def reschedule_user(db, user_id, today=None):
+    """Recompute the schedule of all of a user's subscriptions, e.g. after their default offsets changed."""
+    return _reschedule(db, today or datetime.utcnow().date(), Subscription.user_id == user_id)
+
+
+def recompute_all(db, today=None):
+    """Rebuild the schedule for every subscription, e.g. after ALERT_OFFSETS changed."""
+    return _reschedule(db, today or datetime.utcnow().date())
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        count = recompute_all(session)
+        print(f"✅ Recomputed alert schedule for {count} subscription(s) (default offsets {get_alert_offsets()})")
+    finally:
+        session.close()
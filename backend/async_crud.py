@@ -0,0 +1,92 @@
+"""
+Async versions of the crud functions, used by the API routes.
+
+Each one runs the matching crud.py function on the AsyncSession's connection
+via run_sync, so the query logic lives in one place while the database I/O is
+awaited (aiosqlite / asyncpg) instead of blocking a threadpool thread.
+Password hashing is CPU-bound and runs on the bounded pool in password_hasher.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+
+from . import crud, models
+from .password_hasher import get_password_hasher
+
+
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.get(models.User, user_id)
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.run_sync(crud.get_user_by_email, email)
+
+async def create_user(db: AsyncSession, email: str, password: str, phone: str = None):
+    hashed = await get_password_hasher().hash(password)
+    return await db.run_sync(crud.create_user, email, password, phone, hashed_password=hashed)
+
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    user = await get_user_by_email(db, email)
+    if not user: return None
+    valid, new_hash = await get_password_hasher().verify_and_update(password, user.hashed_password)
+    if not valid: return None
+    if new_hash:
+        # Stored hash predates the current Argon2 parameters
+        user.hashed_password = new_hash
+        await db.commit()
+    return user
+
+async def update_user(db: AsyncSession, user: models.User, **fields):
+    for name, value in fields.items():
+        if value is not None:
+            setattr(user, name, value)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+async def get_user_alert_offsets(db: AsyncSession, user_id: int):
+    return await db.run_sync(crud.get_user_alert_offsets, user_id)
+
+async def set_user_alert_offsets(db: AsyncSession, user_id: int, offsets: list):
+    return await db.run_sync(crud.set_user_alert_offsets, user_id, offsets)
+
+async def create_subscription(db: AsyncSession, user_id: int, name: str, renewal_date: date, note: str = None, start_date: date = None,
+                              alert_offsets: list = None):
+    return await db.run_sync(crud.create_subscription, user_id, name, renewal_date, note, start_date, alert_offsets)
+
+async def get_subscriptions_for_user(db: AsyncSession, user_id: int):
+    return await db.run_sync(crud.get_subscriptions_for_user, user_id)
+
+async def list_subscriptions_page(db: AsyncSession, user_id: int, **kwargs):
+    return await db.run_sync(crud.list_subscriptions_page, user_id, **kwargs)
+
+async def get_subscriptions_version(db: AsyncSession, user_id: int):
+    """The user's list version, always read from the database.
+
+    Never cached: with a per-process cache, another worker's write would go
+    unseen (stale lists, wrong 304s) until the entry expired.
+    """
+    return await db.run_sync(crud.get_subscriptions_version, user_id)
+
+async def get_subscription(db: AsyncSession, subscription_id: int):
+    return await db.run_sync(crud.get_subscription, subscription_id)
+
+async def update_subscription(db: AsyncSession, subscription_id: int, name: str, renewal_date: date, note: str = None, start_date: date = None,
+                              alert_offsets=crud.KEEP_OFFSETS):
+    return await db.run_sync(crud.update_subscription, subscription_id, name, renewal_date, note, start_date, alert_offsets)
+
+async def delete_all_subscriptions_for_user(db: AsyncSession, user_id: int):
+    return await db.run_sync(crud.delete_all_subscriptions_for_user, user_id)
+
+async def delete_subscription(db: AsyncSession, subscription_id: int):
+    return await db.run_sync(crud.delete_subscription, subscription_id)
+
+async def get_subscription_owners(db: AsyncSession, subscription_ids: list):
+    return await db.run_sync(crud.get_subscription_owners, subscription_ids)
+
+async def create_subscriptions(db: AsyncSession, user_id: int, items: list):
+    return await db.run_sync(crud.create_subscriptions, user_id, items)
+
+async def update_subscriptions(db: AsyncSession, user_id: int, items: list):
+    return await db.run_sync(crud.update_subscriptions, user_id, items)
+
+async def delete_subscriptions(db: AsyncSession, user_id: int, subscription_ids: list):
+    return await db.run_sync(crud.delete_subscriptions, user_id, subscription_ids)
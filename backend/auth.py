@@ -1,24 +1,105 @@
-
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
+from collections import namedtuple
 from jose import jwt
+import hashlib
 import os
 
-# Use argon2 instead of bcrypt to avoid compatibility issues
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+from .ttl_cache import TTLCache
+from .cache import get_cache, principal_key, profile_key
+
 SECRET_KEY = os.getenv("SECRET_KEY", "change_me_to_a_random_secret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60*24*7
 
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+def _argon2_settings():
+    """Argon2 cost parameters from ARGON2_TIME_COST / ARGON2_MEMORY_COST (KiB) / ARGON2_PARALLELISM.
+
+    Unset values keep passlib's defaults. Hashes made with other parameters
+    still verify and are rewritten on the user's next login.
+    """
+    settings = {}
+    for env, key in (("ARGON2_TIME_COST", "argon2__time_cost"),
+                     ("ARGON2_MEMORY_COST", "argon2__memory_cost"),
+                     ("ARGON2_PARALLELISM", "argon2__parallelism")):
+        value = _env_int(env, 0)
+        if value > 0:
+            settings[key] = value
+    return settings
+
+# Use argon2 instead of bcrypt to avoid compatibility issues
+pwd_context = CryptContext(schemes=["argon2"], deprecated="auto", **_argon2_settings())
+
+# Verified token payloads, keyed by token digest — AUTH_TOKEN_CACHE_SIZE=0 disables
+_token_cache = TTLCache(_env_int("AUTH_TOKEN_CACHE_SIZE", 10000), _env_int("AUTH_TOKEN_CACHE_TTL", 300))
+
+# What the API needs to know about the caller, kept in the read cache (cache.py)
+# so hot endpoints skip the users lookup. With the in-process backend, other
+# processes see profile changes once AUTH_PRINCIPAL_CACHE_TTL seconds have passed.
+Principal = namedtuple("Principal", ["id", "email", "phone", "email_alerts_enabled", "email_digest_enabled",
+                                     "timezone", "send_window_start", "send_window_end",
+                                     "whatsapp_alerts_enabled", "sms_alerts_enabled", "webhook_url"])
+PRINCIPAL_CACHE_TTL = _env_int("AUTH_PRINCIPAL_CACHE_TTL", 60)
+
 def hash_password(password: str):
     return pwd_context.hash(password)
 
 def verify_password(plain, hashed):
     return pwd_context.verify(plain, hashed)
 
+def verify_and_update_password(plain, hashed):
+    """Return (valid, new_hash); new_hash is set when `hashed` uses outdated parameters."""
+    return pwd_context.verify_and_update(plain, hashed)
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     encoded = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded
+
+def decode_access_token(token: str):
+    """Verify a JWT and return its payload. Raises jose's JWTError / ExpiredSignatureError.
+
+    Verified payloads are cached by the token's SHA-256 digest (never the raw
+    token) until the earlier of the cache TTL and the token's own `exp`.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = _token_cache.get(key)
+    if payload is not None:
+        return payload
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    _token_cache.set(key, payload, expires_at=payload.get("exp"))
+    return payload
+
+def get_cached_principal(user_id: int):
+    fields = get_cache().get(principal_key(user_id))
+    # Entries written before Principal gained fields are treated as misses
+    return Principal(*fields) if fields and len(fields) == len(Principal._fields) else None
+
+def cache_principal(user):
+    principal = Principal(*(getattr(user, name) for name in Principal._fields))
+    get_cache().set(principal_key(user.id), list(principal), PRINCIPAL_CACHE_TTL)
+    return principal
+
+def get_cached_profile(user_id: int):
+    return get_cache().get(profile_key(user_id))
+
+def cache_profile(user_id: int, profile: dict):
+    """Cache a user's profile payload (their principal plus alert offsets) alongside the principal."""
+    get_cache().set(profile_key(user_id), profile, PRINCIPAL_CACHE_TTL)
+    return profile
+
+def invalidate_user(user_id: int):
+    """Drop cached state for a user; call after any change to their row or their alert offsets."""
+    get_cache().delete(principal_key(user_id))
+    get_cache().delete(profile_key(user_id))
+
+def cache_stats():
+    return {"tokens": _token_cache.stats}
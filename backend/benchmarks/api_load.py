@@ -0,0 +1,83 @@
+"""
+Load test: API throughput as client concurrency grows.
+
+Starts the FastAPI app in-process on a temporary SQLite database (through
+httpx's ASGI transport, no network), registers a user, seeds subscriptions,
+then for each concurrency level fires GET /subscription/list requests from
+that many concurrent clients, mixed with POST /subscription/add.
+Requires httpx (pip install httpx).
+
+Run from the project root:
+    python -m backend.benchmarks.api_load [requests_per_level]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+LEVELS = [1, 8, 32, 128]
+
+
+async def _level(client, headers, writer_headers, concurrency, total):
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker():
+        while not queue.empty():
+            i = queue.get_nowait()
+            started = time.perf_counter()
+            if i % 10 == 0:
+                # writes go to a second account so the listed set stays the same size
+                r = await client.post("/subscription/add", headers=writer_headers,
+                                      json={"name": f"load{i}", "renewal_date": "2026-12-01"})
+            else:
+                r = await client.get("/subscription/list", headers=headers)
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"concurrency={concurrency:>4}: {total / elapsed:8.0f} req/s  "
+          f"p50={statistics.median(latencies) * 1000:7.2f}ms  p99={p99 * 1000:7.2f}ms")
+
+
+async def _account(client, email):
+    creds = {"email": email, "password": "load-test-password"}
+    (await client.post("/auth/register", json=creds)).raise_for_status()
+    login = (await client.post("/auth/login", json=creds)).json()
+    return {"Authorization": f"Bearer {login['access_token']}"}
+
+
+async def run(total):
+    import httpx
+    from backend.main import app
+    from backend.migrate import run_migrations
+
+    run_migrations()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers, writer_headers = [await _account(client, email) for email in ("load@example.com", "writer@example.com")]
+        for i in range(50):
+            await client.post("/subscription/add", headers=headers,
+                              json={"name": f"seed{i}", "renewal_date": "2026-11-01"})
+        for concurrency in LEVELS:
+            await _level(client, headers, writer_headers, concurrency, total)
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before backend.database is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'load.db')}"
+        asyncio.run(run(total))
+
+
+if __name__ == "__main__":
+    main()
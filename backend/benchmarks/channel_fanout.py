@@ -0,0 +1,160 @@
+"""
+Benchmark: one sweep fanned out to email, WhatsApp, SMS and webhooks against a local stub.
+
+A ThreadingHTTPServer on localhost stands in for SendGrid, the WhatsApp Cloud
+API, an SMS gateway and the users' webhook endpoints, answering every request
+after --latency milliseconds. The datagen dataset is given SMS for every
+other phone user and a webhook for every fourth user; one sweep queues the
+due alerts for all four channels and drain_outbox sends them, each channel
+on its own pool. The stub's request log is then checked against the outbox:
+every message sent arrived exactly once, on the right path, and every webhook
+body carries a valid signature.
+
+Compare `--concurrency 1` (one call in flight per channel) with the default
+per-channel limits to see the fan-out at work.
+
+Run from the project root:
+    python -m backend.benchmarks.channel_fanout [--subscriptions 20000] [--latency 20] [--concurrency N]
+"""
+import argparse
+import contextlib
+import hashlib
+import hmac
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WEBHOOK_SECRET = "bench-secret"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Records every POST as (path, headers, JSON body) and answers like the real APIs do."""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.requests.append((self.path, dict(self.headers), body))
+        self.send_response(202 if self.path == "/sendgrid" else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    # Every channel connects at once; the default backlog of 5 would stall connects for a second
+    request_queue_size = 128
+
+
+def start_stub(latency):
+    server = StubServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.lock = threading.Lock()
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def configure(base):
+    os.environ.update({
+        "EMAIL_PROVIDERS": "sendgrid",
+        "SENDGRID_API_KEY": "SG.bench", "SENDGRID_FROM_EMAIL": "bench@example.com",
+        "SENDGRID_API_URL": f"{base}/sendgrid",
+        "WHATSAPP_API_URL": f"{base}/whatsapp", "WHATSAPP_API_KEY": "bench",
+        "SMS_API_URL": f"{base}/sms", "SMS_FROM": "+15550100",
+        "WEBHOOK_SECRET": WEBHOOK_SECRET,
+        # Webhooks are opt-in, and the stub is a plain-http loopback address
+        "ALERT_CHANNELS": "email,whatsapp,sms,webhook", "WEBHOOK_ALLOW_LOOPBACK": "1",
+        # Queue alerts as sendable now rather than in the users' delivery windows
+        "DEFAULT_SEND_WINDOW": "none",
+    })
+
+
+def check(requests, sent):
+    """Compare what the stub received with the messages sent per channel; returns a list of problems."""
+    received = Counter()
+    problems = []
+    for path, headers, body in requests:
+        payload = json.loads(body)
+        if path == "/sendgrid":
+            received["email"] += len(payload["personalizations"])
+        elif path.startswith("/webhook/"):
+            received["webhook"] += 1
+            expected = "sha256=" + hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+            if headers.get("X-Signature") != expected:
+                problems.append(f"bad signature on {path}")
+        else:
+            received[path.lstrip("/")] += 1
+    for channel in set(sent) | set(received):
+        if sent.get(channel, 0) != received.get(channel, 0):
+            problems.append(f"{channel}: {sent.get(channel, 0)} sent, {received.get(channel, 0)} received")
+    return problems
+
+
+def run(args, tmp):
+    # Must be set before backend.database is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'fanout.db')}"
+    from sqlalchemy import func, select, update, String
+    from backend.migrate import run_migrations
+    from backend.database import SessionLocal
+    from backend.models import User, Outbox
+    from backend.channels import CHANNELS
+    from backend import reminder_job, outbox_worker
+    from backend.benchmarks import datagen
+
+    stub = start_stub(args.latency / 1000)
+    base = f"http://127.0.0.1:{stub.server_address[1]}"
+    configure(base)
+
+    run_migrations()
+    db = SessionLocal()
+    datagen.generate(db, args.subscriptions)
+    db.execute(update(User).where(User.phone.isnot(None), User.id % 2 == 0).values(sms_alerts_enabled=True))
+    db.execute(update(User).where(User.id % 4 == 0)
+               .values(webhook_url=f"{base}/webhook/" + func.cast(User.id, String)))
+    db.commit()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        sweep = reminder_job.check_expiring_subscriptions(db=db, today=datagen.TODAY)
+    started = time.perf_counter()
+    summary = outbox_worker.drain_outbox(db=db, concurrency=args.concurrency)
+    elapsed = time.perf_counter() - started
+    # A digest's rows went out as one message
+    message = func.coalesce(Outbox.digest_key, func.cast(Outbox.id, String))
+    sent = dict(db.execute(select(Outbox.channel, func.count(message.distinct())).where(Outbox.status == "sent")
+                           .group_by(Outbox.channel)).all())
+    db.close()
+    stub.shutdown()
+
+    print(f"{args.subscriptions:,} subscriptions, {sweep['due']:,} due, {args.latency} ms stub latency")
+    print(f"{'channel':<10} {'messages':>8} {'concurrency':>12} {'batch':>6}")
+    for name, channel in CHANNELS.items():
+        print(f"{name:<10} {sent.get(name, 0):>8,} {args.concurrency or channel.concurrency:>12} "
+              f"{channel.batch_size():>6}")
+    print(f"drained {summary} in {elapsed:.2f}s, {len(stub.requests):,} requests")
+    problems = check(stub.requests, sent)
+    print("stub check: " + ("OK" if not problems else "; ".join(problems)))
+    return not problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-channel fan-out against a local HTTP stub")
+    parser.add_argument("--subscriptions", type=int, default=20_000)
+    parser.add_argument("--latency", type=float, default=20, help="stub response delay in milliseconds")
+    parser.add_argument("--concurrency", type=int, help="calls in flight per channel (default: each channel's own)")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        if not run(args, tmp):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
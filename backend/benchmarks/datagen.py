@@ -0,0 +1,120 @@
+"""
+Seeded synthetic dataset for benchmarks: users, subscriptions and alert_logs.
+
+The same seed and scale always produce the same rows. Rows are written in
+chunks with executemany, so 10M subscriptions need no more memory than 10k.
+
+Shape of the data:
+    - one user per USERS_PER_SUB subscriptions, a third with a phone number,
+      every user's password is PASSWORD (hashed once)
+    - every fifth user with their own default alert offsets (USER_OFFSETS), and
+      a `custom_share` of subscriptions with their own (one of SUBSCRIPTION_OFFSETS,
+      including none); the rest use ALERT_OFFSETS
+    - renewal dates spread uniformly over the year after `today`, with a
+      `due_share` of subscriptions landing exactly on an alert offset so the
+      sweep has work to do
+    - alert_logs for a `logged_share` of subscriptions, as if an earlier
+      (larger) offset had already been sent
+
+Run from the project root (the schema is migrated first):
+    python -m backend.benchmarks.datagen --subscriptions 100000 [--seed 42] [--database-url URL]
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+USERS_PER_SUB = 10
+PASSWORD = "benchmark-password"
+TODAY = date(2026, 1, 1)
+CHUNK = 10_000
+USER_OFFSETS = [7, 3, 1]
+SUBSCRIPTION_OFFSETS = [[1], [3, 1], [14, 7, 3, 1], []]
+
+
+def generate(session, subscriptions, seed=42, today=TODAY, due_share=0.05, logged_share=0.2, custom_share=0.1,
+             chunk=CHUNK):
+    """Fill an empty, migrated database. Returns row counts per table."""
+    from backend.models import User, Subscription, AlertLog, AlertOffset
+    from backend.alert_schedule import get_alert_offsets, compute_next_alert
+    from backend.auth import hash_password
+
+    rng = random.Random(seed)
+    offsets = get_alert_offsets()
+    hashed = hash_password(PASSWORD)
+    n_users = max(1, subscriptions // USERS_PER_SUB)
+    counts = {"users": n_users, "subscriptions": subscriptions, "alert_logs": 0, "alert_offsets": 0}
+
+    for start in range(0, n_users, chunk):
+        session.execute(insert(User).execution_options(render_nulls=True), [
+            {"id": i + 1, "email": f"user{i}@example.com", "hashed_password": hashed,
+             "phone": f"+1555{i:07d}" if i % 3 == 0 else None,
+             "email_alerts_enabled": True, "email_digest_enabled": i % 7 == 0, "custom_alert_offsets": i % 5 == 0}
+            for i in range(start, min(start + chunk, n_users))
+        ])
+        defaults = [{"user_id": i + 1, "offset": offset}
+                    for i in range(start, min(start + chunk, n_users)) if i % 5 == 0 for offset in USER_OFFSETS]
+        if defaults:
+            session.execute(insert(AlertOffset), defaults)
+        counts["alert_offsets"] += len(defaults)
+        session.commit()
+
+    for start in range(0, subscriptions, chunk):
+        subs, logs, own = [], [], []
+        for i in range(start, min(start + chunk, subscriptions)):
+            user_index = rng.randrange(n_users)
+            custom = rng.random() < custom_share
+            if custom:
+                sub_offsets = rng.choice(SUBSCRIPTION_OFFSETS)
+                own.extend({"user_id": user_index + 1, "subscription_id": i + 1, "offset": o} for o in sub_offsets)
+            else:
+                sub_offsets = USER_OFFSETS if user_index % 5 == 0 else offsets
+            if sub_offsets and rng.random() < due_share:
+                days = rng.choice(sub_offsets)
+            else:
+                days = rng.randint(1, 365)
+            renewal_date = today + timedelta(days=days)
+            next_at, next_offset = compute_next_alert(renewal_date, sub_offsets, today)
+            subs.append({"id": i + 1, "name": f"Subscription {i}", "renewal_date": renewal_date,
+                         "note": None if i % 4 else f"plan {i % 5}", "user_id": user_index + 1,
+                         "next_alert_at": next_at, "next_alert_offset": next_offset, "custom_alert_offsets": custom})
+            earlier = [o for o in sub_offsets if o > days]
+            if earlier and rng.random() < logged_share:
+                logs.append({"subscription_id": i + 1, "offset": rng.choice(earlier), "channel": "email"})
+        session.execute(insert(Subscription).execution_options(render_nulls=True), subs)
+        if logs:
+            session.execute(insert(AlertLog), logs)
+        if own:
+            session.execute(insert(AlertOffset), own)
+        counts["alert_logs"] += len(logs)
+        counts["alert_offsets"] += len(own)
+        session.commit()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--subscriptions", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", help="defaults to DATABASE_URL / backend/subscriptions.db")
+    args = parser.parse_args()
+    if args.database_url:
+        # Must be set before backend.database is imported
+        os.environ["DATABASE_URL"] = args.database_url
+
+    from backend.migrate import run_migrations
+    from backend.database import SessionLocal
+
+    run_migrations()
+    session = SessionLocal()
+    started = time.perf_counter()
+    counts = generate(session, args.subscriptions, seed=args.seed)
+    session.close()
+    print(f"Generated {counts} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
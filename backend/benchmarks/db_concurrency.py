@@ -0,0 +1,107 @@
+"""
+Benchmark: mixed read/write concurrency for each database engine mode.
+
+Several threads hammer one database for a fixed time: most operations list a
+user's subscriptions (like GET /subscription/list), the rest insert a
+subscription and commit (like POST /subscription/add). Reported per mode:
+operations/s, p50/p99 latency and "database is locked" failures.
+
+Modes:
+    sqlite-default  rollback journal, SQLite's default pragmas (the old engine)
+    sqlite-tuned    WAL + synchronous=NORMAL + busy_timeout + mmap (database.make_engine)
+    postgres        only if BENCH_POSTGRES_URL is set
+
+Run from the project root:
+    python -m backend.benchmarks.db_concurrency [threads] [seconds] [write_ratio]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base, make_engine
+from backend.models import User, Subscription
+
+USERS = 50
+
+
+def _prepare(engine):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": i + 1, "email": f"u{i}@example.com", "hashed_password": "x"} for i in range(USERS)])
+        conn.execute(insert(Subscription), [
+            {"name": f"s{i}", "renewal_date": date(2026, 1, 1) + timedelta(days=i % 365), "user_id": (i % USERS) + 1}
+            for i in range(USERS * 20)
+        ])
+
+
+def _worker(factory, deadline, write_ratio, latencies, errors):
+    rnd = random.Random()
+    while time.perf_counter() < deadline:
+        user_id = rnd.randint(1, USERS)
+        started = time.perf_counter()
+        db = factory()
+        try:
+            if rnd.random() < write_ratio:
+                db.add(Subscription(name="bench", renewal_date=date(2026, 6, 1), user_id=user_id))
+                db.commit()
+            else:
+                db.execute(select(Subscription).where(Subscription.user_id == user_id)).all()
+            latencies.append(time.perf_counter() - started)
+        except OperationalError:
+            db.rollback()
+            errors.append(1)
+        finally:
+            db.close()
+
+
+def run(label, engine, threads, seconds, write_ratio):
+    _prepare(engine)
+    factory = sessionmaker(bind=engine)
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    workers = [threading.Thread(target=_worker, args=(factory, deadline, write_ratio, latencies, errors))
+               for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    engine.dispose()
+    if latencies:
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    else:
+        p50 = p99 = float("nan")
+    print(f"{label:>15}: {len(latencies) / seconds:8.0f} ops/s  p50={p50:6.2f}ms  p99={p99:7.2f}ms  locked={len(errors)}")
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    write_ratio = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+    print(f"{threads} threads, {seconds}s per mode, {write_ratio:.0%} writes")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'default.db')}"
+        run("sqlite-default", make_engine(url, sqlite_pragmas={}), threads, seconds, write_ratio)
+        run("sqlite-tuned", make_engine(f"sqlite:///{os.path.join(tmp, 'tuned.db')}"), threads, seconds, write_ratio)
+
+    pg_url = os.getenv("BENCH_POSTGRES_URL")
+    if pg_url:
+        run("postgres", make_engine(pg_url), threads, seconds, write_ratio)
+    else:
+        print("       postgres: skipped (set BENCH_POSTGRES_URL=postgresql://... to include it)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark: streaming CSV import and export at scale, with peak memory.
+
+Writes an N-row CSV to a temporary file, imports it for one user through
+subscription_io.import_subscriptions (as POST /subscription/import does), then
+streams it back out through subscription_io.export_subscriptions (as
+GET /subscription/export does). Reports rows/s and how much the process's
+peak RSS grew during each phase; with streaming both stay flat as N grows.
+On SQLite the RSS figure also counts the page cache and mmap window (up to
+SQLITE_CACHE_SIZE + SQLITE_MMAP_SIZE); run with SQLITE_MMAP_SIZE=0
+SQLITE_CACHE_SIZE=-2000 to see the application's own footprint.
+
+Run from the project root:
+    python -m backend.benchmarks.import_export [rows]
+"""
+import asyncio
+import csv
+import os
+import resource
+import sys
+import tempfile
+import time
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "renewal_date", "note"])
+        for i in range(rows):
+            writer.writerow([f"Subscription {i}", f"2027-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                             "" if i % 3 else f"note {i}"])
+
+
+def run(rows, tmp):
+    from backend.migrate import run_migrations
+    from backend.database import SessionLocal
+    from backend import crud, subscription_io
+
+    run_migrations()
+    db = SessionLocal()
+    user = crud.create_user(db, "import@example.com", "unused", hashed_password="x")
+    user_id = user.id
+
+    path = os.path.join(tmp, "import.csv")
+    _write_csv(path, rows)
+    print(f"{rows} rows, {os.path.getsize(path) / 1e6:.1f} MB CSV")
+
+    before = _peak_rss_mb()
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        summary = subscription_io.import_subscriptions(db, user_id, f, "csv")
+    elapsed = time.perf_counter() - started
+    db.close()
+    print(f"import: {summary['imported']} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s), "
+          f"failed={summary['failed']}, peak RSS +{_peak_rss_mb() - before:.1f} MB")
+
+    async def export():
+        exported = 0
+        async for chunk in subscription_io.export_subscriptions(user_id, "csv"):
+            exported += chunk.count("\n")
+        return exported - 1  # header
+
+    before = _peak_rss_mb()
+    started = time.perf_counter()
+    exported = asyncio.run(export())
+    elapsed = time.perf_counter() - started
+    print(f"export: {exported} rows in {elapsed:.1f}s ({exported / elapsed:,.0f} rows/s), "
+          f"peak RSS +{_peak_rss_mb() - before:.1f} MB")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before backend.database is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'io.db')}"
+        run(rows, tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Load test: login latency under mixed traffic, and the cost of Argon2 parameters.
+
+Part 1 times one hash + verify for a few Argon2 parameter sets so
+ARGON2_TIME_COST / ARGON2_MEMORY_COST / ARGON2_PARALLELISM can be chosen
+for the machine.
+
+Part 2 starts the app in-process on a temporary SQLite database (httpx ASGI
+transport, no network) and runs `logins` concurrent clients calling
+POST /auth/login alongside `readers` clients calling GET /subscription/list.
+It reports p50/p99 for both plus how many logins were shed with 503 by the
+password hashing pool (PASSWORD_HASH_WORKERS / PASSWORD_HASH_QUEUE).
+Requires httpx (pip install httpx).
+
+Run from the project root:
+    python -m backend.benchmarks.login_load [duration_seconds] [logins] [readers]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# (time_cost, memory_cost KiB, parallelism); the first is passlib's default
+PARAMETER_SETS = [(3, 65536, 4), (2, 19456, 1), (2, 65536, 1), (1, 47104, 1)]
+
+
+def _percentiles(latencies):
+    if not latencies:
+        return "no samples"
+    latencies = sorted(latencies)
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    return f"n={len(latencies):>5}  p50={statistics.median(latencies) * 1000:8.2f}ms  p99={p99 * 1000:8.2f}ms"
+
+
+def bench_parameters(rounds=5):
+    from passlib.context import CryptContext
+
+    print("Argon2 cost (hash + verify, single thread):")
+    for time_cost, memory_cost, parallelism in PARAMETER_SETS:
+        context = CryptContext(schemes=["argon2"], argon2__time_cost=time_cost,
+                               argon2__memory_cost=memory_cost, argon2__parallelism=parallelism)
+        samples = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            context.verify("load-test-password", context.hash("load-test-password"))
+            samples.append(time.perf_counter() - started)
+        print(f"  t={time_cost} m={memory_cost:>6}KiB p={parallelism}: "
+              f"{statistics.median(samples) * 1000:7.1f}ms")
+
+
+async def bench_mixed(duration, logins, readers):
+    import httpx
+    from backend.main import app
+    from backend.migrate import run_migrations
+    from backend.password_hasher import get_password_hasher
+
+    run_migrations()
+    creds = {"email": "login@example.com", "password": "load-test-password"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        (await client.post("/auth/register", json=creds)).raise_for_status()
+        token = (await client.post("/auth/login", json=creds)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for i in range(50):
+            await client.post("/subscription/add", headers=headers,
+                              json={"name": f"seed{i}", "renewal_date": "2026-11-01"})
+
+        results = {"login": [], "list": [], "shed": 0}
+        deadline = time.perf_counter() + duration
+
+        async def login_client():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                r = await client.post("/auth/login", json=creds)
+                if r.status_code == 503:
+                    results["shed"] += 1
+                    await asyncio.sleep(0.05)
+                    continue
+                r.raise_for_status()
+                results["login"].append(time.perf_counter() - started)
+
+        async def list_client():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                (await client.get("/subscription/list", headers=headers)).raise_for_status()
+                results["list"].append(time.perf_counter() - started)
+
+        await asyncio.gather(*[login_client() for _ in range(logins)],
+                             *[list_client() for _ in range(readers)])
+
+    print(f"\nMixed load for {duration}s: {logins} login client(s), {readers} list client(s), "
+          f"hasher={get_password_hasher().stats}")
+    print(f"  /auth/login        {_percentiles(results['login'])}  shed(503)={results['shed']}")
+    print(f"  /subscription/list {_percentiles(results['list'])}")
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    logins = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    readers = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    bench_parameters()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before backend.database is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'login.db')}"
+        asyncio.run(bench_mixed(duration, logins, readers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Demo/benchmark: several scheduler processes sweeping one SQLite file at once.
+
+Seeds a temporary database, starts N processes that each call run_sweep()
+and drain_outbox() concurrently, then checks that every due alert was queued
+and sent exactly once and reports how the shards were split.
+
+Run from the project root:
+    python -m backend.benchmarks.multi_worker_sweep [processes] [subscriptions]
+"""
+from collections import Counter
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models import Outbox, AlertLog
+from backend.benchmarks.sweep_queries import _seed, TODAY
+
+
+def _session_factory(path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 30})
+    return sessionmaker(bind=engine)
+
+
+def _worker(path, results):
+    from backend import reminder_job, outbox_worker
+    outbox_worker.deliver = lambda channel, recipient, subject, body: time.sleep(0.001)
+    factory = _session_factory(path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sweep = reminder_job.run_sweep(factory, today=TODAY)
+        db = factory()
+        drained = outbox_worker.drain_outbox(db=db)
+        db.close()
+    results.put((os.getpid(), sweep, drained))
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    n_subs = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    os.environ.setdefault("SCHEDULER_SHARDS", str(processes * 2))
+    # Queue alerts as sendable now rather than in the users' delivery windows
+    os.environ.setdefault("DEFAULT_SEND_WINDOW", "none")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        factory = _session_factory(path)
+        Base.metadata.create_all(bind=factory.kw["bind"])
+        db = factory()
+        _seed(db, n_subs)
+        db.close()
+
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=_worker, args=(path, results)) for _ in range(processes)]
+        started = time.perf_counter()
+        for p in procs:
+            p.start()
+        reports = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - started
+
+        for pid, sweep, drained in reports:
+            print(f"pid={pid} shards={sweep['shards']} enqueued={sweep['enqueued']} sent={drained['sent']}")
+
+        db = factory()
+        queued = Counter(db.execute(select(Outbox.subscription_id, Outbox.offset, Outbox.channel)).all())
+        logged = Counter(db.execute(select(AlertLog.subscription_id, AlertLog.offset, AlertLog.channel)).all())
+        statuses = dict(db.execute(select(Outbox.status, func.count()).group_by(Outbox.status)).all())
+        db.close()
+        print(f"{processes} processes, {n_subs} subscriptions, {elapsed:.2f}s")
+        print(f"outbox rows={sum(queued.values())} duplicates={sum(c - 1 for c in queued.values())} statuses={statuses}")
+        print(f"alert logs={sum(logged.values())} duplicates={sum(c - 1 for c in logged.values())}")
+
+
+if __name__ == "__main__":
+    main()
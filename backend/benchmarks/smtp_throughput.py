@@ -0,0 +1,67 @@
+"""
+Benchmark: pooled vs unpooled SMTP throughput against a local aiosmtpd server.
+
+The unpooled run opens, (optionally) logs in and closes one connection per
+message like the old _send_via_smtp did; the pooled run goes through
+SMTPConnectionPool. Requires aiosmtpd (pip install aiosmtpd).
+
+Run from the project root:
+    python -m backend.benchmarks.smtp_throughput [messages] [threads]
+"""
+from concurrent.futures import ThreadPoolExecutor
+import smtplib
+import sys
+import time
+
+from backend.smtp_pool import SMTPConnectionPool
+
+HOST = "127.0.0.1"
+PORT = 8025
+
+
+class _Sink:
+    async def handle_DATA(self, server, session, envelope):
+        return "250 OK"
+
+
+def _message(i):
+    return f"Subject: Reminder {i}\r\nFrom: bench@example.com\r\nTo: user{i}@example.com\r\n\r\nRenews soon.\r\n"
+
+
+def unpooled(i):
+    with smtplib.SMTP(HOST, PORT, timeout=10) as server:
+        server.sendmail("bench@example.com", [f"user{i}@example.com"], _message(i))
+
+
+def run(label, send, messages, threads):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(send, range(messages)))
+    elapsed = time.perf_counter() - started
+    print(f"{label:>9}: {messages} messages in {elapsed:.2f}s ({messages / elapsed:.0f} msg/s)")
+
+
+def main():
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        sys.exit("aiosmtpd is required: pip install aiosmtpd")
+
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    controller = Controller(_Sink(), hostname=HOST, port=PORT)
+    controller.start()
+    try:
+        run("unpooled", unpooled, messages, threads)
+        pool = SMTPConnectionPool(HOST, PORT, size=threads, security="none")
+        run("pooled", lambda i: pool.sendmail("bench@example.com", [f"user{i}@example.com"], _message(i)),
+            messages, threads)
+        print(f"   pool stats: {pool.stats}")
+        pool.close()
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
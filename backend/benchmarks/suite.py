@@ -0,0 +1,193 @@
+"""
+Benchmark suite: scheduler sweep, API latency and email delivery on one seeded dataset.
+
+1. datagen fills a fresh database with `--subscriptions` rows (seeded).
+2. sweep: one check_expiring_subscriptions run; wall time and statements by kind.
+3. api: GET /subscription/list and POST /auth/login through an in-process
+   ASGI client (httpx); latency percentiles and requests/s.
+4. email: drains the alerts the sweep queued through outbox_worker and the
+   SMTP pool into a local aiosmtpd server; messages/s.
+
+The results are printed as JSON on stdout (and written to --output), tagged
+with the git commit, so runs can be diffed across commits. Progress goes to
+stderr. Requires httpx and aiosmtpd (pip install httpx aiosmtpd).
+
+Run from the project root:
+    python -m backend.benchmarks.suite [--subscriptions 100000] [--seed 42] [--output results.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+SMTP_HOST = "127.0.0.1"
+SMTP_PORT = 8026
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def _latency_summary(latencies, elapsed):
+    latencies = sorted(latencies)
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+    return {"requests": len(latencies), "rps": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(statistics.median(latencies) * 1000, 3),
+            "p90_ms": round(pick(0.90) * 1000, 3), "p99_ms": round(pick(0.99) * 1000, 3),
+            "max_ms": round(latencies[-1] * 1000, 3)}
+
+
+def bench_sweep(today):
+    from sqlalchemy import event
+    from backend.database import engine, SessionLocal
+    from backend import reminder_job
+
+    counts = {"select": 0, "insert": 0, "update": 0, "delete": 0}
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        kind = statement.lstrip().split(None, 1)[0].lower()
+        if kind in counts:
+            counts[kind] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        summary = reminder_job.check_expiring_subscriptions(db=db, today=today)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", count)
+    return {**summary, "seconds": round(elapsed, 3), "queries": counts}
+
+
+async def bench_api(list_requests, login_requests):
+    import httpx
+    from backend.main import app
+    from backend.benchmarks.datagen import PASSWORD
+
+    creds = {"email": "user0@example.com", "password": PASSWORD}
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        login = await client.post("/auth/login", json=creds)
+        login.raise_for_status()
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        for name, count, call in (
+            ("list", list_requests, lambda: client.get("/subscription/list", headers=headers)),
+            ("login", login_requests, lambda: client.post("/auth/login", json=creds)),
+        ):
+            latencies = []
+            started = time.perf_counter()
+            for _ in range(count):
+                t = time.perf_counter()
+                (await call()).raise_for_status()
+                latencies.append(time.perf_counter() - t)
+            results[name] = _latency_summary(latencies, time.perf_counter() - started)
+    return results
+
+
+def bench_email(max_messages):
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.smtp import AuthResult
+    from backend import outbox_worker
+    from backend.smtp_pool import close_smtp_pools
+
+    class Sink:
+        async def handle_DATA(self, server, session, envelope):
+            return "250 OK"
+
+    os.environ.update({"SMTP_SERVER": SMTP_HOST, "SMTP_PORT": str(SMTP_PORT), "SMTP_SECURITY": "none",
+                       "SMTP_USER": "bench@example.com", "SMTP_PASS": "bench"})
+    os.environ.pop("SENDGRID_API_KEY", None)
+    batch = int(os.getenv("OUTBOX_BATCH_SIZE", 100))
+    controller = Controller(Sink(), hostname=SMTP_HOST, port=SMTP_PORT, auth_require_tls=False,
+                            authenticator=lambda *args: AuthResult(success=True))
+    controller.start()
+    try:
+        started = time.perf_counter()
+        summary = outbox_worker.drain_outbox(max_rounds=max(1, max_messages // batch))
+        elapsed = time.perf_counter() - started
+    finally:
+        controller.stop()
+        close_smtp_pools()
+    return {**summary, "seconds": round(elapsed, 3),
+            "per_second": round(summary["sent"] / elapsed, 1) if elapsed else None,
+            "concurrency": outbox_worker.get_concurrency()}
+
+
+def run(args):
+    from backend.migrate import run_migrations
+    from backend.database import SessionLocal, SQLALCHEMY_DATABASE_URL
+    from backend.cache import get_cache
+    from backend.benchmarks import datagen
+
+    run_migrations()
+    db = SessionLocal()
+    started = time.perf_counter()
+    counts = datagen.generate(db, args.subscriptions, seed=args.seed)
+    db.close()
+    print(f"[Bench] generated {counts} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": SQLALCHEMY_DATABASE_URL.split(":", 1)[0],
+            "cache": get_cache().backend.name,
+            "seed": args.seed,
+            "rows": counts,
+        },
+    }
+    print("[Bench] sweep", file=sys.stderr)
+    results["sweep"] = bench_sweep(datagen.TODAY)
+    print("[Bench] api", file=sys.stderr)
+    results["api"] = asyncio.run(bench_api(args.list_requests, args.login_requests))
+    print("[Bench] email", file=sys.stderr)
+    results["email"] = bench_email(args.max_messages)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scheduler, API and email benchmarks")
+    parser.add_argument("--subscriptions", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--list-requests", type=int, default=500)
+    parser.add_argument("--login-requests", type=int, default=20)
+    parser.add_argument("--max-messages", type=int, default=2000)
+    parser.add_argument("--database-url", help="benchmark against this (empty) database instead of a temp SQLite file")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before backend.database is imported
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        # Queue alerts as sendable now rather than in the users' delivery windows
+        os.environ.setdefault("DEFAULT_SEND_WINDOW", "none")
+        # The app's own logging goes to stderr so stdout is only the JSON document
+        with contextlib.redirect_stdout(sys.stderr):
+            results = run(args)
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: peak memory of one sweep as the number of subscriptions grows.
+
+For each size a fresh SQLite file is filled by datagen (5% of subscriptions
+due), then one check_expiring_subscriptions run is measured in a separate
+process: peak Python heap (tracemalloc) and peak RSS growth over the
+process's baseline. The sweep reads and writes SWEEP_BATCH_SIZE rows at a
+time, so both stay flat from 10k to 10M subscriptions; only the wall time
+grows. SQLite's page cache and mmap window are pinned small
+(SQLITE_CACHE_SIZE / SQLITE_MMAP_SIZE) so RSS reflects the application.
+
+Run from the project root:
+    python -m backend.benchmarks.sweep_memory [size ...]      (default 10000 100000 1000000)
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure():
+    """Child process: one sweep against DATABASE_URL, result as JSON on the last stdout line."""
+    from backend.database import SessionLocal
+    from backend import reminder_job
+    from backend.benchmarks.datagen import TODAY
+
+    db = SessionLocal()
+    baseline = _peak_rss_mb()
+    tracemalloc.start()
+    started = time.perf_counter()
+    summary = reminder_job.check_expiring_subscriptions(db=db, today=TODAY)
+    elapsed = time.perf_counter() - started
+    heap_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    db.close()
+    print(json.dumps({**summary, "seconds": round(elapsed, 2), "heap_peak_mb": round(heap_peak / 2**20, 1),
+                      "rss_growth_mb": round(_peak_rss_mb() - baseline, 1)}))
+
+
+def run(size, tmp):
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{os.path.join(tmp, f'sweep_{size}.db')}",
+           "SQLITE_CACHE_SIZE": "-2000", "SQLITE_MMAP_SIZE": "0", "DEFAULT_SEND_WINDOW": "none"}
+    subprocess.run([sys.executable, "-m", "backend.benchmarks.datagen", "--subscriptions", str(size)],
+                   env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    child = subprocess.run([sys.executable, "-m", "backend.benchmarks.sweep_memory", "--measure"],
+                           env=env, check=True, capture_output=True, text=True)
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def main():
+    if sys.argv[1:] == ["--measure"]:
+        return measure()
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'subscriptions':>13} {'due':>8} {'seconds':>8} {'heap peak MB':>13} {'RSS growth MB':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            result = run(size, tmp)
+            print(f"{size:>13,} {result['due']:>8,} {result['seconds']:>8} "
+                  f"{result['heap_peak_mb']:>13} {result['rss_growth_mb']:>14}")
+
+
+if __name__ == "__main__":
+    main()
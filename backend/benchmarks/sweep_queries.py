@@ -0,0 +1,90 @@
+"""
+Benchmark: statements issued by check_expiring_subscriptions as the table grows.
+
+Seeds an in-memory SQLite database with N subscriptions (a share of them due
+today) and counts the SELECT / INSERT / UPDATE statements one sweep executes.
+Every statement count grows only with the number of SWEEP_BATCH_SIZE
+chunks: per chunk, one keyset SELECT of due subscriptions, one SELECT of their
+alerts and one outbox INSERT (plus its checkpoint write), never per row.
+Advancing the schedule afterwards is one keyset SELECT, one SELECT of the
+chunk's offsets and one UPDATE executemany per chunk; half of the due
+subscriptions have their own offset (30 distinct values), which adds no
+statements.
+
+Run from the project root:
+    python -m backend.benchmarks.sweep_queries
+"""
+import contextlib
+import io
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.database import Base
+from backend.models import User, Subscription, AlertOffset
+from backend import reminder_job
+from backend.alert_schedule import get_alert_offsets, compute_next_alert
+
+SIZES = [1_000, 10_000, 100_000]
+TODAY = date(2026, 1, 1)
+
+
+def _seed(session, n_subs):
+    n_users = max(1, n_subs // 10)
+    session.execute(insert(User), [
+        {"id": i + 1, "email": f"user{i}@example.com", "hashed_password": "x", "phone": None if i % 3 else "+100000"}
+        for i in range(n_users)
+    ])
+    offsets = get_alert_offsets()
+    rows, own = [], []
+    for i in range(n_subs):
+        # every 40th subscription has an offset of its own, 1..30 days
+        sub_offsets = [i % 30 + 1] if i % 40 == 0 else offsets
+        # every 20th subscription lands on an alert offset, the rest are far away
+        days = sub_offsets[i % len(sub_offsets)] if i % 20 == 0 else 365
+        renewal_date = TODAY + timedelta(days=days)
+        next_at, next_offset = compute_next_alert(renewal_date, sub_offsets, TODAY)
+        rows.append({"id": i + 1, "name": f"sub{i}", "renewal_date": renewal_date, "user_id": (i % n_users) + 1,
+                     "next_alert_at": next_at, "next_alert_offset": next_offset, "custom_alert_offsets": i % 40 == 0})
+        if i % 40 == 0:
+            own.append({"user_id": (i % n_users) + 1, "subscription_id": i + 1, "offset": sub_offsets[0]})
+    session.execute(insert(Subscription), rows)
+    session.execute(insert(AlertOffset), own)
+    session.commit()
+
+
+def run(n_subs):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    _seed(session, n_subs)
+
+    counts = {"select": 0, "insert": 0, "update": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        kind = statement.lstrip().split(None, 1)[0].lower()
+        if kind in counts:
+            counts[kind] += 1
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = reminder_job.check_expiring_subscriptions(db=session, today=TODAY)
+    elapsed = time.perf_counter() - started
+    session.close()
+    engine.dispose()
+    return {"subscriptions": n_subs, **summary, **counts, "seconds": round(elapsed, 3)}
+
+
+def main():
+    print(f"{'subs':>8} {'due':>6} {'queued':>6} {'select':>7} {'insert':>7} {'update':>7} {'seconds':>8}")
+    for n in SIZES:
+        r = run(n)
+        print(f"{r['subscriptions']:>8} {r['due']:>6} {r['enqueued']:>6} {r['select']:>7} {r['insert']:>7} {r['update']:>7} {r['seconds']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Read cache for per-user data served on every page load (subscription lists, profiles).
+
+Two interchangeable backends:
+    memory  in-process LRU with TTL eviction (default); each process has its own
+    redis   any Redis-compatible server, shared by every process
+
+Subscription pages are keyed by the user's subscriptions_version, which
+every write bumps in the database and every list request reads from there
+(one primary-key lookup), so a write retires the old pages in every process
+and no invalidation is needed. The caller's principal and GET /auth/profile's
+payload are dropped by auth.invalidate_user(), which update_profile calls. Cache
+errors are counted and treated as misses; a broken cache never fails a request.
+
+Configuration (ENV):
+    CACHE_BACKEND      memory, redis or none (default memory)
+    CACHE_URL          redis://host:6379/0 when CACHE_BACKEND=redis
+    CACHE_TTL          seconds an entry lives (default 60)
+    CACHE_MAX_ENTRIES  size of the memory backend (default 10000)
+"""
+from collections import defaultdict
+import json
+import logging
+import os
+import threading
+import time
+
+from .ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, maxsize, ttl):
+        self._cache = TTLCache(maxsize, ttl)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, ttl):
+        self._cache.set(key, value, expires_at=time.time() + ttl)
+
+    def delete(self, key):
+        self._cache.pop(key)
+
+    def size(self):
+        return len(self._cache)
+
+
+class RedisBackend:
+    """Values are stored as JSON. `client` is anything with redis-py's get/set/delete."""
+    name = "redis"
+
+    def __init__(self, client, prefix="subrem:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url):
+        import redis  # optional dependency, only needed for CACHE_BACKEND=redis
+        return cls(redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5))
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def size(self):
+        return None
+
+
+class NullBackend:
+    name = "none"
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def size(self):
+        return 0
+
+
+class Cache:
+    """Counts hits/misses per key namespace (the part before the first ':')."""
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def _count(self, counter, key):
+        with self._lock:
+            counter[key.split(":", 1)[0]] += 1
+
+    def get(self, key):
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("get %s failed: %s", key, e)
+            value = None
+        self._count(self.misses if value is None else self.hits, key)
+        return value
+
+    def set(self, key, value, ttl=None):
+        try:
+            self.backend.set(key, value, ttl or self.ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("set %s failed: %s", key, e)
+
+    def delete(self, key):
+        try:
+            self.backend.delete(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("delete %s failed: %s", key, e)
+
+    @property
+    def stats(self):
+        return {"backend": self.backend.name, "size": self.backend.size(), "errors": self.errors,
+                "hits": dict(self.hits), "misses": dict(self.misses)}
+
+
+def _make_backend():
+    kind = os.getenv("CACHE_BACKEND", "memory").lower()
+    ttl = max(1, _env_int("CACHE_TTL", 60))
+    if kind == "none":
+        return NullBackend()
+    if kind == "redis":
+        try:
+            return RedisBackend.from_url(os.getenv("CACHE_URL", "redis://localhost:6379/0"))
+        except Exception as e:
+            logger.warning("Redis backend unavailable (%s), using the in-process cache", e)
+    return MemoryBackend(_env_int("CACHE_MAX_ENTRIES", 10000), ttl)
+
+
+_cache = None
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = Cache(_make_backend(), max(1, _env_int("CACHE_TTL", 60)))
+    return _cache
+
+def set_cache(cache):
+    """Swap the process-wide cache (e.g. Cache(RedisBackend(fake_client), 60) in tests)."""
+    global _cache
+    _cache = cache
+
+
+# Key layout, kept in one place so writers and readers agree
+def subscriptions_page_key(user_id, etag):
+    return f"subs:{user_id}:{etag}"
+
+def principal_key(user_id):
+    return f"principal:{user_id}"
+
+def profile_key(user_id):
+    return f"profile:{user_id}"
@@ -0,0 +1,382 @@
+"""
+Notification channels: how an alert reaches a user, and how fast it may be sent.
+
+Each Channel declares which users it can reach (a SQL condition on users,
+used by the sweep's single due-alerts query), the column it sends to, and its
+delivery limits: batch_size() messages per provider call and `concurrency`
+calls in flight. outbox_worker fans every round out to all channels at once,
+each on its own thread pool, so a user's email and WhatsApp reminders go out
+in parallel and a slow channel never holds up the others.
+
+    email     users.email if email_alerts_enabled; via email_providers.py,
+              up to 1000 per SendGrid request
+    whatsapp  users.phone if whatsapp_alerts_enabled; WhatsApp Cloud API style POST
+    sms       users.phone if sms_alerts_enabled; JSON POST to SMS_API_URL
+    webhook   users.webhook_url; JSON POST, signed when WEBHOOK_SECRET is set
+
+The sweep queues alerts only for active channels: ALERT_CHANNELS if set,
+otherwise every configured one except webhook, which must be listed there.
+
+Webhook URLs are user input, so they must be https and resolve only to public
+addresses; check_webhook_url() is applied when a URL is saved, and webhook
+connections re-check the address they actually connect to, so a hostname that
+later resolves to 127.0.0.1, 10.x or 169.254.169.254 is refused at send time.
+
+Configuration (ENV):
+    ALERT_CHANNELS                 e.g. "email,whatsapp"
+    CHANNEL_<NAME>_CONCURRENCY     sends in flight (default OUTBOX_CONCURRENCY for email, else 4)
+    CHANNEL_EMAIL_BATCH_SIZE       messages per SendGrid request (default 1000)
+    WHATSAPP_API_URL               e.g. https://graph.facebook.com/v19.0/<phone-number-id>/messages
+    WHATSAPP_API_KEY               bearer token
+    SMS_API_URL, SMS_API_KEY, SMS_FROM
+    WEBHOOK_SECRET                 HMAC-SHA256 key for the X-Signature header
+    WEBHOOK_ALLOW_LOOPBACK         1 lets webhooks use http:// and loopback addresses
+                                   (local testing only, e.g. benchmarks/channel_fanout.py)
+    CHANNEL_HTTP_CONNECT_TIMEOUT   seconds (default 5)
+    CHANNEL_HTTP_TIMEOUT           seconds to wait for a response (default 10)
+"""
+from abc import ABC, abstractmethod
+import hashlib
+import hmac
+import ipaddress
+import json
+import os
+import socket
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import and_
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+from urllib3.util.connection import create_connection
+
+from .models import User
+from .metrics import time_send
+from .send_email import send_email_alert, send_email_batch, sendgrid_batching_enabled
+from .send_email_sendgrid import MAX_PERSONALIZATIONS
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _present(column):
+    return and_(column.isnot(None), column != "")
+
+
+class Channel(ABC):
+    """One way of delivering an alert. send() raises on failure."""
+    name = None
+    digest = False  # a user's alerts due together are combined into one message
+    short = False  # gets the one-line message instead of the email text
+    default_concurrency = 4
+    opt_in = False  # only active when named in ALERT_CHANNELS
+
+    def configured(self):
+        return True
+
+    @abstractmethod
+    def reachable(self):
+        """SQL condition on User: this user can and wants to be reached on this channel."""
+
+    @abstractmethod
+    def recipient(self):
+        """User column holding the address to send to."""
+
+    @property
+    def concurrency(self):
+        return max(1, _env_int(f"CHANNEL_{self.name.upper()}_CONCURRENCY", self.default_concurrency))
+
+    def batch_size(self):
+        """Messages one send_batch() call may carry; 1 means every message is its own call."""
+        return 1
+
+    @abstractmethod
+    def send(self, recipient, subject, body):
+        """Send one message; raises on failure."""
+
+    def send_batch(self, messages):
+        """Send {to, subject, body} dicts; returns per-message errors (None on success).
+
+        This default sends them one at a time; channels whose provider takes
+        several messages per call override it.
+        """
+        errors = []
+        for message in messages:
+            try:
+                self.send(message["to"], message["subject"], message["body"])
+                errors.append(None)
+            except Exception as e:
+                errors.append(str(e))
+        return errors
+
+    def describe(self):
+        return {"configured": self.configured(), "concurrency": self.concurrency, "batch_size": self.batch_size()}
+
+
+class EmailChannel(Channel):
+    name = "email"
+    digest = True
+
+    @property
+    def default_concurrency(self):
+        return _env_int("OUTBOX_CONCURRENCY", 4)
+
+    def reachable(self):
+        return and_(_present(User.email), User.email_alerts_enabled.isnot(False))
+
+    def recipient(self):
+        return User.email
+
+    def batch_size(self):
+        if not sendgrid_batching_enabled():
+            return 1
+        return max(1, min(_env_int("CHANNEL_EMAIL_BATCH_SIZE", MAX_PERSONALIZATIONS), MAX_PERSONALIZATIONS))
+
+    def send(self, recipient, subject, body):
+        send_email_alert(recipient, subject, body)
+
+    def send_batch(self, messages):
+        return send_email_batch(messages)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session():
+    """One requests.Session (connection pool + keep-alive) shared by the HTTP channels.
+
+    Its pool holds a connection for every thread the channels may run at
+    once, so concurrent sends don't open and drop connections.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            size = max(10, sum(channel.concurrency for channel in CHANNELS.values()))
+            adapter = HTTPAdapter(pool_maxsize=size)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+class UnsafeWebhookURL(ValueError):
+    """A webhook URL that isn't https or points at a private, loopback, link-local or reserved address."""
+
+
+def _allow_loopback():
+    return os.getenv("WEBHOOK_ALLOW_LOOPBACK", "").lower() in ("1", "true", "yes")
+
+
+def _address_allowed(address):
+    if address.version == 6 and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    if address.is_loopback and _allow_loopback():
+        return True
+    return address.is_global and not address.is_multicast
+
+
+def _public_address(host, port):
+    """Resolve `host`; returns its first address, or raises if any address it resolves to is not public."""
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise UnsafeWebhookURL(f"Could not resolve webhook host '{host}': {e}")
+    addresses = [info[4][0] for info in infos]
+    for address in addresses:
+        if not _address_allowed(ipaddress.ip_address(address.split("%", 1)[0])):
+            raise UnsafeWebhookURL(f"Webhook host '{host}' resolves to a non-public address ({address})")
+    return addresses[0]
+
+
+def check_webhook_url(url, resolve=True):
+    """Return `url` if alerts may be POSTed to it, else raise UnsafeWebhookURL.
+
+    With `resolve` False only the scheme and a literal IP host are checked
+    (no DNS lookup), as request validation does.
+    """
+    parts = urlsplit(url)
+    schemes = ("https", "http") if _allow_loopback() else ("https",)
+    if parts.scheme not in schemes or not parts.hostname:
+        raise UnsafeWebhookURL("Webhook URL must start with https:// and name a host")
+    try:
+        literal = ipaddress.ip_address(parts.hostname)
+    except ValueError:
+        literal = None
+    if literal is not None and not _address_allowed(literal):
+        raise UnsafeWebhookURL(f"Webhook URL points at a non-public address ({literal})")
+    if resolve:
+        _public_address(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+    return url
+
+
+class _VettedConnectionMixin:
+    """Connects only to a public address of the host, checked at connect time (not just when the URL was saved)."""
+
+    def _new_conn(self):
+        address = _public_address(self._dns_host, self.port)
+        try:
+            return create_connection((address, self.port), self.timeout, source_address=self.source_address,
+                                     socket_options=self.socket_options)
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to establish a new connection: {e}") from e
+
+
+class _VettedHTTPConnection(_VettedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _VettedHTTPSConnection(_VettedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _VettedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _VettedHTTPConnection
+
+
+class _VettedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _VettedHTTPSConnection
+
+
+class _WebhookAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _VettedHTTPConnectionPool,
+                                                   "https": _VettedHTTPSConnectionPool}
+
+
+_webhook_session = None
+
+
+def _get_webhook_session():
+    """Session for user-supplied URLs: vetted connections and no proxies from the environment."""
+    global _webhook_session
+    with _session_lock:
+        if _webhook_session is None:
+            _webhook_session = requests.Session()
+            _webhook_session.trust_env = False
+            adapter = _WebhookAdapter(pool_maxsize=max(10, WebhookChannel().concurrency))
+            _webhook_session.mount("https://", adapter)
+            _webhook_session.mount("http://", adapter)
+        return _webhook_session
+
+
+class HTTPChannel(Channel):
+    """A channel that delivers with one JSON POST per message."""
+
+    def _session(self):
+        return _get_session()
+
+    def _post(self, url, payload, headers=None):
+        data = json.dumps(payload).encode()
+        with time_send(self.name):
+            response = self._session().post(
+                url, data=data, headers={"Content-Type": "application/json", **self._headers(data), **(headers or {})},
+                timeout=(_env_float("CHANNEL_HTTP_CONNECT_TIMEOUT", 5), _env_float("CHANNEL_HTTP_TIMEOUT", 10)),
+                allow_redirects=False,
+            )
+            if response.status_code >= 400:
+                raise Exception(f"{self.name} API error: {response.status_code} {response.text[:200]}")
+        return response
+
+    def _headers(self, data):
+        return {}
+
+
+class WhatsAppChannel(HTTPChannel):
+    name = "whatsapp"
+    short = True
+
+    def configured(self):
+        return bool(os.getenv("WHATSAPP_API_URL") and os.getenv("WHATSAPP_API_KEY"))
+
+    def reachable(self):
+        return and_(_present(User.phone), User.whatsapp_alerts_enabled.isnot(False))
+
+    def recipient(self):
+        return User.phone
+
+    def send(self, recipient, subject, body):
+        if not self.configured():
+            raise Exception("WhatsApp not configured. Set WHATSAPP_API_URL and WHATSAPP_API_KEY in .env")
+        self._post(os.getenv("WHATSAPP_API_URL"),
+                   {"messaging_product": "whatsapp", "to": recipient, "type": "text", "text": {"body": body}},
+                   {"Authorization": f"Bearer {os.getenv('WHATSAPP_API_KEY')}"})
+
+
+class SMSChannel(HTTPChannel):
+    name = "sms"
+    short = True
+
+    def configured(self):
+        return bool(os.getenv("SMS_API_URL"))
+
+    def reachable(self):
+        return and_(_present(User.phone), User.sms_alerts_enabled.is_(True))
+
+    def recipient(self):
+        return User.phone
+
+    def send(self, recipient, subject, body):
+        if not self.configured():
+            raise Exception("SMS not configured. Set SMS_API_URL (and SMS_API_KEY, SMS_FROM) in .env")
+        headers = {"Authorization": f"Bearer {os.getenv('SMS_API_KEY')}"} if os.getenv("SMS_API_KEY") else {}
+        self._post(os.getenv("SMS_API_URL"), {"from": os.getenv("SMS_FROM"), "to": recipient, "body": body}, headers)
+
+
+class WebhookChannel(HTTPChannel):
+    name = "webhook"
+    opt_in = True
+
+    def _session(self):
+        return _get_webhook_session()
+
+    def reachable(self):
+        return _present(User.webhook_url)
+
+    def recipient(self):
+        return User.webhook_url
+
+    def _headers(self, data):
+        secret = os.getenv("WEBHOOK_SECRET")
+        if not secret:
+            return {}
+        return {"X-Signature": "sha256=" + hmac.new(secret.encode(), data, hashlib.sha256).hexdigest()}
+
+    def send(self, recipient, subject, body):
+        # The address itself is re-checked when the connection is made
+        self._post(check_webhook_url(recipient, resolve=False),
+                   {"event": "subscription.reminder", "subject": subject, "body": body})
+
+
+CHANNELS = {channel.name: channel for channel in (EmailChannel(), WhatsAppChannel(), SMSChannel(), WebhookChannel())}
+
+
+def get_channel(name):
+    channel = CHANNELS.get(name)
+    if channel is None:
+        raise Exception(f"Unknown channel '{name}'")
+    return channel
+
+
+def active_channels():
+    """Channels the sweep queues alerts for, in registry order; opt-in channels only when listed."""
+    raw = os.getenv("ALERT_CHANNELS")
+    if raw:
+        names = {name.strip().lower() for name in raw.split(",")}
+        return [channel for name, channel in CHANNELS.items() if name in names]
+    return [channel for channel in CHANNELS.values() if channel.configured() and not channel.opt_in]
@@ -0,0 +1,110 @@
+"""
+Thread-safe circuit breaker used to stop sending through a provider that keeps failing.
+"""
+from collections import deque
+import threading
+import time
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """Rolling error rate over the last `window` seconds, opening at `error_rate`.
+
+    The breaker only trips once the window holds at least `min_calls` outcomes,
+    so one failure on a quiet provider doesn't take it out. While open, allow()
+    is False without touching the provider. After `cooldown` seconds one probe
+    call is let through (half-open): success closes the breaker, failure opens
+    it again for twice as long, up to `max_cooldown`.
+    """
+
+    def __init__(self, name, error_rate=0.5, min_calls=5, window=60, cooldown=30, max_cooldown=600,
+                 clock=time.monotonic):
+        self.name = name
+        self.error_rate_threshold = error_rate
+        self.min_calls = max(1, int(min_calls))
+        self.window = window
+        self.base_cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes = deque()  # (time, ok), oldest on the left
+        self._failures = 0
+        self.state = CLOSED
+        self.cooldown = cooldown
+        self._opened_at = None
+        self._probe_started = None
+        self.trips = 0
+        self.last_error = None
+
+    def _prune(self, now):
+        while self._outcomes and self._outcomes[0][0] <= now - self.window:
+            if not self._outcomes.popleft()[1]:
+                self._failures -= 1
+
+    def _open(self, now):
+        self.state = OPEN
+        self._opened_at = now
+        self._probe_started = None
+        self.trips += 1
+
+    def allow(self):
+        """True if a call may go to the provider now; a half-open breaker lets one probe through at a time."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = self._clock()
+            if self.state == OPEN:
+                if now - self._opened_at < self.cooldown:
+                    return False
+                self.state = HALF_OPEN
+            # A probe whose caller never reported back counts as lost after one cooldown
+            if self._probe_started is not None and now - self._probe_started < self.cooldown:
+                return False
+            self._probe_started = now
+            return True
+
+    def record(self, ok, error=None):
+        """Report the outcome of a call that allow() let through."""
+        with self._lock:
+            now = self._clock()
+            if not ok:
+                self.last_error = error
+            if self.state == HALF_OPEN:
+                if ok:
+                    self.state = CLOSED
+                    self.cooldown = self.base_cooldown
+                    self._outcomes.clear()
+                    self._failures = 0
+                else:
+                    self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+                    self._open(now)
+                return
+            if self.state == OPEN:
+                return
+            self._outcomes.append((now, ok))
+            if not ok:
+                self._failures += 1
+            self._prune(now)
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and self._failures / calls >= self.error_rate_threshold:
+                self._open(now)
+
+    def snapshot(self):
+        """State, rolling error rate and seconds until the next probe, for the health endpoint and /metrics."""
+        with self._lock:
+            now = self._clock()
+            self._prune(now)
+            calls = len(self._outcomes)
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = max(0.0, round(self.cooldown - (now - self._opened_at), 1))
+            return {
+                "state": self.state,
+                "error_rate": round(self._failures / calls, 3) if calls else 0.0,
+                "calls": calls,
+                "failures": self._failures,
+                "trips": self.trips,
+                "retry_in": retry_in,
+                "last_error": self.last_error,
+            }
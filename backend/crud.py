@@ -1,13 +1,15 @@
 
+from sqlalchemy import update, select, insert, delete, bindparam, or_, and_
 from sqlalchemy.orm import Session
 from . import models, auth
+from .alert_schedule import schedule_subscription, compute_next_alert, get_user_offsets, reschedule_user
 from datetime import date
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email==email).first()
 
-def create_user(db: Session, email: str, password: str, phone: str = None):
-    hashed = auth.hash_password(password)
+def create_user(db: Session, email: str, password: str, phone: str = None, hashed_password: str = None):
+    hashed = hashed_password or auth.hash_password(password)
     user = models.User(email=email, hashed_password=hashed, phone=phone)
     db.add(user)
     db.commit()
@@ -20,9 +22,55 @@ def authenticate_user(db: Session, email: str, password: str):
     if not auth.verify_password(password, user.hashed_password): return None
     return user
 
-def create_subscription(db: Session, user_id: int, name: str, renewal_date: date, note: str = None, start_date: date = None):
-    sub = models.Subscription(name=name, renewal_date=renewal_date, note=note, start_date=start_date, user_id=user_id)
+def _bump_subscriptions_version(db: Session, user_id: int):
+    """Mark the user's subscription list as changed (invalidates its ETag); part of the caller's transaction."""
+    db.execute(update(models.User).where(models.User.id == user_id)
+               .values(subscriptions_version=models.User.subscriptions_version + 1))
+
+def get_subscriptions_version(db: Session, user_id: int):
+    return db.scalar(select(models.User.subscriptions_version).where(models.User.id == user_id))
+
+def get_user_alert_offsets(db: Session, user_id: int):
+    return get_user_offsets(db, user_id)
+
+def set_user_alert_offsets(db: Session, user_id: int, offsets: list):
+    """Replace the user's default offsets and reschedule their subscriptions; returns how many were rescheduled"""
+    db.execute(delete(models.AlertOffset).where(models.AlertOffset.user_id == user_id,
+                                                models.AlertOffset.subscription_id.is_(None)))
+    if offsets:
+        db.execute(insert(models.AlertOffset), [{"user_id": user_id, "offset": offset} for offset in offsets])
+    db.execute(update(models.User).where(models.User.id == user_id).values(custom_alert_offsets=True))
+    db.commit()
+    return reschedule_user(db, user_id)
+
+def _replace_subscription_offsets(db: Session, user_id: int, offsets_by_id: dict):
+    """Make {subscription id: offsets} the subscriptions' own offset rows (None: none, they use the
+    owner's default); part of the caller's transaction"""
+    db.execute(delete(models.AlertOffset).where(models.AlertOffset.subscription_id.in_(list(offsets_by_id))))
+    rows = [{"user_id": user_id, "subscription_id": sid, "offset": offset}
+            for sid, offsets in offsets_by_id.items() for offset in offsets or ()]
+    if rows:
+        db.execute(insert(models.AlertOffset), rows)
+
+def _delete_dependents(db: Session, subscription_ids):
+    """Delete the offset, alert log and outbox rows of subscriptions about to be deleted; part of the caller's
+    transaction. Left behind, they break the foreign keys on Postgres, and on SQLite a reused id would inherit
+    them and the new subscription's alerts would look already sent."""
+    for model in (models.AlertOffset, models.AlertLog, models.Outbox):
+        db.execute(delete(model).where(model.subscription_id.in_(subscription_ids))
+                   .execution_options(synchronize_session=False))
+
+def create_subscription(db: Session, user_id: int, name: str, renewal_date: date, note: str = None, start_date: date = None,
+                        alert_offsets: list = None):
+    """`alert_offsets` are the subscription's own; None uses the owner's default"""
+    sub = models.Subscription(name=name, renewal_date=renewal_date, note=note, start_date=start_date, user_id=user_id,
+                              custom_alert_offsets=alert_offsets is not None)
+    schedule_subscription(sub, alert_offsets if alert_offsets is not None else get_user_offsets(db, user_id))
     db.add(sub)
+    db.flush()
+    if alert_offsets:
+        _replace_subscription_offsets(db, user_id, {sub.id: alert_offsets})
+    _bump_subscriptions_version(db, user_id)
     db.commit()
     db.refresh(sub)
     return sub
@@ -30,29 +78,187 @@ def create_subscription(db: Session, user_id: int, name: str, renewal_date: date
 def get_subscriptions_for_user(db: Session, user_id: int):
     return db.query(models.Subscription).filter(models.Subscription.user_id==user_id).all()
 
+# Columns /subscription/list can be sorted by; id breaks ties so keyset pages are stable
+SUBSCRIPTION_SORT_COLUMNS = {
+    "renewal_date": models.Subscription.renewal_date,
+    "name": models.Subscription.name,
+}
+
+def list_subscriptions_page(db: Session, user_id: int, limit: int = None, after: tuple = None,
+                            sort: str = "renewal_date", descending: bool = False,
+                            renewal_from: date = None, renewal_to: date = None, name_prefix: str = None):
+    """One keyset page of a user's subscriptions, ordered by (sort column, id).
+
+    `after` is the (sort value, id) of the last row of the previous page.
+    Returns (rows, next_key) where next_key is None on the last page.
+    """
+    sub = models.Subscription
+    column = SUBSCRIPTION_SORT_COLUMNS[sort]
+    query = db.query(sub).filter(sub.user_id == user_id)
+    if renewal_from is not None:
+        query = query.filter(sub.renewal_date >= renewal_from)
+    if renewal_to is not None:
+        query = query.filter(sub.renewal_date <= renewal_to)
+    if name_prefix:
+        query = query.filter(sub.name.startswith(name_prefix, autoescape=True))
+    if after is not None:
+        value, last_id = after
+        if descending:
+            query = query.filter(or_(column < value, and_(column == value, sub.id < last_id)))
+        else:
+            query = query.filter(or_(column > value, and_(column == value, sub.id > last_id)))
+    if descending:
+        query = query.order_by(column.desc(), sub.id.desc())
+    else:
+        query = query.order_by(column, sub.id)
+    if limit is None:
+        return query.all(), None
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, (getattr(last, sort), last.id)
+
 def get_subscription(db: Session, subscription_id: int):
     return db.query(models.Subscription).filter(models.Subscription.id == subscription_id).first()
 
-def update_subscription(db: Session, subscription_id: int, name: str, renewal_date: date, note: str = None, start_date: date = None):
+# alert_offsets value for the update functions: leave the subscription's own offsets (or lack of them) as they are
+KEEP_OFFSETS = object()
+
+def update_subscription(db: Session, subscription_id: int, name: str, renewal_date: date, note: str = None, start_date: date = None,
+                        alert_offsets=KEEP_OFFSETS):
+    """`alert_offsets` None resets the subscription to its owner's default; KEEP_OFFSETS leaves it alone"""
     sub = get_subscription(db, subscription_id)
     if sub:
         sub.name = name
         sub.renewal_date = renewal_date
         sub.note = note
         sub.start_date = start_date
+        if alert_offsets is KEEP_OFFSETS:
+            alert_offsets = sub.alert_offsets
+        else:
+            sub.custom_alert_offsets = alert_offsets is not None
+            _replace_subscription_offsets(db, sub.user_id, {sub.id: alert_offsets})
+        schedule_subscription(sub, alert_offsets if alert_offsets is not None else get_user_offsets(db, sub.user_id))
+        _bump_subscriptions_version(db, sub.user_id)
         db.commit()
         db.refresh(sub)
     return sub
 
 def delete_all_subscriptions_for_user(db: Session, user_id: int):
-    """Delete all subscriptions for a user"""
-    db.query(models.Subscription).filter(models.Subscription.user_id == user_id).delete()
+    """Delete all subscriptions for a user; returns how many were deleted"""
+    _delete_dependents(db, select(models.Subscription.id).where(models.Subscription.user_id == user_id))
+    deleted = db.query(models.Subscription).filter(models.Subscription.user_id == user_id).delete()
+    _bump_subscriptions_version(db, user_id)
     db.commit()
-    return True
+    return deleted
 
 def delete_subscription(db: Session, subscription_id: int):
     sub = get_subscription(db, subscription_id)
     if sub:
+        owner_id = sub.user_id
+        _delete_dependents(db, [sub.id])
         db.delete(sub)
+        _bump_subscriptions_version(db, owner_id)
         db.commit()
     return sub
+
+def _scheduled_values(item: dict, default_offsets: list):
+    own = item.get("alert_offsets")
+    next_at, next_offset = compute_next_alert(item["renewal_date"], own if own is not None else default_offsets)
+    return {"name": item["name"], "renewal_date": item["renewal_date"], "note": item.get("note"),
+            "start_date": item.get("start_date"), "next_alert_at": next_at, "next_alert_offset": next_offset,
+            "custom_alert_offsets": own is not None}
+
+def get_subscription_owners(db: Session, subscription_ids: list):
+    """{subscription id: owner user id} for the given ids that exist"""
+    rows = db.execute(select(models.Subscription.id, models.Subscription.user_id)
+                      .where(models.Subscription.id.in_(subscription_ids)))
+    return dict(rows.all())
+
+def create_subscriptions(db: Session, user_id: int, items: list):
+    """Insert many subscriptions in one transaction (a single multi-row INSERT ... RETURNING)"""
+    if not items:
+        return []
+    default_offsets = get_user_offsets(db, user_id)
+    rows = [{**_scheduled_values(item, default_offsets), "user_id": user_id} for item in items]
+    subs = db.scalars(
+        insert(models.Subscription).returning(models.Subscription, sort_by_parameter_order=True)
+        .execution_options(render_nulls=True), rows
+    ).all()
+    own = {sub.id: item["alert_offsets"] for sub, item in zip(subs, items) if item.get("alert_offsets")}
+    if own:
+        _replace_subscription_offsets(db, user_id, own)
+        # Reload the offset rows just written
+        db.scalars(select(models.Subscription).where(models.Subscription.id.in_(list(own)))
+                   .execution_options(populate_existing=True)).all()
+    _bump_subscriptions_version(db, user_id)
+    db.commit()
+    return subs
+
+def insert_subscription_rows(db: Session, user_id: int, items: list):
+    """Insert many subscriptions with one executemany and commit; no rows are returned (used by imports).
+
+    They use the owner's default offsets; any per-item alert_offsets are ignored.
+    """
+    if not items:
+        return 0
+    default_offsets = get_user_offsets(db, user_id)
+    # render_nulls: rows with and without a note still go out as a single executemany
+    db.execute(insert(models.Subscription).execution_options(render_nulls=True),
+               [{**_scheduled_values({**item, "alert_offsets": None}, default_offsets), "user_id": user_id}
+                for item in items])
+    _bump_subscriptions_version(db, user_id)
+    db.commit()
+    return len(items)
+
+_bulk_update_subscription = (
+    update(models.Subscription.__table__)
+    .where(models.Subscription.id == bindparam("b_id"), models.Subscription.user_id == bindparam("b_user_id"))
+    .values(name=bindparam("name"), renewal_date=bindparam("renewal_date"), note=bindparam("note"),
+            start_date=bindparam("start_date"), next_alert_at=bindparam("next_alert_at"),
+            next_alert_offset=bindparam("next_alert_offset"), custom_alert_offsets=bindparam("custom_alert_offsets"))
+)
+
+def update_subscriptions(db: Session, user_id: int, items: list):
+    """Update many of one user's subscriptions (dicts with an `id`) in one executemany + one SELECT
+
+    Items without an `alert_offsets` key keep the subscription's current offsets.
+    """
+    if not items:
+        return []
+    kept = {item["id"] for item in items if "alert_offsets" not in item}
+    if kept:
+        current = {sub.id: sub.alert_offsets for sub in
+                   db.scalars(select(models.Subscription).where(models.Subscription.id.in_(kept)))}
+        items = [item if "alert_offsets" in item else {**item, "alert_offsets": current.get(item["id"])}
+                 for item in items]
+    default_offsets = get_user_offsets(db, user_id)
+    params = [{**_scheduled_values(item, default_offsets), "b_id": item["id"], "b_user_id": user_id} for item in items]
+    db.connection().execute(_bulk_update_subscription, params)
+    replaced = {item["id"]: item["alert_offsets"] for item in items if item["id"] not in kept}
+    if replaced:
+        _replace_subscription_offsets(db, user_id, replaced)
+    _bump_subscriptions_version(db, user_id)
+    ids = [item["id"] for item in items]
+    subs = db.scalars(select(models.Subscription).where(models.Subscription.id.in_(ids))
+                      .execution_options(populate_existing=True)).all()
+    db.commit()
+    by_id = {sub.id: sub for sub in subs}
+    return [by_id[i] for i in dict.fromkeys(ids) if i in by_id]
+
+def delete_subscriptions(db: Session, user_id: int, subscription_ids: list):
+    """Delete many of one user's subscriptions with one DELETE ... RETURNING; returns the deleted ids"""
+    if not subscription_ids:
+        return []
+    _delete_dependents(db, select(models.Subscription.id).where(models.Subscription.id.in_(subscription_ids),
+                                                                models.Subscription.user_id == user_id))
+    deleted = db.scalars(
+        delete(models.Subscription)
+        .where(models.Subscription.id.in_(subscription_ids), models.Subscription.user_id == user_id)
+        .returning(models.Subscription.id)
+    ).all()
+    _bump_subscriptions_version(db, user_id)
+    db.commit()
+    return deleted
@@ -0,0 +1,93 @@
+"""
+Per-user delivery windows: when an alert queued by the sweep actually goes out.
+
+Users may set an IANA timezone and a send window in local hours
+(send_window_start..send_window_end, e.g. 9..18; 22..6 wraps past midnight).
+The sweep stamps each outbox row's next_attempt_at with a slot inside the
+recipient's next open window. Slots are spread over the window by a hash of
+the user id and send date, so a day's alerts leave as an even trickle instead
+of one burst. The slot depends on nothing else, so all of one user's alerts
+for a day share it even when different sweeps queue them, and a digest is
+never split. A slot that has already passed in a window that is still open
+means "now".
+
+The outbox, claimed in next_attempt_at order, is the queue keyed on send time;
+outbox_worker's token bucket (OUTBOX_RATE_PER_MINUTE) keeps the send rate flat
+within each slot.
+
+Configuration (ENV):
+    DEFAULT_TIMEZONE     for users without one (default UTC)
+    DEFAULT_SEND_WINDOW  local hours for users without one (default 9-18);
+                         "none" sends as soon as an alert is due
+"""
+from datetime import datetime, time, timedelta, timezone
+import logging
+import os
+import zlib
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEND_WINDOW = (9, 18)
+
+
+def is_valid_timezone(name):
+    try:
+        ZoneInfo(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+
+def get_zone(name):
+    """ZoneInfo for `name`, falling back to DEFAULT_TIMEZONE and then UTC."""
+    for candidate in (name, os.getenv("DEFAULT_TIMEZONE"), "UTC"):
+        if candidate and is_valid_timezone(candidate):
+            return ZoneInfo(candidate)
+
+
+def get_default_window():
+    """(start_hour, end_hour) from DEFAULT_SEND_WINDOW, or None to send immediately."""
+    raw = os.getenv("DEFAULT_SEND_WINDOW", "").strip().lower()
+    if not raw:
+        return DEFAULT_SEND_WINDOW
+    if raw == "none":
+        return None
+    try:
+        start, end = (int(part) for part in raw.split("-"))
+        if 0 <= start <= 23 and 0 <= end <= 24:
+            return start, end
+    except ValueError:
+        pass
+    logger.warning("Invalid DEFAULT_SEND_WINDOW=%r, using %d-%d", raw, *DEFAULT_SEND_WINDOW)
+    return DEFAULT_SEND_WINDOW
+
+
+def send_time(now, tz_name=None, window_start=None, window_end=None, spread_key=0):
+    """Naive UTC datetime at which an alert that is due at `now` (naive UTC) should be sent.
+
+    Returns a point in the user's current window (if it is open) or next
+    window, at a fraction of the window given by `spread_key`'s hash, or `now`
+    if that point has already passed. A window whose start equals its end
+    covers the whole day.
+    """
+    if window_start is None or window_end is None:
+        window = get_default_window()
+        if window is None:
+            return now
+        window_start, window_end = window
+    zone = get_zone(tz_name)
+    local_now = now.replace(tzinfo=timezone.utc).astimezone(zone)
+    length = timedelta(hours=(window_end - window_start) % 24 or 24)
+
+    # Yesterday's window is still open at 02:00 if it runs 22..6
+    for day in (-1, 0, 1):
+        opens = datetime.combine(local_now.date() + timedelta(days=day), time(window_start), zone)
+        closes = opens + length
+        if closes > local_now:
+            break
+    fraction = (zlib.crc32(str(spread_key).encode()) % 10_000) / 10_000
+    slot = opens + length * fraction
+    if slot <= local_now:
+        return now
+    return slot.astimezone(timezone.utc).replace(tzinfo=None, microsecond=0)
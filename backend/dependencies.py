@@ -0,0 +1,40 @@
+"""
+FastAPI dependencies shared by all routers: database session and the caller's identity.
+"""
+from fastapi import Depends, HTTPException, Header
+from sqlalchemy.ext.asyncio import AsyncSession
+from jose import JWTError, ExpiredSignatureError
+
+from .database import AsyncSessionLocal
+from . import async_crud as crud, auth
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_current_user_id(authorization: str = Header(None)):
+    """Extract user ID from a "Bearer <token>" header (verified tokens are cached)."""
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Missing auth header")
+    parts = authorization.split()
+    if len(parts) != 2:
+        raise HTTPException(status_code=401, detail="Invalid auth header")
+    try:
+        payload = auth.decode_access_token(parts[1])
+        return int(payload.get("user_id"))
+    except ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except (JWTError, TypeError, ValueError):
+        # Bad signature/format, or a token without a usable user_id claim
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+async def get_current_principal(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    """The caller's cached Principal; loads and caches the user row on a miss."""
+    principal = auth.get_cached_principal(user_id)
+    if principal is None:
+        user = await crud.get_user(db, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        principal = auth.cache_principal(user)
+    return principal
@@ -0,0 +1,275 @@
+"""
+Email providers behind per-provider circuit breakers, with health-based routing.
+
+Each provider (SMTP, SendGrid) has a CircuitBreaker tracking its rolling error
+rate. EmailRouter walks the configured providers in EMAIL_PROVIDERS order and
+skips any whose breaker is open, so while Gmail is throttling us messages go
+straight to SendGrid instead of each paying for a failed SMTP connect first.
+An open breaker lets a single probe through once its cooldown has passed and
+closes again if the probe succeeds.
+
+A message the provider refused on its own merits (RecipientRejected, e.g. an
+unknown mailbox) is not retried elsewhere and doesn't count against the
+provider's health.
+
+Breaker state is served at GET /providers/health and in /metrics.
+
+Configuration (ENV):
+    EMAIL_PROVIDERS              preference order (default smtp,sendgrid); unconfigured ones are skipped
+    EMAIL_BREAKER_ERROR_RATE     rolling error rate that opens a breaker (default 0.5)
+    EMAIL_BREAKER_MIN_CALLS      calls in the window before it may open (default 5)
+    EMAIL_BREAKER_WINDOW         rolling window in seconds (default 60)
+    EMAIL_BREAKER_COOLDOWN       seconds open before the first probe (default 30)
+    EMAIL_BREAKER_MAX_COOLDOWN   cap on the cooldown, which doubles per failed probe (default 600)
+Connect / send timeouts: SMTP_CONNECT_TIMEOUT and SMTP_TIMEOUT (smtp_pool.py),
+SENDGRID_CONNECT_TIMEOUT and SENDGRID_TIMEOUT (send_email_sendgrid.py).
+"""
+from abc import ABC, abstractmethod
+from email.mime.text import MIMEText
+import logging
+import os
+import smtplib
+import threading
+
+from .circuit_breaker import CircuitBreaker, OPEN, HALF_OPEN
+from .smtp_pool import get_smtp_pool
+from .send_email_sendgrid import send_email_batch_sendgrid, is_recipient_error
+from .metrics import time_send
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+SMTP_USER_PLACEHOLDER = "your_email@gmail.com"
+DEFAULT_PROVIDER_ORDER = ["smtp", "sendgrid"]
+_STATE_VALUES = {OPEN: 2, HALF_OPEN: 1}
+# Marks the RecipientRejected errors EmailProvider.send_batch() returns
+_REJECTED_PREFIX = "rejected: "
+
+
+class RecipientRejected(Exception):
+    """The provider is up but refused this message; it is neither failed over nor held against the provider."""
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _breaker(name):
+    return CircuitBreaker(
+        name,
+        error_rate=_env_float("EMAIL_BREAKER_ERROR_RATE", 0.5),
+        min_calls=_env_int("EMAIL_BREAKER_MIN_CALLS", 5),
+        window=_env_int("EMAIL_BREAKER_WINDOW", 60),
+        cooldown=_env_int("EMAIL_BREAKER_COOLDOWN", 30),
+        max_cooldown=_env_int("EMAIL_BREAKER_MAX_COOLDOWN", 600),
+    )
+
+
+class EmailProvider(ABC):
+    """One way of sending email. send() raises on failure; send_batch() returns per-message errors."""
+    name = None
+    batches = False  # send_batch() packs many messages into one call
+
+    def __init__(self):
+        self.breaker = _breaker(self.name)
+
+    @abstractmethod
+    def configured(self):
+        """True if the settings this provider needs are present."""
+
+    @abstractmethod
+    def send(self, to_email, subject, message):
+        """Send one message; raises RecipientRejected if it was refused, anything else on failure."""
+
+    def send_batch(self, messages):
+        """Send {to, subject, body} dicts one at a time; providers with a batch API override this."""
+        errors = []
+        for m in messages:
+            try:
+                self.send(m["to"], m["subject"], m["body"])
+                errors.append(None)
+            except RecipientRejected as e:
+                errors.append(_REJECTED_PREFIX + str(e))
+            except Exception as e:
+                errors.append(str(e))
+        return errors
+
+    def rejects(self, error):
+        """True if a send_batch() error string means the message itself was refused."""
+        return error.startswith(_REJECTED_PREFIX)
+
+
+class SMTPProvider(EmailProvider):
+    """Gmail (or any) SMTP over the shared session pool."""
+    name = "smtp"
+
+    def configured(self):
+        return os.getenv("SMTP_USER", SMTP_USER_PLACEHOLDER) != SMTP_USER_PLACEHOLDER
+
+    def send(self, to_email, subject, message):
+        smtp_user = os.getenv("SMTP_USER", SMTP_USER_PLACEHOLDER)
+        msg = MIMEText(message)
+        msg['Subject'] = subject
+        msg['From'] = smtp_user
+        msg['To'] = to_email
+        try:
+            with time_send("smtp"):
+                get_smtp_pool().sendmail(msg['From'], [to_email], msg.as_string())
+        except smtplib.SMTPRecipientsRefused as e:
+            raise RecipientRejected(f"Recipient refused by SMTP server: {e}")
+        except smtplib.SMTPAuthenticationError as e:
+            raise Exception(
+                "SMTP authentication failed. Check SMTP_USER and SMTP_PASS (App Password for Gmail), "
+                "ensure 2FA is enabled and the app password is correct. Original error: " + str(e)
+            )
+        except Exception as e:
+            raise Exception(f"Failed to send email: {e}")
+        # Per message: DEBUG only (LOG_LEVELS=backend.email_providers=DEBUG); the caller logs outcomes
+        logger.debug("Email sent successfully via SMTP to %s", to_email)
+
+
+class SendGridProvider(EmailProvider):
+    """SendGrid v3 Mail Send API; batches up to 1000 recipients per request."""
+    name = "sendgrid"
+    batches = True
+
+    def configured(self):
+        return bool(os.getenv("SENDGRID_API_KEY"))
+
+    def send(self, to_email, subject, message):
+        with time_send("sendgrid"):
+            error = send_email_batch_sendgrid([{"to": to_email, "subject": subject, "body": message}])[0]
+        if error:
+            if is_recipient_error(error):
+                raise RecipientRejected(error)
+            raise Exception(f"Failed to send email via SendGrid: {error}")
+        logger.debug("Email sent successfully via SendGrid to %s", to_email)
+
+    def send_batch(self, messages):
+        with time_send("sendgrid_batch"):
+            return send_email_batch_sendgrid(messages)
+
+    def rejects(self, error):
+        return is_recipient_error(error)
+
+
+class EmailRouter:
+    """Sends through the first configured provider whose breaker allows it, failing over down the list."""
+
+    def __init__(self, providers):
+        self.providers = {provider.name: provider for provider in providers}
+
+    def order(self):
+        """Configured providers in EMAIL_PROVIDERS order."""
+        raw = os.getenv("EMAIL_PROVIDERS")
+        names = [name.strip().lower() for name in raw.split(",") if name.strip()] if raw else DEFAULT_PROVIDER_ORDER
+        return [self.providers[name] for name in names if name in self.providers and self.providers[name].configured()]
+
+    def preferred(self):
+        """The provider the next message would most likely go to, or None if every breaker is open."""
+        for provider in self.order():
+            if provider.breaker.state != OPEN:
+                return provider
+        return None
+
+    def _record(self, provider, ok, error=None):
+        was_open = provider.breaker.state == OPEN
+        provider.breaker.record(ok, error)
+        snapshot = provider.breaker.snapshot()
+        metrics.provider_circuit_state.set(_STATE_VALUES.get(snapshot["state"], 0), provider=provider.name)
+        metrics.provider_error_rate.set(snapshot["error_rate"], provider=provider.name)
+        if snapshot["state"] == OPEN and not was_open:
+            logger.warning("Circuit for %s is open, retrying in %ss: %s", provider.name, snapshot["retry_in"], error,
+                           extra={"provider": provider.name, "error_rate": snapshot["error_rate"]})
+
+    def _send_each(self, provider, messages, pending, results, errors):
+        """Send `pending` one by one through `provider`; returns the ones it couldn't take."""
+        left = []
+        for n, i in enumerate(pending):
+            if not provider.breaker.allow():
+                errors[provider.name] = "circuit open"
+                return left + pending[n:]
+            m = messages[i]
+            try:
+                provider.send(m["to"], m["subject"], m["body"])
+            except RecipientRejected as e:
+                self._record(provider, True)
+                results[i] = str(e)
+            except Exception as e:
+                self._record(provider, False, str(e))
+                errors[provider.name] = str(e)
+                left.append(i)
+            else:
+                self._record(provider, True)
+        return left
+
+    def _send_batch(self, provider, messages, pending, results, errors):
+        """Send `pending` in one batch call through `provider`; returns the ones it couldn't take."""
+        if not provider.breaker.allow():
+            errors[provider.name] = "circuit open"
+            return pending
+        left = []
+        for i, error in zip(pending, provider.send_batch([messages[i] for i in pending])):
+            if error is None:
+                continue
+            if provider.rejects(error):
+                results[i] = error
+            else:
+                errors[provider.name] = error
+                left.append(i)
+        # The provider is healthy if it accepted (or knowingly refused) anything at all
+        self._record(provider, len(left) < len(pending), errors.get(provider.name) if left else None)
+        return left
+
+    def send_batch(self, messages):
+        """Send {to, subject, body} dicts; returns a list aligned with `messages`: None on success, else an error."""
+        results = [None] * len(messages)
+        pending = list(range(len(messages)))
+        errors = {}
+        for provider in self.order():
+            if not pending:
+                break
+            send = self._send_batch if provider.batches and len(pending) > 1 else self._send_each
+            pending = send(provider, messages, pending, results, errors)
+        if pending:
+            error = "; ".join(f"{name}: {e}" for name, e in errors.items()) or "No email provider configured"
+            if not errors:
+                logger.error(
+                    "Email not configured. Set SMTP_USER and SMTP_PASS (Gmail: generate an App Password) "
+                    "or SENDGRID_API_KEY in backend/.env. See EMAIL_SETUP.md for details."
+                )
+            for i in pending:
+                results[i] = error
+        return results
+
+    def health(self):
+        """Breaker snapshot per provider, in routing order; unconfigured providers are listed last."""
+        order = self.order()
+        health = {}
+        for rank, provider in enumerate(order + [p for p in self.providers.values() if p not in order]):
+            health[provider.name] = {"configured": provider in order, "priority": rank if provider in order else None,
+                                     **provider.breaker.snapshot()}
+        return health
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_email_router():
+    """Process-wide router; breakers live as long as the process."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = EmailRouter([SMTPProvider(), SendGridProvider()])
+        return _router
@@ -0,0 +1,94 @@
+"""
+Database-backed leases for running the scheduler in several processes/hosts.
+
+A lease is a row in `scheduler_leases` that one worker owns until
+`expires_at`. Acquiring is a single conditional UPDATE, so it is atomic on
+SQLite and Postgres alike; a worker that dies simply stops renewing and its
+lease is taken over once it expires.
+
+Configuration (ENV):
+    SCHEDULER_LEASE_SECONDS  lease lifetime, renewed between batches (default 300)
+"""
+from datetime import datetime, timedelta
+import os
+import socket
+import uuid
+
+from sqlalchemy import update, or_
+from sqlalchemy.exc import IntegrityError
+
+from .models import SchedulerLease
+
+_worker_ids = {}
+
+
+def get_worker_id():
+    """Identifies this process in lease and outbox claim rows.
+
+    Computed per pid so processes forked after import (uvicorn/gunicorn workers)
+    don't share their parent's identity.
+    """
+    pid = os.getpid()
+    if pid not in _worker_ids:
+        _worker_ids[pid] = f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}"
+    return _worker_ids[pid]
+
+
+def get_lease_seconds():
+    try:
+        return max(1, int(os.getenv("SCHEDULER_LEASE_SECONDS", 300)))
+    except ValueError:
+        return 300
+
+
+def _ensure_row(db, name):
+    if db.get(SchedulerLease, name) is not None:
+        return
+    try:
+        db.add(SchedulerLease(name=name))
+        db.commit()
+    except IntegrityError:
+        # another worker created it first
+        db.rollback()
+
+
+def try_acquire(db, name, owner=None, ttl=None, now=None):
+    """Take (or extend) lease `name` if it is free, expired or already ours. Returns True on success."""
+    owner = owner or get_worker_id()
+    now = now or datetime.utcnow()
+    ttl = ttl or get_lease_seconds()
+    _ensure_row(db, name)
+    result = db.execute(
+        update(SchedulerLease)
+        .where(
+            SchedulerLease.name == name,
+            or_(SchedulerLease.owner.is_(None), SchedulerLease.expires_at < now, SchedulerLease.owner == owner),
+        )
+        .values(owner=owner, expires_at=now + timedelta(seconds=ttl))
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def renew(db, name, owner=None, ttl=None, now=None):
+    """Extend a lease we still hold. Returns False if it was lost to another worker."""
+    owner = owner or get_worker_id()
+    now = now or datetime.utcnow()
+    ttl = ttl or get_lease_seconds()
+    result = db.execute(
+        update(SchedulerLease)
+        .where(SchedulerLease.name == name, SchedulerLease.owner == owner)
+        .values(expires_at=now + timedelta(seconds=ttl))
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def release(db, name, owner=None):
+    owner = owner or get_worker_id()
+    db.execute(
+        update(SchedulerLease)
+        .where(SchedulerLease.name == name, SchedulerLease.owner == owner)
+        .values(owner=None, expires_at=None)
+    )
+    db.commit()
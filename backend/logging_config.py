@@ -0,0 +1,183 @@
+"""
+Structured, non-blocking logging for the API, the scheduler and the outbox worker.
+
+Loggers only put records on a queue (QueueHandler); a QueueListener thread
+formats them as one JSON object per line and writes them to stderr, so a slow
+or backed-up log pipe never stalls a sweep or a request. When the queue is
+full records are dropped and counted rather than blocking the caller.
+
+Per-row events (one per email, per failed send) go through LogSampler, which
+logs the first few in full and folds the rest into one summary line per run.
+
+Configuration (ENV):
+    LOG_LEVEL         level for the backend.* loggers (default INFO)
+    LOG_LEVELS        per-module overrides, e.g. "backend.email_providers=DEBUG,backend.cache=WARNING"
+    LOG_FORMAT        json or text (default json)
+    LOG_QUEUE_SIZE    records buffered before new ones are dropped (default 10000)
+    LOG_SAMPLE_FIRST  per-row events logged in full per key and run (default 5)
+"""
+from collections import Counter
+from datetime import datetime, timezone
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+from . import metrics
+
+# Attributes every LogRecord has; anything else was passed via extra= and is logged as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(_fields(record))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local runs; extra fields are appended as key=value."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: a full queue drops the record and counts it."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message and traceback here (args may be mutated later), but leave
+        # the JSON formatting to the listener thread
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.log_records_dropped.inc()
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # The stop sentinel must not be dropped, so wait for room
+        self.queue.put(self._sentinel)
+
+
+_listener = None
+_handler = None
+_lock = threading.Lock()
+
+
+def _parse_levels(raw):
+    levels = {}
+    for part in (raw or "").split(","):
+        name, _, level = part.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(stream=None):
+    """Route the backend.* loggers through the queue; safe to call more than once."""
+    global _listener, _handler
+    with _lock:
+        if _listener is not None:
+            return
+        output = logging.StreamHandler(stream or sys.stderr)
+        if os.getenv("LOG_FORMAT", "json").lower() == "text":
+            output.setFormatter(TextFormatter())
+        else:
+            output.setFormatter(JsonFormatter())
+
+        _handler = DroppingQueueHandler(queue.Queue(max(1, _env_int("LOG_QUEUE_SIZE", 10000))))
+        _listener = _Listener(_handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+        root = logging.getLogger("backend")
+        root.addHandler(_handler)
+        root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        root.propagate = False
+        for name, level in _parse_levels(os.getenv("LOG_LEVELS")).items():
+            logging.getLogger(name).setLevel(level)
+
+
+def stop_logging():
+    """Flush everything still queued; called on shutdown and at exit."""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+        if _handler.dropped:
+            print(f"[Logging] dropped {_handler.dropped} record(s) because the queue was full", file=sys.stderr)
+
+
+class LogSampler:
+    """Log the first `first` events per key in full, count the rest, and summarize them in flush().
+
+    One sampler per run (sweep, outbox drain), so a run with 100k failures
+    writes a handful of examples plus one line of totals.
+    """
+
+    def __init__(self, logger, first=None):
+        self.logger = logger
+        self.first = _env_int("LOG_SAMPLE_FIRST", 5) if first is None else first
+        self.counts = Counter()
+
+    def log(self, level, key, msg, *args, **fields):
+        self.counts[key] += 1
+        if self.counts[key] <= self.first:
+            self.logger.log(level, msg, *args, extra=fields)
+
+    def flush(self, msg, *args, level=logging.INFO, **fields):
+        """Log `msg` with the event counts attached; notes how many events were not logged individually."""
+        suppressed = {key: n - self.first for key, n in self.counts.items() if n > self.first}
+        if self.counts:
+            fields["events"] = dict(self.counts)
+        if suppressed:
+            fields["suppressed"] = suppressed
+        self.logger.log(level, msg, *args, extra=fields)
+        self.counts.clear()
@@ -10,15 +10,82 @@ load_dotenv()
 # This allows 'from backend...' imports to work regardless of where the script is run from
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Before the other backend imports, so their import-time log lines aren't lost
+from backend.logging_config import configure_logging, stop_logging
+configure_logging()
+
+import time
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.database import Base, engine
+from backend import metrics
+from backend.database import engine, async_engine
+from backend.migrate import run_migrations
+from backend.smtp_pool import close_smtp_pools
+from backend.email_providers import get_email_router
+from backend.channels import CHANNELS, active_channels
+from backend.password_hasher import close_password_hasher
+from backend.cache import get_cache
+from backend.auth import cache_stats as auth_cache_stats
+from backend.reminder_job import start_scheduler, stop_scheduler
 from backend.routes.user_routes import router as user_router
 from backend.routes.subscription_routes import router as subscription_router
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 app = FastAPI(title="Subscription Reminder API")
 
+# SQL statement counts/durations, attributed to the request being served (if any)
+metrics.instrument_engine(engine)
+metrics.instrument_engine(async_engine.sync_engine)
+
+
+def _route_label(scope):
+    """The matched route's template, e.g. /subscription/delete/{subscription_id}.
+
+    Rebuilt from the path and its path params so prefixes of included routers
+    are kept; mounts (/static) collapse to one label and unknown paths to
+    "unmatched", so the label set stays bounded.
+    """
+    if scope.get("route") is None:
+        return scope["root_path"] + "/{path}" if scope.get("root_path") else "unmatched"
+    names = {str(value): name for name, value in scope.get("path_params", {}).items()}
+    return "/".join("{%s}" % names[part] if part in names else part for part in scope["path"].split("/"))
+
+
+class MetricsMiddleware:
+    """Per-route latency and SQL statement counts for /metrics.
+
+    Plain ASGI rather than BaseHTTPMiddleware so streamed responses (exports)
+    aren't buffered.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = metrics.RequestStats()
+        token = metrics.current_request.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.current_request.reset(token)
+            label = _route_label(scope)
+            metrics.http_request_duration.observe(time.perf_counter() - started, method=scope["method"],
+                                                  route=label, status=str(status))
+            metrics.db_queries_per_request.observe(stats.queries, route=label)
+            metrics.db_time_per_request.observe(stats.db_seconds, route=label)
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 app.mount("/static", StaticFiles(directory=os.path.join(BASE_DIR, "static")), name="static")
 
@@ -32,9 +99,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
-
-Base.metadata.create_all(bind=engine)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(user_router, prefix="/auth", tags=["auth"])
 app.include_router(subscription_router, prefix="/subscription", tags=["subscription"])
@@ -43,14 +110,39 @@ app.include_router(subscription_router, prefix="/subscription", tags=["subscript
 def root():
     return {"msg":"Subscription Reminder API running"}
 
+@app.get("/cache/stats")
+def cache_stats():
+    # Hit/miss counters for sizing CACHE_MAX_ENTRIES / CACHE_TTL
+    return {"read_cache": get_cache().stats, "auth": auth_cache_stats()}
+
+@app.get("/providers/health")
+def provider_health():
+    # Circuit breaker state and rolling error rate per email provider (this process only),
+    # and each alert channel's limits
+    active = {c.name for c in active_channels()}
+    channels = {name: {"active": name in active, **c.describe()} for name, c in CHANNELS.items()}
+    return {"email": get_email_router().health(), "channels": channels}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    # Prometheus text exposition format; values are per process
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.on_event("startup")
 async def startup_event():
-    # Placeholder for startup tasks (e.g., scheduler)
-    return None
+    # Bring the schema up to date (set AUTO_MIGRATE=false to run `python -m backend.migrate` yourself).
+    # Workers starting together queue on a database lock, so only the first one migrates.
+    if os.getenv("AUTO_MIGRATE", "true").lower() == "true":
+        run_migrations()
+    # Every worker process may run the scheduler; shards are split via leases
+    if os.getenv("ENABLE_SCHEDULER", "false").lower() == "true":
+        start_scheduler()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    # Placeholder for shutdown tasks
-    return None
+    stop_scheduler()
+    close_smtp_pools()
+    close_password_hasher()
+    stop_logging()
 
@@ -0,0 +1,241 @@
+"""
+Process-local metrics rendered in the Prometheus text exposition format (GET /metrics).
+
+A minimal Counter / Gauge / Histogram registry, so the API, the scheduler and
+the outbox worker can be scraped without extra dependencies. Values are per
+process; scrape every worker (or sum in Prometheus) when running several.
+
+Per-request database statistics: main.py's middleware opens a RequestStats in
+a context variable, and the engine hooks installed by instrument_engine() add
+every statement's count and duration to it.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+import contextvars
+from datetime import datetime
+import logging
+import threading
+import time
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Seconds; tuned for API requests, SQL statements and SMTP/HTTP sends alike
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self, key, state):
+        counts, total, count = state
+        lines, cumulative = [], 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(bound))])} {cumulative}")
+        lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', '+Inf')])} {count}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+REGISTRY = []
+
+def render():
+    """All metrics in Prometheus text format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Metrics used across the app --------------------------------------------
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "API request latency by route template",
+    ["method", "route", "status"])
+db_queries_per_request = Histogram(
+    "http_request_db_queries", "SQL statements executed while serving one request",
+    ["route"], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500))
+db_time_per_request = Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements while serving one request", ["route"])
+db_query_duration = Histogram(
+    "db_query_duration_seconds", "SQL statement latency by statement kind", ["kind"])
+
+scheduler_run_duration = Histogram(
+    "scheduler_run_duration_seconds", "Wall time of scheduler jobs", ["job"])
+scheduler_rows_scanned = Counter(
+    "scheduler_rows_scanned_total", "Due (subscription, offset, channel) rows found by sweeps")
+scheduler_alerts = Counter(
+    "scheduler_alerts_total", "Alerts by outcome: queued/skipped by the sweep, sent/failed by the outbox worker",
+    ["outcome"])
+scheduler_last_run = Gauge(
+    "scheduler_last_run_timestamp_seconds", "Unix time the job last finished", ["job"])
+rate_limit_wait = Counter(
+    "outbox_rate_limit_wait_seconds_total", "Time the outbox worker waited on OUTBOX_RATE_PER_MINUTE")
+log_records_dropped = Counter(
+    "log_records_dropped_total", "Log records dropped because the logging queue was full")
+send_duration = Histogram(
+    "alert_send_duration_seconds", "Latency of one provider call (a SendGrid batch counts once) by outcome",
+    ["provider", "outcome"])
+provider_circuit_state = Gauge(
+    "provider_circuit_state", "Circuit breaker per provider: 0 closed, 1 half-open, 2 open", ["provider"])
+provider_error_rate = Gauge(
+    "provider_error_rate", "Share of failed calls per provider over the breaker's rolling window", ["provider"])
+
+
+@contextmanager
+def time_send(provider):
+    """Observe the wrapped provider call in alert_send_duration_seconds; outcome is ok or error."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        send_duration.observe(time.perf_counter() - started, provider=provider, outcome=outcome)
+
+
+def record_run(session_factory, job, started_at, duration, counts, error=None):
+    """Publish one scheduler job's numbers and append them to the scheduler_runs table.
+
+    `counts` may hold rows_scanned, queued, skipped, sent and failed; missing keys
+    count as 0. A failure to write the history row is logged, never raised.
+    """
+    from .models import SchedulerRun
+    from .leases import get_worker_id
+
+    numbers = {key: counts.get(key, 0) for key in ("rows_scanned", "queued", "skipped", "sent", "failed")}
+    scheduler_run_duration.observe(duration, job=job)
+    scheduler_last_run.set(time.time(), job=job)
+    scheduler_rows_scanned.inc(numbers["rows_scanned"])
+    for outcome in ("queued", "skipped", "sent", "failed"):
+        if numbers[outcome]:
+            scheduler_alerts.inc(numbers[outcome], outcome=outcome)
+
+    db = session_factory()
+    try:
+        db.add(SchedulerRun(job=job, worker_id=get_worker_id(), started_at=started_at,
+                            finished_at=datetime.utcnow(), duration_ms=int(duration * 1000),
+                            error=error[:1000] if error else None, **numbers))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning("Could not record %s run: %s", job, e)
+    finally:
+        db.close()
+
+
+# --- Per-request database statistics ----------------------------------------
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    db_query_duration.observe(elapsed, kind=statement.lstrip().split(None, 1)[0].lower())
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+def _on_error(context):
+    # The statement failed, so after_cursor_execute won't pop its start time
+    started = context.connection.info.get("query_started")
+    if started:
+        started.pop()
+
+def instrument_engine(engine):
+    """Time and count every statement run on `engine` (pass async_engine.sync_engine for async)."""
+    event.listen(engine, "before_cursor_execute", _before_execute)
+    event.listen(engine, "after_cursor_execute", _after_execute)
+    event.listen(engine, "handle_error", _on_error)
@@ -0,0 +1,112 @@
+"""
+Versioned schema migrations (Alembic).
+
+Usage from the project root:
+    python -m backend.migrate                 # upgrade to the latest revision
+    python -m backend.migrate upgrade <rev>
+    python -m backend.migrate downgrade <rev>
+    python -m backend.migrate current
+    python -m backend.migrate revision -m "add something"
+
+Revisions live in backend/migrations/versions. They check the live schema
+before changing it, so they apply cleanly to existing subscriptions.db files
+made by the old create_all() call or the one-off migrate_add_*.py scripts.
+
+Upgrades run in a single transaction that first takes a database-wide lock
+(pg_advisory_xact_lock on Postgres, BEGIN EXCLUSIVE on SQLite). When several
+API workers start at once and each runs the upgrade (AUTO_MIGRATE), one
+migrates and the rest wait for it, then find the schema at head and do
+nothing. On SQLite they wait up to MIGRATION_LOCK_TIMEOUT seconds (default 600).
+"""
+import os
+import sys
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import event, pool, text
+from sqlalchemy.engine import make_url
+
+from .database import SQLALCHEMY_DATABASE_URL, make_engine
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Arbitrary application-wide key for pg_advisory_xact_lock
+MIGRATION_LOCK_KEY = 720_401_001
+
+
+def get_config(url=None):
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "migrations"))
+    if url:
+        config.set_main_option("sqlalchemy.url", url)
+    return config
+
+
+def _migration_lock_timeout():
+    try:
+        return max(1, int(os.getenv("MIGRATION_LOCK_TIMEOUT", 600)))
+    except ValueError:
+        return 600
+
+
+def _migration_engine(url):
+    url = make_url(url)
+    engine = make_engine(url, poolclass=pool.NullPool)
+    if url.get_backend_name() != "sqlite":
+        return engine
+
+    @event.listens_for(engine, "connect")
+    def _manual_transactions(dbapi_connection, connection_record):
+        # pysqlite would commit before every DDL statement; with our own BEGIN the upgrade is one transaction
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute(f"PRAGMA busy_timeout={_migration_lock_timeout() * 1000}")
+
+    @event.listens_for(engine, "begin")
+    def _begin_exclusive(connection):
+        connection.exec_driver_sql("BEGIN EXCLUSIVE")
+
+    return engine
+
+
+def _upgrade(config, revision):
+    """command.upgrade in one transaction, holding the migration lock."""
+    engine = _migration_engine(config.get_main_option("sqlalchemy.url") or SQLALCHEMY_DATABASE_URL)
+    try:
+        with engine.begin() as connection:
+            if connection.dialect.name == "postgresql":
+                connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            config.attributes["connection"] = connection
+            command.upgrade(config, revision)
+    finally:
+        config.attributes.pop("connection", None)
+        engine.dispose()
+
+
+def run_migrations(url=None, revision="head"):
+    """Upgrade the database to `revision`; safe to call on every startup, from many processes at once."""
+    config = get_config(url)
+    # Keep the app's logging setup; alembic.ini would otherwise reconfigure the root logger
+    config.attributes["configure_logger"] = False
+    _upgrade(config, revision)
+
+
+def main(argv):
+    config = get_config()
+    action = argv[0] if argv else "upgrade"
+    if action == "upgrade":
+        _upgrade(config, argv[1] if len(argv) > 1 else "head")
+    elif action == "downgrade":
+        command.downgrade(config, argv[1] if len(argv) > 1 else "-1")
+    elif action == "current":
+        command.current(config, verbose=True)
+    elif action == "history":
+        command.history(config)
+    elif action == "revision":
+        message = argv[argv.index("-m") + 1] if "-m" in argv else None
+        command.revision(config, message=message)
+    else:
+        sys.exit(f"Unknown command '{action}'. Use upgrade, downgrade, current, history or revision.")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
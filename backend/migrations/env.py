@@ -0,0 +1,56 @@
+from logging.config import fileConfig
+import os
+import sys
+
+from alembic import context
+from sqlalchemy import pool
+
+# Allow 'from backend...' imports regardless of where alembic is run from
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.database import Base, SQLALCHEMY_DATABASE_URL, make_engine  # noqa: E402
+from backend import models  # noqa: E402,F401  (registers tables on Base.metadata)
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+if not config.get_main_option("sqlalchemy.url"):
+    config.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connectable = config.attributes.get("connection")
+    if connectable is None:
+        # Same pragmas (busy_timeout, WAL) as the app so migrations wait for locks politely
+        connectable = make_engine(config.get_main_option("sqlalchemy.url"), poolclass=pool.NullPool)
+        with connectable.connect() as connection:
+            _run(connection)
+    else:
+        _run(connectable)
+
+
+def _run(connection):
+    # render_as_batch lets ALTERs that SQLite can't do natively run as table copies
+    context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
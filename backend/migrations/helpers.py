@@ -0,0 +1,20 @@
+"""Schema checks so revisions can be applied to databases that were created
+by Base.metadata.create_all or the old one-off migrate_add_*.py scripts."""
+from alembic import op
+import sqlalchemy as sa
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def has_table(table):
+    return _inspector().has_table(table)
+
+
+def has_column(table, column):
+    return has_table(table) and column in {c["name"] for c in _inspector().get_columns(table)}
+
+
+def has_index(table, index):
+    return has_table(table) and index in {i["name"] for i in _inspector().get_indexes(table)}
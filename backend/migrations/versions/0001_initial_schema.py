@@ -0,0 +1,59 @@
+"""initial schema: users, subscriptions, alert_logs
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.migrations.helpers import has_table
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created by the old create_all() call already have these tables
+    if not has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+            sa.Column("phone", sa.String(), nullable=True),
+            sa.Column("email_alerts_enabled", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if not has_table("subscriptions"):
+        op.create_table(
+            "subscriptions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("renewal_date", sa.Date(), nullable=False),
+            sa.Column("note", sa.String(), nullable=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        )
+        op.create_index("ix_subscriptions_id", "subscriptions", ["id"])
+
+    if not has_table("alert_logs"):
+        op.create_table(
+            "alert_logs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("subscription_id", sa.Integer(), sa.ForeignKey("subscriptions.id"), nullable=False),
+            sa.Column("offset", sa.Integer(), nullable=False),
+            sa.Column("channel", sa.String(), nullable=False),
+            sa.Column("sent_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_alert_logs_id", "alert_logs", ["id"])
+
+
+def downgrade():
+    op.drop_table("alert_logs")
+    op.drop_table("subscriptions")
+    op.drop_table("users")
@@ -0,0 +1,27 @@
+"""add subscriptions.start_date
+
+Replaces migrate_add_start_date.py.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.migrations.helpers import has_column
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_column("subscriptions", "start_date"):
+        op.add_column("subscriptions", sa.Column("start_date", sa.Date(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("subscriptions") as batch:
+        batch.drop_column("start_date")
@@ -0,0 +1,63 @@
+"""add outbox and scheduler_leases tables
+
+Replaces migrate_add_outbox_claims.py (and the outbox half of
+migrate_add_email_digest.py) for databases where create_all already made
+an older outbox table.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.migrations.helpers import has_table, has_column
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_table("outbox"):
+        op.create_table(
+            "outbox",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("subscription_id", sa.Integer(), sa.ForeignKey("subscriptions.id"), nullable=False),
+            sa.Column("offset", sa.Integer(), nullable=False),
+            sa.Column("channel", sa.String(), nullable=False),
+            sa.Column("recipient", sa.String(), nullable=False),
+            sa.Column("subject", sa.String(), nullable=False),
+            sa.Column("body", sa.String(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("next_attempt_at", sa.DateTime(), nullable=True),
+            sa.Column("claimed_at", sa.DateTime(), nullable=True),
+            sa.Column("claimed_by", sa.String(), nullable=True),
+            sa.Column("digest_key", sa.String(), nullable=True),
+            sa.Column("last_error", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("sent_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_outbox_id", "outbox", ["id"])
+        op.create_index("ix_outbox_status", "outbox", ["status"])
+        op.create_index("ix_outbox_next_attempt_at", "outbox", ["next_attempt_at"])
+        op.create_index("ix_outbox_digest_key", "outbox", ["digest_key"])
+    else:
+        for column in ("claimed_by", "digest_key"):
+            if not has_column("outbox", column):
+                op.add_column("outbox", sa.Column(column, sa.String(), nullable=True))
+
+    if not has_table("scheduler_leases"):
+        op.create_table(
+            "scheduler_leases",
+            sa.Column("name", sa.String(), primary_key=True),
+            sa.Column("owner", sa.String(), nullable=True),
+            sa.Column("expires_at", sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade():
+    op.drop_table("scheduler_leases")
+    op.drop_table("outbox")
@@ -0,0 +1,86 @@
+"""add users.email_digest_enabled and the materialized alert schedule
+
+Replaces migrate_add_email_digest.py and migrate_add_alert_schedule.py.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from datetime import date, datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+from backend.migrations.helpers import has_column, has_index
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# Frozen copy of the schedule as of this revision, so the migration gives the same result whatever the app
+# code or ALERT_OFFSETS look like when it runs; `python -m backend.alert_schedule` recomputes with today's rules
+ALERT_OFFSETS = [30, 25, 20, 10]
+BATCH_SIZE = 1000
+
+
+def _next_alert(renewal_date, today):
+    for offset in ALERT_OFFSETS:
+        alert_date = renewal_date - timedelta(days=offset)
+        if alert_date >= today:
+            return alert_date, offset
+    return None, None
+
+
+def upgrade():
+    if not has_column("users", "email_digest_enabled"):
+        op.add_column("users", sa.Column("email_digest_enabled", sa.Boolean(), nullable=True,
+                                         server_default=sa.false()))
+
+    if not has_column("subscriptions", "next_alert_at"):
+        op.add_column("subscriptions", sa.Column("next_alert_at", sa.Date(), nullable=True))
+        op.add_column("subscriptions", sa.Column("next_alert_offset", sa.Integer(), nullable=True))
+
+        subscriptions = sa.table(
+            "subscriptions",
+            sa.column("id", sa.Integer()),
+            sa.column("renewal_date", sa.Date()),
+            sa.column("next_alert_at", sa.Date()),
+            sa.column("next_alert_offset", sa.Integer()),
+        )
+        bind = op.get_bind()
+        update = (
+            subscriptions.update()
+            .where(subscriptions.c.id == sa.bindparam("sid"))
+            .values(next_alert_at=sa.bindparam("next_at"), next_alert_offset=sa.bindparam("next_offset"))
+        )
+        today = datetime.utcnow().date()
+        last_id = None
+        # Keyset batches by id, so memory stays flat however many subscriptions there are
+        while True:
+            stmt = sa.select(subscriptions.c.id, subscriptions.c.renewal_date).order_by(subscriptions.c.id)
+            if last_id is not None:
+                stmt = stmt.where(subscriptions.c.id > last_id)
+            rows = bind.execute(stmt.limit(BATCH_SIZE)).all()
+            if not rows:
+                break
+            params = []
+            for sub_id, renewal_date in rows:
+                if isinstance(renewal_date, str):
+                    renewal_date = date.fromisoformat(renewal_date)
+                next_at, next_offset = _next_alert(renewal_date, today)
+                params.append({"sid": sub_id, "next_at": next_at, "next_offset": next_offset})
+            bind.execute(update, params)
+            last_id = rows[-1][0]
+
+    if not has_index("subscriptions", "ix_subscriptions_next_alert_at"):
+        op.create_index("ix_subscriptions_next_alert_at", "subscriptions", ["next_alert_at"])
+
+
+def downgrade():
+    op.drop_index("ix_subscriptions_next_alert_at", table_name="subscriptions")
+    with op.batch_alter_table("subscriptions") as batch:
+        batch.drop_column("next_alert_offset")
+        batch.drop_column("next_alert_at")
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("email_digest_enabled")
@@ -0,0 +1,45 @@
+"""add lookup indexes and the alert_logs dedup constraint
+
+- subscriptions(user_id, renewal_date) for per-user listing
+- subscriptions(renewal_date)
+- outbox(subscription_id, offset, channel) for the sweep's anti-join
+- outbox(status, next_attempt_at) for worker claims
+- UNIQUE alert_logs(subscription_id, offset, channel) so recording a sent
+  alert is a constraint-backed upsert
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+from backend.migrations.helpers import has_index
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_subscriptions_user_renewal", "subscriptions", ["user_id", "renewal_date"], False),
+    ("ix_subscriptions_renewal_date", "subscriptions", ["renewal_date"], False),
+    ("ix_outbox_dedup", "outbox", ["subscription_id", "offset", "channel"], False),
+    ("ix_outbox_claim", "outbox", ["status", "next_attempt_at"], False),
+    ("ux_alert_logs_dedup", "alert_logs", ["subscription_id", "offset", "channel"], True),
+]
+
+
+def upgrade():
+    # Older databases may hold duplicate alert logs from the pre-constraint race; keep the first of each
+    op.execute(
+        'DELETE FROM alert_logs WHERE id NOT IN ('
+        'SELECT MIN(id) FROM alert_logs GROUP BY subscription_id, "offset", channel)'
+    )
+    for name, table, columns, unique in INDEXES:
+        if not has_index(table, name):
+            op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,32 @@
+"""add users.subscriptions_version and the name sort index for /subscription/list
+
+- users.subscriptions_version: bumped on every subscription write, used as the list ETag
+- subscriptions(user_id, name) for name-sorted and name-prefix keyset pages
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.migrations.helpers import has_column, has_index
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_column("users", "subscriptions_version"):
+        op.add_column("users", sa.Column("subscriptions_version", sa.Integer(), nullable=False,
+                                         server_default="0"))
+    if not has_index("subscriptions", "ix_subscriptions_user_name"):
+        op.create_index("ix_subscriptions_user_name", "subscriptions", ["user_id", "name"])
+
+
+def downgrade():
+    op.drop_index("ix_subscriptions_user_name", table_name="subscriptions")
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("subscriptions_version")
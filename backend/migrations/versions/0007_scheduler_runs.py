@@ -0,0 +1,42 @@
+"""add scheduler_runs history table
+
+One row per sweep / outbox drain with the same numbers GET /metrics exposes.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.migrations.helpers import has_table
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_table("scheduler_runs"):
+        op.create_table(
+            "scheduler_runs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("job", sa.String(), nullable=False),
+            sa.Column("worker_id", sa.String(), nullable=True),
+            sa.Column("started_at", sa.DateTime(), nullable=False),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+            sa.Column("duration_ms", sa.Integer(), nullable=False),
+            sa.Column("rows_scanned", sa.Integer(), nullable=False),
+            sa.Column("queued", sa.Integer(), nullable=False),
+            sa.Column("skipped", sa.Integer(), nullable=False),
+            sa.Column("sent", sa.Integer(), nullable=False),
+            sa.Column("failed", sa.Integer(), nullable=False),
+            sa.Column("error", sa.String(), nullable=True),
+        )
+        op.create_index("ix_scheduler_runs_id", "scheduler_runs", ["id"])
+        op.create_index("ix_scheduler_runs_started_at", "scheduler_runs", ["started_at"])
+
+
+def downgrade():
+    op.drop_table("scheduler_runs")
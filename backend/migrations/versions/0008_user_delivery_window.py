@@ -0,0 +1,33 @@
+"""add per-user timezone and send window
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.migrations.helpers import has_column
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    ("timezone", sa.String()),
+    ("send_window_start", sa.Integer()),
+    ("send_window_end", sa.Integer()),
+]
+
+
+def upgrade():
+    for name, type_ in COLUMNS:
+        if not has_column("users", name):
+            op.add_column("users", sa.Column(name, type_, nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch:
+        for name, _ in reversed(COLUMNS):
+            batch.drop_column(name)
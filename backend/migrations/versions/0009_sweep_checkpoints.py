@@ -0,0 +1,31 @@
+"""add sweep_checkpoints for resuming interrupted sweeps
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.migrations.helpers import has_table
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_table("sweep_checkpoints"):
+        op.create_table(
+            "sweep_checkpoints",
+            sa.Column("name", sa.String(), primary_key=True),
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("last_alert_at", sa.Date(), nullable=True),
+            sa.Column("last_subscription_id", sa.Integer(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade():
+    op.drop_table("sweep_checkpoints")
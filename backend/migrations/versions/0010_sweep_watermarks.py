@@ -0,0 +1,29 @@
+"""add sweep_watermarks so missed sweep days can be caught up
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.migrations.helpers import has_table
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_table("sweep_watermarks"):
+        op.create_table(
+            "sweep_watermarks",
+            sa.Column("name", sa.String(), primary_key=True),
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade():
+    op.drop_table("sweep_watermarks")
@@ -0,0 +1,41 @@
+"""add alert_offsets and the per-user / per-subscription custom_alert_offsets flags
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.migrations.helpers import has_column, has_table
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ("users", "subscriptions"):
+        if not has_column(table, "custom_alert_offsets"):
+            op.add_column(table, sa.Column("custom_alert_offsets", sa.Boolean(), nullable=False,
+                                           server_default=sa.false()))
+
+    if not has_table("alert_offsets"):
+        op.create_table(
+            "alert_offsets",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("subscription_id", sa.Integer(), sa.ForeignKey("subscriptions.id"), nullable=True),
+            sa.Column("offset", sa.Integer(), nullable=False),
+        )
+        op.create_index("ix_alert_offsets_id", "alert_offsets", ["id"])
+        op.create_index("ix_alert_offsets_user", "alert_offsets", ["user_id", "subscription_id"])
+        op.create_index("ix_alert_offsets_subscription", "alert_offsets", ["subscription_id"])
+
+
+def downgrade():
+    op.drop_table("alert_offsets")
+    for table in ("subscriptions", "users"):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("custom_alert_offsets")
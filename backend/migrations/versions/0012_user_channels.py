@@ -0,0 +1,33 @@
+"""add per-user WhatsApp / SMS switches and webhook_url
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.migrations.helpers import has_column
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_column("users", "whatsapp_alerts_enabled"):
+        op.add_column("users", sa.Column("whatsapp_alerts_enabled", sa.Boolean(), nullable=False,
+                                         server_default=sa.true()))
+    if not has_column("users", "sms_alerts_enabled"):
+        op.add_column("users", sa.Column("sms_alerts_enabled", sa.Boolean(), nullable=False,
+                                         server_default=sa.false()))
+    if not has_column("users", "webhook_url"):
+        op.add_column("users", sa.Column("webhook_url", sa.String(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("webhook_url")
+        batch.drop_column("sms_alerts_enabled")
+        batch.drop_column("whatsapp_alerts_enabled")
@@ -0,0 +1,40 @@
+"""delete alert_offsets, alert_logs and outbox rows along with their subscription
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+TABLES = ("alert_offsets", "alert_logs", "outbox")
+
+# SQLite reports its foreign keys without names; this gives batch mode one to drop them by
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def _replace_subscription_fk(table, ondelete):
+    fks = [fk for fk in sa.inspect(op.get_bind()).get_foreign_keys(table)
+           if fk["referred_table"] == "subscriptions"]
+    if [fk["options"].get("ondelete") for fk in fks] == [ondelete]:
+        return
+    name = f"fk_{table}_subscription_id_subscriptions"
+    with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch:
+        for fk in fks:
+            batch.drop_constraint(fk["name"] or name, type_="foreignkey")
+        batch.create_foreign_key(name, "subscriptions", ["subscription_id"], ["id"], ondelete=ondelete)
+
+
+def upgrade():
+    for table in TABLES:
+        _replace_subscription_fk(table, "CASCADE")
+
+
+def downgrade():
+    for table in TABLES:
+        _replace_subscription_fk(table, None)
@@ -0,0 +1,29 @@
+"""add rate_limits for the outbox send budget shared by every worker
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.migrations.helpers import has_table
+
+revision = "0014"
+down_revision = "0013"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_table("rate_limits"):
+        op.create_table(
+            "rate_limits",
+            sa.Column("name", sa.String(), primary_key=True),
+            sa.Column("tokens", sa.Float(), nullable=False),
+            sa.Column("updated_at", sa.Float(), nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table("rate_limits")
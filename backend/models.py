@@ -1,5 +1,5 @@
 
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Boolean, DateTime, Float, Index, false, true
 from sqlalchemy.orm import relationship
 from .database import Base
 from datetime import datetime
@@ -11,25 +11,150 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     phone = Column(String, nullable=True)
     email_alerts_enabled = Column(Boolean, default=True)
+    email_digest_enabled = Column(Boolean, default=False)  # one combined email per sweep
+    subscriptions_version = Column(Integer, nullable=False, default=0, server_default="0")  # bumped on every subscription write
+    # Delivery preferences (see delivery_window.py); NULL means the DEFAULT_* settings
+    timezone = Column(String, nullable=True)  # IANA name, e.g. Europe/Berlin
+    send_window_start = Column(Integer, nullable=True)  # local hour 0-23
+    send_window_end = Column(Integer, nullable=True)  # local hour 0-24
+    # Alert offsets (see alert_schedule.py): the user's alert_offsets rows if set, else ALERT_OFFSETS
+    custom_alert_offsets = Column(Boolean, nullable=False, default=False, server_default=false())
+    # Other channels (see channels.py); WhatsApp and SMS go to `phone`
+    whatsapp_alerts_enabled = Column(Boolean, nullable=False, default=True, server_default=true())
+    sms_alerts_enabled = Column(Boolean, nullable=False, default=False, server_default=false())
+    webhook_url = Column(String, nullable=True)  # alerts are POSTed here as JSON when set
     created_at = Column(DateTime, default=datetime.utcnow)
 
     subscriptions = relationship("Subscription", back_populates="owner")
 
 class Subscription(Base):
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        Index("ix_subscriptions_user_renewal", "user_id", "renewal_date"),
+        Index("ix_subscriptions_renewal_date", "renewal_date"),
+        Index("ix_subscriptions_user_name", "user_id", "name"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     renewal_date = Column(Date, nullable=False)
     note = Column(String, nullable=True)
+    start_date = Column(Date, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"))
+    # Materialized schedule, maintained by alert_schedule.py
+    next_alert_at = Column(Date, nullable=True, index=True)
+    next_alert_offset = Column(Integer, nullable=True)
+    # Its own alert_offsets rows (possibly none, i.e. no reminders) instead of the owner's default
+    custom_alert_offsets = Column(Boolean, nullable=False, default=False, server_default=false())
 
     owner = relationship("User", back_populates="subscriptions")
+    offset_rows = relationship("AlertOffset", lazy="selectin", viewonly=True)
+
+    @property
+    def alert_offsets(self):
+        """This subscription's own offsets, largest first, or None when it uses its owner's default."""
+        if not self.custom_alert_offsets:
+            return None
+        return sorted((row.offset for row in self.offset_rows), reverse=True)
+
+
+class AlertOffset(Base):
+    """One reminder, `offset` days before renewal: a user's default (no subscription_id) or one subscription's own."""
+    __tablename__ = "alert_offsets"
+    __table_args__ = (
+        Index("ix_alert_offsets_user", "user_id", "subscription_id"),
+        Index("ix_alert_offsets_subscription", "subscription_id"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    subscription_id = Column(Integer, ForeignKey("subscriptions.id", ondelete="CASCADE"), nullable=True)
+    offset = Column(Integer, nullable=False)
 
 
 class AlertLog(Base):
     __tablename__ = "alert_logs"
+    __table_args__ = (
+        # One log per alert; recording is an insert-or-ignore against this
+        Index("ux_alert_logs_dedup", "subscription_id", "offset", "channel", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    subscription_id = Column(Integer, ForeignKey("subscriptions.id"), nullable=False)
+    subscription_id = Column(Integer, ForeignKey("subscriptions.id", ondelete="CASCADE"), nullable=False)
     offset = Column(Integer, nullable=False)  # days before renewal when alert was sent
-    channel = Column(String, nullable=False)  # 'email' or 'whatsapp'
+    channel = Column(String, nullable=False)  # a channels.CHANNELS name: email, whatsapp, sms, webhook
     sent_at = Column(DateTime, default=datetime.utcnow)
+
+
+class Outbox(Base):
+    """Pending alert deliveries written by the scheduler sweep and drained by outbox_worker."""
+    __tablename__ = "outbox"
+    __table_args__ = (
+        Index("ix_outbox_dedup", "subscription_id", "offset", "channel"),
+        Index("ix_outbox_claim", "status", "next_attempt_at"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    subscription_id = Column(Integer, ForeignKey("subscriptions.id", ondelete="CASCADE"), nullable=False)
+    offset = Column(Integer, nullable=False)
+    channel = Column(String, nullable=False)  # a channels.CHANNELS name: email, whatsapp, sms, webhook
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending", index=True)  # pending, sending, sent, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, index=True)
+    claimed_at = Column(DateTime, nullable=True)
+    claimed_by = Column(String, nullable=True)  # leases.get_worker_id() of the process sending it
+    digest_key = Column(String, nullable=True, index=True)  # rows sharing a key are sent as one digest email
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+
+class SchedulerLease(Base):
+    """Time-limited lock rows so several scheduler processes can split work (see leases.py)."""
+    __tablename__ = "scheduler_leases"
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+
+
+class RateLimit(Base):
+    """Tokens of a token bucket shared by every process (see token_bucket.SharedTokenBucket)."""
+    __tablename__ = "rate_limits"
+    name = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)  # may go negative: debt left by a take() larger than the bucket
+    updated_at = Column(Float, nullable=False)  # epoch seconds of the last refill
+
+
+class SweepCheckpoint(Base):
+    """Where an unfinished sweep of one shard got to, so a restarted run resumes there (see reminder_job.py)."""
+    __tablename__ = "sweep_checkpoints"
+    name = Column(String, primary_key=True)  # sweep:<shard>/<shards>
+    day = Column(Date, nullable=False)  # the sweep's `today`; older checkpoints are ignored
+    # Key of the last committed chunk, in the sweep's (next_alert_at, id) order
+    last_alert_at = Column(Date, nullable=True)
+    last_subscription_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class SweepWatermark(Base):
+    """Latest day each sweep shard has fully processed; `python -m backend.reminder_job catch-up` starts after it."""
+    __tablename__ = "sweep_watermarks"
+    name = Column(String, primary_key=True)  # sweep:<shard>/<shards>
+    day = Column(Date, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class SchedulerRun(Base):
+    """One row per sweep / outbox drain, written by metrics.record_run."""
+    __tablename__ = "scheduler_runs"
+    id = Column(Integer, primary_key=True, index=True)
+    job = Column(String, nullable=False)  # 'sweep' or 'outbox'
+    worker_id = Column(String, nullable=True)
+    started_at = Column(DateTime, nullable=False, index=True)
+    finished_at = Column(DateTime, nullable=True)
+    duration_ms = Column(Integer, nullable=False, default=0)
+    rows_scanned = Column(Integer, nullable=False, default=0)  # due alerts found by the sweep
+    queued = Column(Integer, nullable=False, default=0)
+    skipped = Column(Integer, nullable=False, default=0)  # due but not queued; retried next sweep
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)  # retried or dead-lettered sends
+    error = Column(String, nullable=True)
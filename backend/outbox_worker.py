@@ -0,0 +1,397 @@
+"""
+Outbox delivery worker.
+
+The scheduler sweep only writes pending rows to the `outbox` table; this module
+drains them so a slow provider never stalls the sweep. Each round is fanned
+out to every channel at once (channels.py), each on its own thread pool
+sized by the channel's concurrency and sending in its batch size, so a
+user's email and WhatsApp reminders leave together and a slow webhook only
+holds up webhooks.
+
+Row lifecycle:
+    pending -> sending -> sent
+                       -> pending (retry with exponential backoff)
+                       -> dead    (after OUTBOX_MAX_ATTEMPTS failures)
+    dead -> pending  (requeue_dead(), once the cause is fixed)
+
+The sweep never queues an alert again while its row is in the outbox, dead
+or not, so dead-lettered alerts are only sent if they are re-driven:
+
+    python -m backend.outbox_worker requeue-dead [--channel email] [--since 2026-10-01]
+
+Sent and dead rows are deleted by prune_outbox() (run hourly by the scheduler)
+once they are OUTBOX_RETENTION_DAYS old; alert_logs keeps the sent ones from
+being queued again.
+
+Rows left in `sending` by a crashed process are picked up again once
+OUTBOX_CLAIM_TIMEOUT seconds have passed. Claims are a single conditional
+UPDATE tagged with this process's worker id, so several processes can drain
+the same outbox without sending a row twice.
+
+Configuration (ENV):
+    OUTBOX_CONCURRENCY     email threads sending in parallel (default 4); other channels
+                           use CHANNEL_<NAME>_CONCURRENCY (see channels.py)
+    OUTBOX_BATCH_SIZE      rows claimed per round (default 100)
+    OUTBOX_MAX_ATTEMPTS    attempts before a row is dead-lettered (default 5)
+    OUTBOX_BACKOFF_SECONDS base retry delay, doubled per attempt (default 60)
+    OUTBOX_MAX_BACKOFF     cap on the retry delay in seconds (default 3600)
+    OUTBOX_CLAIM_TIMEOUT   seconds before a `sending` row is reclaimed (default 600)
+    OUTBOX_POLL_SECONDS    how often the scheduler drains the outbox (default 30)
+    OUTBOX_RATE_PER_MINUTE messages sent per minute at most, by all workers together (default 0 = unlimited)
+    OUTBOX_RETENTION_DAYS  days sent and dead rows are kept (default 30; 0 keeps them forever)
+
+With a rate budget, rounds are cut to five seconds' worth of messages and each
+round waits on a token bucket kept in the database (rate_limits), so sends
+leave at a steady pace however many processes drain the outbox; a digest
+counts as one message.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+import argparse
+import logging
+import os
+import time
+
+from sqlalchemy import select, update, delete, or_, and_, func
+from sqlalchemy.orm import sessionmaker
+
+from .database import SessionLocal, insert_ignore_duplicates
+from .models import Outbox, AlertLog
+from .channels import CHANNELS, get_channel
+from .reminder_messages import build_digest_message
+from .leases import get_worker_id
+from .token_bucket import SharedTokenBucket
+from .logging_config import LogSampler
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+def get_concurrency():
+    return max(1, _env_int("OUTBOX_CONCURRENCY", 4))
+
+def get_poll_seconds():
+    return max(1, _env_int("OUTBOX_POLL_SECONDS", 30))
+
+def get_rate_limiter(session_factory=SessionLocal):
+    """SharedTokenBucket for OUTBOX_RATE_PER_MINUTE, or None when unlimited.
+
+    The budget is for the whole fleet: every process drains from the same
+    rate_limits row, so adding workers doesn't multiply the send rate.
+    """
+    per_minute = max(0, _env_int("OUTBOX_RATE_PER_MINUTE", 0))
+    if not per_minute:
+        return None
+    return SharedTokenBucket(session_factory, "outbox", per_minute / 60, capacity=max(1, per_minute // 12))
+
+def backoff_delay(attempts):
+    """Seconds to wait before the next attempt after `attempts` failures."""
+    base = _env_int("OUTBOX_BACKOFF_SECONDS", 60)
+    cap = _env_int("OUTBOX_MAX_BACKOFF", 3600)
+    return min(cap, base * (2 ** max(0, attempts - 1)))
+
+
+def deliver(channel, recipient, subject, body):
+    """Send one message on the given channel. Raises on failure."""
+    get_channel(channel).send(recipient, subject, body)
+
+
+def claim_batch(db, limit, now=None):
+    """Mark up to `limit` due rows as `sending` and return them.
+
+    Digest rows are claimed together with every due row sharing their digest_key,
+    so a digest is never split across rounds.
+    """
+    now = now or datetime.utcnow()
+    worker_id = get_worker_id()
+    stale = now - timedelta(seconds=_env_int("OUTBOX_CLAIM_TIMEOUT", 600))
+    claimable = or_(
+        and_(Outbox.status == "pending", Outbox.next_attempt_at <= now),
+        and_(Outbox.status == "sending", Outbox.claimed_at < stale),
+    )
+    picked = db.execute(
+        select(Outbox.id, Outbox.digest_key).where(claimable).order_by(Outbox.next_attempt_at, Outbox.id).limit(limit)
+    ).all()
+    if not picked:
+        return []
+    ids = [r.id for r in picked]
+    digest_keys = {r.digest_key for r in picked if r.digest_key}
+    if digest_keys:
+        ids += db.scalars(
+            select(Outbox.id).where(claimable, Outbox.digest_key.in_(digest_keys), Outbox.id.notin_(ids))
+        ).all()
+    db.execute(
+        update(Outbox)
+        .where(Outbox.id.in_(ids), claimable)
+        .values(status="sending", claimed_at=now, claimed_by=worker_id, attempts=Outbox.attempts + 1)
+    )
+    db.commit()
+    # Only rows whose UPDATE we won; another worker may have claimed some in between
+    return db.scalars(
+        select(Outbox).where(Outbox.id.in_(ids), Outbox.status == "sending",
+                             Outbox.claimed_by == worker_id, Outbox.claimed_at == now)
+        .order_by(Outbox.id)
+    ).all()
+
+
+def build_jobs(rows):
+    """Turn claimed rows into send jobs: one per row, or one per digest_key.
+
+    Jobs hold plain values only so worker threads never touch the session.
+    """
+    jobs = []
+    digests = {}
+    for r in rows:
+        item = {"id": r.id, "subscription_id": r.subscription_id, "offset": r.offset,
+                "channel": r.channel, "attempts": r.attempts}
+        if r.digest_key:
+            job = digests.get(r.digest_key)
+            if job is None:
+                job = digests[r.digest_key] = {"channel": r.channel, "recipient": r.recipient, "lines": [], "items": []}
+                jobs.append(job)
+            job["lines"].append(r.body)
+            job["items"].append(item)
+        else:
+            jobs.append({"channel": r.channel, "recipient": r.recipient, "subject": r.subject,
+                         "body": r.body, "items": [item]})
+    for job in digests.values():
+        job["subject"], job["body"] = build_digest_message(job["recipient"], job["lines"])
+    return jobs
+
+
+def _send(job):
+    try:
+        deliver(job["channel"], job["recipient"], job["subject"], job["body"])
+        return job, None
+    except Exception as e:
+        return job, str(e)
+
+
+def _send_chunk(channel, jobs):
+    try:
+        errors = channel.send_batch([{"to": j["recipient"], "subject": j["subject"], "body": j["body"]} for j in jobs])
+    except Exception as e:
+        errors = [str(e)] * len(jobs)
+    return list(zip(jobs, errors))
+
+
+class ChannelPools:
+    """One thread pool per channel, created on first use; `concurrency` overrides every channel's own."""
+
+    def __init__(self, concurrency=None):
+        self.concurrency = concurrency
+        self._pools = {}
+
+    def get(self, channel):
+        pool = self._pools.get(channel.name)
+        if pool is None:
+            pool = self._pools[channel.name] = ThreadPoolExecutor(
+                max_workers=self.concurrency or channel.concurrency, thread_name_prefix=f"outbox-{channel.name}")
+        return pool
+
+    def shutdown(self):
+        for pool in self._pools.values():
+            pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+def _send_round(pools, jobs):
+    """Send one claimed batch, all channels at once; returns (job, error) pairs.
+
+    A channel whose batch_size() is above 1 (email while SendGrid is in use)
+    gets chunks of that many messages per call, the others one call per job.
+    """
+    by_channel = {}
+    for job in jobs:
+        by_channel.setdefault(job["channel"], []).append(job)
+    results, singles, chunks = [], [], []
+    for name, channel_jobs in by_channel.items():
+        channel = CHANNELS.get(name)
+        if channel is None:
+            results += [(job, f"Unknown channel '{name}'") for job in channel_jobs]
+            continue
+        pool = pools.get(channel)
+        size = channel.batch_size()
+        if size > 1 and len(channel_jobs) > 1:
+            chunks += [pool.submit(_send_chunk, channel, channel_jobs[i:i + size])
+                       for i in range(0, len(channel_jobs), size)]
+        else:
+            singles += [pool.submit(_send, job) for job in channel_jobs]
+    for future in chunks:
+        results += future.result()
+    return results + [future.result() for future in singles]
+
+
+def record_results(db, results, now=None, sampler=None):
+    """Persist the outcome of one round of sends in a single transaction.
+
+    Every outbox row covered by a job shares its outcome; each sent row gets its own AlertLog.
+    Failures are logged through `sampler` (a LogSampler) so a provider outage
+    doesn't write one line per row.
+    """
+    now = now or datetime.utcnow()
+    sampler = sampler or LogSampler(logger)
+    max_attempts = _env_int("OUTBOX_MAX_ATTEMPTS", 5)
+    summary = {"sent": 0, "retried": 0, "dead": 0}
+    sent_logs = []
+    for job, error in results:
+        ids = [item["id"] for item in job["items"]]
+        attempts = max(item["attempts"] for item in job["items"])
+        if error is None:
+            db.execute(update(Outbox).where(Outbox.id.in_(ids)).values(
+                status="sent", sent_at=now, last_error=None))
+            sent_logs.extend(
+                {"subscription_id": item["subscription_id"], "offset": item["offset"], "channel": item["channel"]}
+                for item in job["items"]
+            )
+            summary["sent"] += len(ids)
+        elif attempts >= max_attempts:
+            db.execute(update(Outbox).where(Outbox.id.in_(ids)).values(
+                status="dead", last_error=error[:1000]))
+            summary["dead"] += len(ids)
+            sampler.log(logging.ERROR, "dead", "Giving up on outbox id(s)=%s after %d attempt(s): %s",
+                        ids, attempts, error, channel=job["channel"])
+        else:
+            db.execute(update(Outbox).where(Outbox.id.in_(ids)).values(
+                status="pending", last_error=error[:1000],
+                next_attempt_at=now + timedelta(seconds=backoff_delay(attempts))))
+            summary["retried"] += len(ids)
+            sampler.log(logging.WARNING, "retry", "Send failed for outbox id(s)=%s (attempt %d), will retry: %s",
+                        ids, attempts, error, channel=job["channel"])
+    # Unique on (subscription_id, offset, channel): a duplicate send never yields a second log row
+    insert_ignore_duplicates(db, AlertLog, sent_logs, ["subscription_id", "offset", "channel"])
+    db.commit()
+    return summary
+
+
+def drain_outbox(db=None, concurrency=None, max_rounds=None):
+    """Send every due outbox row, each channel on its own thread pool (`concurrency` threads each if given).
+
+    Claims OUTBOX_BATCH_SIZE rows at a time until nothing is due (or `max_rounds`
+    is reached). Returns a summary dict with sent/retried/dead counts. Drains
+    that sent anything (or failed) are recorded in scheduler_runs and /metrics.
+    """
+    started_at, started = datetime.utcnow(), time.perf_counter()
+    error = None
+    owns_session = db is None
+    if owns_session:
+        db = SessionLocal()
+    # The run is recorded in the caller's database, not necessarily SessionLocal's
+    session_factory = SessionLocal if owns_session else sessionmaker(bind=db.get_bind())
+    batch_size = max(1, _env_int("OUTBOX_BATCH_SIZE", 100))
+    limiter = get_rate_limiter(session_factory)
+    if limiter:
+        batch_size = min(batch_size, limiter.capacity)
+    summary = {"sent": 0, "retried": 0, "dead": 0}
+    rounds = 0
+    sampler = LogSampler(logger)
+    try:
+        with ChannelPools(concurrency) as pools:
+            while max_rounds is None or rounds < max_rounds:
+                claimed = claim_batch(db, batch_size)
+                if not claimed:
+                    break
+                rounds += 1
+                jobs = build_jobs(claimed)
+                if limiter:
+                    metrics.rate_limit_wait.inc(limiter.take(len(jobs)))
+                results = _send_round(pools, jobs)
+                for key, value in record_results(db, results, sampler=sampler).items():
+                    summary[key] += value
+        if rounds:
+            sampler.flush("Drained %d batch(es): %s", rounds, summary, rounds=rounds, **summary)
+    except Exception as e:
+        db.rollback()
+        error = str(e)
+        logger.exception("Error draining outbox: %s", e)
+    finally:
+        if owns_session:
+            db.close()
+    if rounds or error:
+        metrics.record_run(session_factory, "outbox", started_at, time.perf_counter() - started,
+                           {"sent": summary["sent"], "failed": summary["retried"] + summary["dead"]}, error)
+    return summary
+
+
+def prune_outbox(db=None, now=None):
+    """Delete sent and dead rows older than OUTBOX_RETENTION_DAYS; returns how many were deleted."""
+    days = _env_int("OUTBOX_RETENTION_DAYS", 30)
+    if days <= 0:
+        return 0
+    now = now or datetime.utcnow()
+    owns_session = db is None
+    if owns_session:
+        db = SessionLocal()
+    try:
+        deleted = db.execute(
+            delete(Outbox).where(Outbox.status.in_(("sent", "dead")),
+                                 func.coalesce(Outbox.sent_at, Outbox.created_at) < now - timedelta(days=days))
+        ).rowcount
+        db.commit()
+        if deleted:
+            logger.info("Pruned %d outbox row(s) older than %d day(s)", deleted, days, extra={"deleted": deleted})
+        return deleted
+    finally:
+        if owns_session:
+            db.close()
+
+
+def requeue_dead(db, channel=None, since=None, now=None):
+    """Put dead-lettered rows back to pending with a fresh set of attempts; returns how many.
+
+    `channel` and `since` (rows created on or after that date) narrow it down,
+    e.g. to the ones a provider outage killed.
+    """
+    now = now or datetime.utcnow()
+    criteria = [Outbox.status == "dead"]
+    if channel:
+        criteria.append(Outbox.channel == channel)
+    if since:
+        criteria.append(Outbox.created_at >= datetime.combine(since, datetime.min.time()))
+    count = db.execute(
+        update(Outbox).where(*criteria)
+        .values(status="pending", attempts=0, next_attempt_at=now, claimed_at=None, claimed_by=None)
+    ).rowcount
+    db.commit()
+    return count
+
+
+def main(argv=None):
+    from .logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(prog="python -m backend.outbox_worker",
+                                     description="Drain, re-drive or prune the alert outbox")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("drain", help="send every due row now (default)")
+    cmd = commands.add_parser("requeue-dead", help="retry dead-lettered rows")
+    cmd.add_argument("--channel", help="only this channel's rows")
+    cmd.add_argument("--since", type=date.fromisoformat, help="only rows queued on or after this day")
+    commands.add_parser("prune", help="delete sent and dead rows older than OUTBOX_RETENTION_DAYS")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    if args.command in (None, "drain"):
+        print(drain_outbox())
+    elif args.command == "requeue-dead":
+        db = SessionLocal()
+        try:
+            print(f"{requeue_dead(db, args.channel, args.since)} row(s) queued again")
+        finally:
+            db.close()
+    elif args.command == "prune":
+        print(f"{prune_outbox()} row(s) deleted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Dedicated, size-limited executor for Argon2 hashing and verification.
+
+Argon2 is deliberately CPU- and memory-hungry. Running it on the shared
+request threadpool lets a burst of logins/registrations pin every core and
+starve ordinary requests, so all password work goes through this pool
+instead. When more than PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE calls are
+in flight, new ones are rejected with PasswordHasherBusy (the routes answer
+503 with Retry-After) rather than queueing without bound.
+
+Configuration (ENV):
+    PASSWORD_HASH_WORKERS  threads hashing in parallel (default: half the CPUs, at least 1)
+    PASSWORD_HASH_QUEUE    calls allowed to wait for a free thread (default 4 x workers)
+"""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import threading
+
+from . import auth
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full."""
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+def get_worker_count():
+    return max(1, _env_int("PASSWORD_HASH_WORKERS", (os.cpu_count() or 2) // 2))
+
+def get_queue_depth():
+    return max(0, _env_int("PASSWORD_HASH_QUEUE", 4 * get_worker_count()))
+
+
+class PasswordHasher:
+    def __init__(self, workers, queue_depth):
+        self.workers = workers
+        self.capacity = workers + queue_depth
+        self.in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="argon2")
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                raise PasswordHasherBusy(f"{self.in_flight} password operations already in flight")
+            self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    async def hash(self, password):
+        return await self.run(auth.hash_password, password)
+
+    async def verify_and_update(self, password, hashed):
+        return await self.run(auth.verify_and_update_password, password, hashed)
+
+    @property
+    def stats(self):
+        return {"workers": self.workers, "capacity": self.capacity,
+                "in_flight": self.in_flight, "rejected": self.rejected}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+_hasher = None
+
+def get_password_hasher():
+    global _hasher
+    if _hasher is None:
+        _hasher = PasswordHasher(get_worker_count(), get_queue_depth())
+    return _hasher
+
+def close_password_hasher():
+    global _hasher
+    if _hasher is not None:
+        _hasher.shutdown()
+    _hasher = None
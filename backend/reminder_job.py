@@ -1,116 +1,514 @@
+"""
+Reminder sweep: finds due alerts and queues them in the outbox (delivery is outbox_worker's job).
+
+Besides the in-process scheduler started by main.py, the sweep can be driven
+from the command line (run from the project root):
+
+    python -m backend.reminder_job [sweep]                  one sweep for today
+    python -m backend.reminder_job catch-up [--since DATE]  replay every day after the stored watermark
+    python -m backend.reminder_job backfill --from DATE [--to DATE]
+    python -m backend.reminder_job simulate [--days 30] [--from DATE] [--json]
+
+catch-up and backfill sweep one day at a time, so each missed offset is queued
+as it would have been; messages are worded for the actual send date. simulate
+only reads: it counts the alerts and messages each channel would send per day.
+
+Alerts are queued once per channel the owner is reachable on (channels.py);
+outbox_worker delivers them to all channels concurrently.
+"""
 from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import select, insert, and_, or_, exists, case, func, String
 from .database import SessionLocal
-from .models import Subscription, User, AlertLog
-from datetime import datetime, timedelta
-from .send_email import send_email_alert
+from .models import Subscription, User, AlertLog, Outbox, SweepCheckpoint, SweepWatermark
+from datetime import date, datetime, timedelta
+from .outbox_worker import drain_outbox, prune_outbox, get_poll_seconds, get_rate_limiter
+from .reminder_messages import build_reminder_message, build_digest_line, build_short_message
+from .alert_schedule import (advance_schedule, shard_clause, recompute_all, literal_table, effective_offsets,
+                             MAX_ALERT_OFFSET)
+from .delivery_window import send_time
+from .email_providers import get_email_router
+from .channels import active_channels, get_channel
+from . import leases, metrics
+import argparse
+import json
+import logging
 import os
+import random
+import time
+
+logger = logging.getLogger(__name__)
 
 _scheduler = None
 
-# Default alert offsets (days before renewal) — adjustable via ENV var ALERT_OFFSETS as CSV
-# Common schedule: 30 (1 month), 25, 20, 10 days before renewal
-DEFAULT_ALERT_OFFSETS = [30, 25, 20, 10]
+# Due subscriptions read (and their outbox rows written) per transaction — adjustable via ENV var SWEEP_BATCH_SIZE
+DEFAULT_SWEEP_BATCH_SIZE = 500
 
-def get_alert_offsets():
-    raw = os.getenv("ALERT_OFFSETS")
-    if not raw:
-        return DEFAULT_ALERT_OFFSETS
+# Minutes between sweeps — adjustable via ENV var SCHEDULER_INTERVAL_MINUTES
+DEFAULT_SWEEP_INTERVAL_MINUTES = 15
+
+def get_sweep_batch_size():
+    try:
+        return max(1, int(os.getenv("SWEEP_BATCH_SIZE", DEFAULT_SWEEP_BATCH_SIZE)))
+    except ValueError:
+        return DEFAULT_SWEEP_BATCH_SIZE
+
+def get_sweep_interval_minutes():
+    """How often the sweep runs; cheap now that it is an indexed range scan."""
     try:
-        parts = [int(x.strip()) for x in raw.split(",") if x.strip()]
-        return sorted(set(parts), reverse=True)
-    except Exception:
-        print(f"[Scheduler] Invalid ALERT_OFFSETS='{raw}', using defaults")
-        return DEFAULT_ALERT_OFFSETS
+        return max(1, int(os.getenv("SCHEDULER_INTERVAL_MINUTES", DEFAULT_SWEEP_INTERVAL_MINUTES)))
+    except ValueError:
+        return DEFAULT_SWEEP_INTERVAL_MINUTES
+
+def due_subscription_keys(db, today, shard=None, shards=1, after=None, limit=None):
+    """(next_alert_at, id) of subscriptions due on or before `today`, in next_alert_at index order.
 
-def check_expiring_subscriptions():
-    """Check subscriptions and send alerts at configured offsets before renewal_date.
+    Pass `limit` and the last key seen as `after` to walk them in keyset
+    chunks; each chunk continues the same index range scan.
+    """
+    stmt = (
+        select(Subscription.next_alert_at, Subscription.id)
+        .where(Subscription.next_alert_at <= today, shard_clause(shard, shards))
+        .order_by(Subscription.next_alert_at, Subscription.id)
+    )
+    if after is not None:
+        after_at, after_id = after
+        stmt = stmt.where(or_(Subscription.next_alert_at > after_at,
+                              and_(Subscription.next_alert_at == after_at, Subscription.id > after_id)))
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return db.execute(stmt).all()
+
+def find_due_alerts(db, today, shard=None, shards=1, subscription_ids=None):
+    """Return every due (subscription, user, offset, channel) tuple in a single query.
+
+    Subscriptions whose materialized next_alert_at is on or before today (an
+    indexed range scan) are joined to their owner and to the channels the owner
+    can be reached on, and anti-joined against alert_logs and outbox so
+    already-sent or already-queued alerts never come back (dead-lettered ones
+    included; see outbox_worker.requeue_dead). With `shards` > 1
+    only subscriptions with id % shards == shard are considered.
 
-    This function finds subscriptions where renewal_date == today + offset
-    for each configured offset and sends email/whatsapp alerts accordingly.
+    `subscription_ids` restricts it to one chunk from due_subscription_keys.
+    Only channels.active_channels() are considered, each with its own
+    reachable() condition; `recipient` is that channel's address column.
     """
-    db = SessionLocal()
+    active = active_channels()
+    if not active:
+        return []
+    channels = literal_table("channels", [(c.name,) for c in active], [("channel", String)])
+    offset = Subscription.next_alert_offset
+
+    reachable = or_(*(and_(channels.c.channel == c.name, c.reachable()) for c in active))
+    recipient = case(*((channels.c.channel == c.name, c.recipient()) for c in active)).label("recipient")
+    already_sent = exists().where(
+        AlertLog.subscription_id == Subscription.id,
+        AlertLog.offset == offset,
+        AlertLog.channel == channels.c.channel,
+    )
+    already_queued = exists().where(
+        Outbox.subscription_id == Subscription.id,
+        Outbox.offset == offset,
+        Outbox.channel == channels.c.channel,
+    )
+    stmt = (
+        select(
+            Subscription.id.label("subscription_id"),
+            Subscription.name,
+            Subscription.renewal_date,
+            Subscription.note,
+            User.id.label("user_id"),
+            User.email,
+            User.email_digest_enabled,
+            User.timezone,
+            User.send_window_start,
+            User.send_window_end,
+            offset.label("offset"),
+            channels.c.channel,
+            recipient,
+        )
+        .join(User, User.id == Subscription.user_id)
+        .join(channels, reachable)
+        .where(
+            Subscription.next_alert_at <= today,
+            Subscription.renewal_date >= today,
+            shard_clause(shard, shards),
+            ~already_sent,
+            ~already_queued,
+        )
+        .order_by(Subscription.next_alert_at, Subscription.id, channels.c.channel)
+    )
+    if subscription_ids is not None:
+        stmt = stmt.where(Subscription.id.in_(subscription_ids))
+    return db.execute(stmt).all()
+
+def _outbox_row(row, today, now, sent_on=None):
+    # Normally equal to row.offset; smaller if the alert was picked up late
+    sent_on = sent_on or today
+    days_left = (row.renewal_date - sent_on).days
+    channel = get_channel(row.channel)
+    if channel.short:
+        subject, msg = build_short_message(row.name, row.renewal_date, row.note, days_left)
+    else:
+        subject, msg = build_reminder_message(row.email, row.name, row.renewal_date, row.note, days_left)
+    digest_key = None
+    if channel.digest and row.email_digest_enabled:
+        # Everything due for this user in this run is combined into one message by the worker
+        digest_key = f"{row.user_id}:{row.channel}:{sent_on}"
+        msg = build_digest_line(row.name, row.renewal_date, row.note, days_left)
+    return {
+        "subscription_id": row.subscription_id,
+        "offset": row.offset,
+        "channel": row.channel,
+        "recipient": row.recipient,
+        "subject": subject,
+        "body": msg,
+        "digest_key": digest_key,
+        # Keyed on the user and day only, so all their alerts (and a whole digest) share one slot
+        "next_attempt_at": send_time(now, row.timezone, row.send_window_start, row.send_window_end,
+                                     f"{row.user_id}:{sent_on}"),
+    }
+
+def _checkpoint_name(shard, shards):
+    return f"sweep:{shard or 0}/{shards}"
+
+def _resume_point(db, name, today):
+    """(next_alert_at, subscription id) an interrupted run for `today` got to, or None to start over."""
+    checkpoint = db.get(SweepCheckpoint, name)
+    if checkpoint is None or checkpoint.day != today:
+        return None
+    return checkpoint.last_alert_at, checkpoint.last_subscription_id
+
+def _finish_run(db, name, today):
+    """Drop the checkpoint and move the shard's watermark up to `today`."""
+    db.query(SweepCheckpoint).filter(SweepCheckpoint.name == name).delete()
+    mark = db.get(SweepWatermark, name)
+    if mark is None:
+        db.add(SweepWatermark(name=name, day=today))
+    elif mark.day < today:
+        mark.day = today
+    db.commit()
+
+def get_watermark(db, shards=None):
+    """The last day every shard was swept through, or None if some shard never finished a run."""
+    shards = shards or get_shard_count()
+    names = [_checkpoint_name(shard, shards) for shard in range(shards)]
+    days = db.scalars(select(SweepWatermark.day).where(SweepWatermark.name.in_(names))).all()
+    return min(days) if len(days) == len(names) else None
+
+def _flush_outbox(db, pending, checkpoint=None):
+    """Insert `pending` outbox rows; `checkpoint` (name, day, (next_alert_at, id)) is saved in the same transaction."""
+    if not pending:
+        return 0
+    count = len(pending)
     try:
-        today = datetime.utcnow().date()
-        offsets = get_alert_offsets()
-        print(f"[Scheduler] Running check for offsets: {offsets} (today={today})")
-
-        for offset in offsets:
-            target = today + timedelta(days=offset)
-            subs = db.query(Subscription).filter(Subscription.renewal_date == target).all()
-            print(f"[Scheduler] {len(subs)} subscription(s) found for target={target} (offset={offset})")
-            for s in subs:
-                try:
-                    user = db.query(User).filter(User.id == s.user_id).first()
-                    if not user:
-                        print(f"[Scheduler] No user found for subscription id={s.id}")
-                        continue
-
-                    subject = f"Reminder: '{s.name}' renews in {offset} day(s)"
-                    msg = (
-                        f"Hi {user.email},\n\n"
-                        f"This is a reminder that your subscription '{s.name}' will renew on {s.renewal_date} (in {offset} day(s)).\n\n"
-                        f"Note: {s.note or '-'}\n\n"
-                        "Please take action if you wish to cancel or update your payment.\n\n"
-                        "Best regards,\nSubscription Reminder Service"
-                    )
-
-                    if user.email:
-                        # Skip if we've already sent this offset/email for this subscription
-                        existing = db.query(AlertLog).filter(
-                            AlertLog.subscription_id == s.id,
-                            AlertLog.offset == offset,
-                            AlertLog.channel == 'email'
-                        ).first()
-                        if existing:
-                            print(f"[Scheduler] Email already sent for sub id={s.id} offset={offset}, skipping")
-                        else:
-                            try:
-                                send_email_alert(user.email, subject, msg)
-                                # record the sent alert
-                                log = AlertLog(subscription_id=s.id, offset=offset, channel='email')
-                                db.add(log)
-                                db.commit()
-                                print(f"[Scheduler] Sent EMAIL alert to {user.email} for sub id={s.id} (offset={offset})")
-                            except Exception as e:
-                                db.rollback()
-                                print(f"[Scheduler] Failed to send email to {user.email}: {e}")
-
-                    if user.phone:
-                        existing_wh = db.query(AlertLog).filter(
-                            AlertLog.subscription_id == s.id,
-                            AlertLog.offset == offset,
-                            AlertLog.channel == 'whatsapp'
-                        ).first()
-                        if existing_wh:
-                            print(f"[Scheduler] WhatsApp already sent for sub id={s.id} offset={offset}, skipping")
-                        else:
-                            try:
-                                # TODO: Implement WhatsApp sending when send_whatsapp.py is available
-                                # send_whatsapp_alert(user.phone, msg)
-                                log = AlertLog(subscription_id=s.id, offset=offset, channel='whatsapp')
-                                db.add(log)
-                                db.commit()
-                                print(f"[Scheduler] Sent WHATSAPP alert to {user.phone} for sub id={s.id} (offset={offset})")
-                            except Exception as e:
-                                db.rollback()
-                                print(f"[Scheduler] Failed to send whatsapp to {user.phone}: {e}")
-                except Exception as ex:
-                    print(f"[Scheduler] Error processing subscription id={s.id}: {ex}")
+        # render_nulls keeps rows with and without a digest_key in one executemany
+        db.execute(insert(Outbox).execution_options(render_nulls=True), pending)
+        if checkpoint:
+            name, day, (last_at, last_id) = checkpoint
+            db.merge(SweepCheckpoint(name=name, day=day, last_alert_at=last_at, last_subscription_id=last_id))
+        db.commit()
     except Exception as e:
-        print(f"[Scheduler] General error in scheduler: {e}")
+        db.rollback()
+        count = 0
+        logger.error("Failed to enqueue %d alert(s): %s", len(pending), e)
+    pending.clear()
+    return count
+
+def get_shard_count():
+    try:
+        return max(1, int(os.getenv("SCHEDULER_SHARDS", 1)))
+    except ValueError:
+        return 1
+
+def check_expiring_subscriptions(db=None, today=None, shard=None, shards=1, lease=None, sent_on=None):
+    """Find alerts whose next_alert_at has come due and queue them.
+
+    Due subscriptions are walked in keyset chunks of SWEEP_BATCH_SIZE, and
+    each chunk's (subscription, offset, channel) tuples are fetched with one
+    query, so memory stays flat however many are due. Each chunk is written to the outbox in one transaction, stamped with send
+    times inside the users' delivery windows. The same transaction records a
+    checkpoint (sweep_checkpoints), so a run that crashes or loses its lease
+    resumes after the last committed chunk. Once everything is queued the
+    schedule is advanced to each subscription's following offset and the
+    checkpoint is cleared. Delivery happens separately in outbox_worker.drain_outbox.
+
+    When `lease` is given it is renewed after every batch and the run stops
+    early if another worker has taken it over. `sent_on` (default `today`) is
+    the date messages are worded for, when replaying a past day.
+    Returns a summary dict with due/enqueued/advanced counts.
+    """
+    owns_session = db is None
+    if owns_session:
+        db = SessionLocal()
+    summary = {"due": 0, "enqueued": 0, "advanced": 0}
+    try:
+        now = datetime.utcnow()
+        today = today or now.date()
+        batch_size = get_sweep_batch_size()
+        logger.info("Running check", extra={"today": str(today), "shard": shard})
+
+        name = _checkpoint_name(shard, shards)
+        resume_from = _resume_point(db, name, today)
+        if resume_from is not None:
+            logger.info("Resuming interrupted sweep after subscription %d", resume_from[1], extra={"shard": shard})
+        after = resume_from
+
+        while True:
+            keys = due_subscription_keys(db, today, shard, shards, after=after, limit=batch_size)
+            if not keys:
+                break
+            after = tuple(keys[-1])
+            rows = find_due_alerts(db, today, shard, shards, subscription_ids=[key.id for key in keys])
+            summary["due"] += len(rows)
+            pending = [_outbox_row(row, today, now, sent_on) for row in rows]
+            # After a failed chunk the checkpoint stays behind it, so the next run retries it
+            checkpoint = (name, today, after) if summary["enqueued"] == summary["due"] - len(rows) else None
+            summary["enqueued"] += _flush_outbox(db, pending, checkpoint)
+            if lease and not leases.renew(db, lease):
+                logger.warning("Lost lease %s, stopping this run", lease)
+                return summary
+            if len(keys) < batch_size:
+                break
+        logger.info("%d alert(s) due, %d queued for delivery", summary["due"], summary["enqueued"],
+                    extra={"due": summary["due"], "enqueued": summary["enqueued"], "shard": shard})
+
+        # Only move the schedule on if nothing was lost; otherwise the next run retries
+        if summary["enqueued"] == summary["due"]:
+            summary["advanced"] = advance_schedule(db, today, shard, shards)
+            _finish_run(db, name, today)
+    except Exception as e:
+        summary["error"] = str(e)
+        logger.exception("General error in scheduler: %s", e)
+    finally:
+        if owns_session:
+            db.close()
+    return summary
+
+def run_sweep(session_factory=SessionLocal, today=None, sent_on=None):
+    """Sweep every shard this process can lease; safe to run in many processes at once.
+
+    Subscriptions are split into SCHEDULER_SHARDS slices by id. Each slice is
+    guarded by a `sweep:<n>` lease, so concurrent schedulers divide the work
+    and a crashed worker's slice is picked up once its lease expires.
+    Each run is recorded in scheduler_runs and the /metrics counters.
+    """
+    shards = get_shard_count()
+    totals = {"shards": 0, "due": 0, "enqueued": 0, "advanced": 0}
+    started_at, started = datetime.utcnow(), time.perf_counter()
+    errors = []
+    db = session_factory()
+    try:
+        # Start at a random shard so concurrent workers don't all contend for shard 0
+        first = random.randrange(shards)
+        for i in range(shards):
+            shard = (first + i) % shards
+            name = f"sweep:{shard}"
+            if not leases.try_acquire(db, name):
+                continue
+            try:
+                summary = check_expiring_subscriptions(db, today, shard, shards, lease=name, sent_on=sent_on)
+            finally:
+                leases.release(db, name)
+            totals["shards"] += 1
+            for key in ("due", "enqueued", "advanced"):
+                totals[key] += summary[key]
+            if "error" in summary:
+                errors.append(summary["error"])
+    except Exception as e:
+        errors.append(str(e))
+        logger.exception("Error running sweep: %s", e)
     finally:
         db.close()
+    metrics.record_run(session_factory, "sweep", started_at, time.perf_counter() - started,
+                       {"rows_scanned": totals["due"], "queued": totals["enqueued"],
+                        "skipped": totals["due"] - totals["enqueued"]},
+                       error="; ".join(errors) or None)
+    return totals
 
 def start_scheduler():
     global _scheduler
     if _scheduler is not None and _scheduler.running:
-        print("Scheduler is already running")
+        logger.info("Scheduler is already running")
         return
     
     _scheduler = BackgroundScheduler()
-    _scheduler.add_job(check_expiring_subscriptions, "interval", hours=24)
+    _scheduler.add_job(run_sweep, "interval", minutes=get_sweep_interval_minutes(), max_instances=1, coalesce=True)
+    _scheduler.add_job(drain_outbox, "interval", seconds=get_poll_seconds(), max_instances=1, coalesce=True)
+    _scheduler.add_job(prune_outbox, "interval", hours=1, max_instances=1, coalesce=True)
     try:
         _scheduler.start()
-        print("Scheduler started successfully")
+        logger.info("Scheduler started successfully")
     except Exception as e:
-        print(f"Error starting scheduler: {e}")
\ No newline at end of file
+        logger.exception("Error starting scheduler: %s", e)
+
+def stop_scheduler():
+    global _scheduler
+    if _scheduler is not None and _scheduler.running:
+        _scheduler.shutdown(wait=False)
+    _scheduler = None
+
+
+def replay(session_factory=SessionLocal, start=None, end=None):
+    """Sweep each day from `start` through `end` (default today) in order; returns [(day, totals)].
+
+    Messages are worded for the real current date, and all of a user's
+    replayed alerts share one digest.
+    """
+    real_today = datetime.utcnow().date()
+    end = end or real_today
+    results = []
+    day = start
+    while day <= end:
+        results.append((day, run_sweep(session_factory, today=day, sent_on=max(day, real_today))))
+        day += timedelta(days=1)
+    return results
+
+def catch_up(session_factory=SessionLocal, since=None):
+    """Replay every day after the stored watermark (or from `since`) through today.
+
+    Returns [] when the watermark is already today. Raises ValueError when
+    there is no watermark yet and no `since` was given.
+    """
+    if since is None:
+        db = session_factory()
+        try:
+            mark = get_watermark(db)
+        finally:
+            db.close()
+        if mark is None:
+            raise ValueError("No sweep watermark recorded yet; pass --since")
+        since = mark + timedelta(days=1)
+    return replay(session_factory, since)
+
+def backfill(session_factory=SessionLocal, start=None, end=None):
+    """Re-derive the schedule as of `start`, then replay `start`..`end` (default today).
+
+    Alerts already sent or queued are skipped by the sweep's anti-join, so only
+    ones that were genuinely missed are queued. If `end` is before today, the
+    next regular sweep picks up from there.
+    """
+    db = session_factory()
+    try:
+        recompute_all(db, today=start)
+    finally:
+        db.close()
+    return replay(session_factory, start, end)
+
+
+def simulate(db, start=None, days=30):
+    """Count the alerts each channel would produce on each of the `days` days from `start`.
+
+    Read-only and provider-free: one GROUP BY over subscriptions renewing in
+    range joined to their effective offsets. Digest users count one email
+    message per day however many of their alerts fall on it. Overdue alerts
+    are not counted, and none in range are assumed sent or queued yet.
+    Returns [{"day", <channel name>: {"alerts", "messages"}, ...}] for the active channels.
+    """
+    start = start or datetime.utcnow().date()
+    end = start + timedelta(days=days)
+    in_range = and_(Subscription.renewal_date >= start,
+                    Subscription.renewal_date < end + timedelta(days=MAX_ALERT_OFFSET))
+    offsets = effective_offsets(in_range).subquery("offsets")
+    active = active_channels()
+    reachable = [case((c.reachable(), 1), else_=0).label(f"has_{c.name}") for c in active]
+    # Digest users are grouped per user so their messages can be collapsed per day
+    digest_user = case((User.email_digest_enabled.is_(True), User.id), else_=None).label("digest_user")
+    rows = db.execute(
+        select(Subscription.renewal_date, offsets.c.offset, digest_user, func.count(), *reachable)
+        .join(User, User.id == Subscription.user_id)
+        .join(offsets, offsets.c.subscription_id == Subscription.id)
+        .group_by(Subscription.renewal_date, offsets.c.offset, digest_user, *reachable)
+    ).all()
+
+    per_day = {start + timedelta(days=i): {c.name: {"alerts": 0, "messages": 0} for c in active}
+               for i in range(days)}
+    digests = {}
+    for renewal_date, offset, digest_user_id, count, *flags in rows:
+        alert_day = renewal_date - timedelta(days=offset)
+        counts = per_day.get(alert_day)
+        if counts is None:
+            continue
+        for channel, flag in zip(active, flags):
+            if not flag:
+                continue
+            counts[channel.name]["alerts"] += count
+            if channel.digest and digest_user_id is not None:
+                digests.setdefault((alert_day, channel.name), set()).add(digest_user_id)
+            else:
+                counts[channel.name]["messages"] += count
+    for (day, name), users in digests.items():
+        per_day[day][name]["messages"] += len(users)
+    return [{"day": day, **counts} for day, counts in per_day.items()]
+
+
+def _print_simulation(results):
+    email = get_email_router().preferred()
+    names = [c.name for c in active_channels()]
+    providers = {name: name for name in names}
+    providers["email"] = email.name if email else "none"
+    limiter = get_rate_limiter()
+    header = f"{'day':<10}" + "".join(f" {f'{c} ({providers[c]})':>24}" for c in names)
+    print(header + (f" {'send minutes':>13}" if limiter else ""))
+    for result in results:
+        line = f"{result['day']!s:<10}" + "".join(
+            f" {result[c]['alerts']:>12,} / {result[c]['messages']:>9,}" for c in names)
+        if limiter:
+            messages = sum(result[c]["messages"] for c in names)
+            line += f" {messages / (limiter.rate * 60):>13,.1f}"
+        print(line)
+    print("(alerts / messages; digests send one message per user per day)")
+
+
+def _print_replay(results):
+    if not results:
+        print("Nothing to sweep: already up to date")
+    for day, totals in results:
+        print(f"{day}: {totals['due']} due, {totals['enqueued']} queued, {totals['advanced']} advanced "
+              f"({totals['shards']} shard(s))")
+
+
+def main(argv=None):
+    from .logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(prog="python -m backend.reminder_job",
+                                     description="Run, catch up, backfill or simulate the reminder sweep")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("sweep", help="sweep once for today (default)")
+    cmd = commands.add_parser("catch-up", help="sweep every day after the stored watermark, through today")
+    cmd.add_argument("--since", type=date.fromisoformat, help="first day to sweep if there is no watermark")
+    cmd = commands.add_parser("backfill", help="re-derive the schedule as of --from and sweep each day since")
+    cmd.add_argument("--from", dest="start", type=date.fromisoformat, required=True)
+    cmd.add_argument("--to", dest="end", type=date.fromisoformat, help="last day to sweep (default today)")
+    cmd = commands.add_parser("simulate", help="count alerts per day and channel without sending anything")
+    cmd.add_argument("--from", dest="start", type=date.fromisoformat, help="first day (default today)")
+    cmd.add_argument("--days", type=int, default=30)
+    cmd.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    if args.command in (None, "sweep"):
+        print(run_sweep())
+    elif args.command == "catch-up":
+        try:
+            _print_replay(catch_up(since=args.since))
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.command == "backfill":
+        today = datetime.utcnow().date()
+        if args.start > today or (args.end and args.end > today):
+            parser.error("backfill only covers days up to today; use simulate for future days")
+        _print_replay(backfill(start=args.start, end=args.end))
+    elif args.command == "simulate":
+        db = SessionLocal()
+        try:
+            results = simulate(db, args.start, args.days)
+        finally:
+            db.close()
+        if args.json:
+            print(json.dumps(results, default=str, indent=2))
+        else:
+            _print_simulation(results)
+
+
+if __name__ == "__main__":
+    main()
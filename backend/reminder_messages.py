@@ -0,0 +1,39 @@
+"""Subject/body templates for reminder emails, shared by the sweep and the outbox worker."""
+
+
+def build_reminder_message(email, name, renewal_date, note, offset):
+    subject = f"Reminder: '{name}' renews in {offset} day(s)"
+    msg = (
+        f"Hi {email},\n\n"
+        f"This is a reminder that your subscription '{name}' will renew on {renewal_date} (in {offset} day(s)).\n\n"
+        f"Note: {note or '-'}\n\n"
+        "Please take action if you wish to cancel or update your payment.\n\n"
+        "Best regards,\nSubscription Reminder Service"
+    )
+    return subject, msg
+
+
+def build_digest_line(name, renewal_date, note, offset):
+    """One entry of a digest email; stored as the outbox row body for digest items."""
+    return f"- '{name}' renews on {renewal_date} (in {offset} day(s)). Note: {note or '-'}"
+
+
+def build_digest_message(email, lines):
+    subject = f"Reminder: {len(lines)} subscription(s) renewing soon"
+    msg = (
+        f"Hi {email},\n\n"
+        "The following subscriptions are coming up for renewal:\n\n"
+        + "\n".join(lines)
+        + "\n\nPlease take action if you wish to cancel or update your payment.\n\n"
+        "Best regards,\nSubscription Reminder Service"
+    )
+    return subject, msg
+
+
+def build_short_message(name, renewal_date, note, offset):
+    """Single-line reminder for SMS / WhatsApp."""
+    subject = f"Reminder: '{name}' renews in {offset} day(s)"
+    msg = f"Reminder: your subscription '{name}' renews on {renewal_date} (in {offset} day(s))."
+    if note:
+        msg += f" Note: {note}"
+    return subject, msg
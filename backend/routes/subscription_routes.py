@@ -1,57 +1,110 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from backend.schemas import (SubscriptionCreate, SubscriptionOut, AlertResponse,
+                             SubscriptionBulkUpdate, SubscriptionIds, BulkDeleteResult)
+from backend import async_crud as crud, subscription_io, cache
 from backend.database import SessionLocal
-from backend.schemas import SubscriptionCreate, SubscriptionOut, AlertResponse
-from backend import crud
+from backend.dependencies import get_db, get_current_user_id, get_current_principal
 from backend.send_email import send_email_alert
 from backend.models import User, Subscription
-from typing import List
-from jose import jwt
+from typing import List, Literal, Optional
+from datetime import date
+import base64
+import binascii
+import hashlib
+import json
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Largest page /subscription/list will return when a limit is given
+MAX_PAGE_SIZE = 500
 
-def get_current_user_id(authorization: str = Header(None)):
-    # Very simple token decode: expects "Bearer <token>"
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing auth header")
-    parts = authorization.split()
-    if len(parts) != 2: raise HTTPException(status_code=401, detail="Invalid auth header")
-    token = parts[1]
-    try:
-        payload = jwt.decode(token, "change_me_to_a_random_secret", algorithms=["HS256"])
-        return int(payload.get("user_id"))
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid token")
+# Most items accepted by one bulk request
+MAX_BULK_SIZE = 1000
 
 @router.post("/add", response_model=SubscriptionOut)
-def add_subscription(sub: SubscriptionCreate, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
-    created = crud.create_subscription(db, user_id, sub.name, sub.renewal_date, sub.note)
+async def add_subscription(sub: SubscriptionCreate, db: AsyncSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    created = await crud.create_subscription(db, user_id, sub.name, sub.renewal_date, sub.note,
+                                           alert_offsets=sub.alert_offsets)
     return created
 
+def _encode_cursor(sort, key):
+    value, last_id = key
+    raw = json.dumps([sort, value.isoformat() if isinstance(value, date) else value, last_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor, sort):
+    try:
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if cursor_sort != sort:
+            raise ValueError("cursor belongs to a different sort order")
+        if sort == "renewal_date":
+            value = date.fromisoformat(value)
+        return value, int(last_id)
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+def _list_etag(user_id, version, query_string):
+    # The version changes on every write to this user's subscriptions; the query picks the page/filters
+    digest = hashlib.sha1(f"{user_id}?{query_string}".encode()).hexdigest()[:16]
+    return f'W/"{version}-{digest}"'
+
 @router.get("/list", response_model=List[SubscriptionOut])
-def list_subscriptions(db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
-    return crud.get_subscriptions_for_user(db, user_id)
+async def list_subscriptions(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: Literal["renewal_date", "-renewal_date", "name", "-name"] = "renewal_date",
+    renewal_from: Optional[date] = None,
+    renewal_to: Optional[date] = None,
+    name_prefix: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """List the caller's subscriptions, optionally filtered and one page at a time.
+
+    Without `limit` every matching row is returned (the old behaviour). With it,
+    the X-Next-Cursor header carries the `cursor` for the following page and is
+    absent on the last one. A matching If-None-Match gets 304 with no body.
+    """
+    etag = _list_etag(user_id, await crud.get_subscriptions_version(db, user_id), request.url.query)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    # The ETag names exactly this page of this version, so it doubles as the cache key
+    page_key = cache.subscriptions_page_key(user_id, etag)
+    page = cache.get_cache().get(page_key)
+    if page is None:
+        descending = sort.startswith("-")
+        sort = sort.lstrip("-")
+        rows, next_key = await crud.list_subscriptions_page(
+            db, user_id, limit=limit, after=_decode_cursor(cursor, sort) if cursor else None,
+            sort=sort, descending=descending,
+            renewal_from=renewal_from, renewal_to=renewal_to, name_prefix=name_prefix,
+        )
+        page = {
+            "rows": [SubscriptionOut.model_validate(row).model_dump(mode="json") for row in rows],
+            "next": _encode_cursor(sort, next_key) if next_key is not None else None,
+        }
+        cache.get_cache().set(page_key, page)
+    response.headers.update(headers)
+    if page["next"] is not None:
+        response.headers["X-Next-Cursor"] = page["next"]
+    return page["rows"]
 
 @router.post("/send-alert/{subscription_id}", response_model=AlertResponse)
-def send_subscription_alert(subscription_id: int, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+async def send_subscription_alert(subscription_id: int, db: AsyncSession = Depends(get_db), user = Depends(get_current_principal)):
     """Send an email alert for a specific subscription"""
-    subscription = crud.get_subscription(db, subscription_id)
+    subscription = await crud.get_subscription(db, subscription_id)
     if not subscription:
         raise HTTPException(status_code=404, detail="Subscription not found")
-    if subscription.user_id != user_id:
+    if subscription.user_id != user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
+
     try:
         subject = f"Subscription Renewal Alert: {subscription.name}"
         message = f"""
@@ -67,29 +120,106 @@ Please take action to renew your subscription before the renewal date.
 Best regards,
 Subscription Reminder Service
 """
-        send_email_alert(user.email, subject, message)
+        # SMTP/SendGrid calls block; keep them off the event loop
+        await run_in_threadpool(send_email_alert, user.email, subject, message)
         return {"status": "success", "message": f"Alert email sent to {user.email}"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to send email: {str(e)}")
 
 @router.put("/update/{subscription_id}", response_model=SubscriptionOut)
-def update_subscription(subscription_id: int, sub: SubscriptionCreate, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
-    existing_sub = crud.get_subscription(db, subscription_id)
+async def update_subscription(subscription_id: int, sub: SubscriptionCreate, db: AsyncSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    existing_sub = await crud.get_subscription(db, subscription_id)
     if not existing_sub:
         raise HTTPException(status_code=404, detail="Subscription not found")
     if existing_sub.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to update this subscription")
     
-    updated = crud.update_subscription(db, subscription_id, sub.name, sub.renewal_date, sub.note)
+    # Leaving alert_offsets out keeps the subscription's own; only an explicit null resets them
+    offsets = {"alert_offsets": sub.alert_offsets} if "alert_offsets" in sub.model_fields_set else {}
+    updated = await crud.update_subscription(db, subscription_id, sub.name, sub.renewal_date, sub.note, **offsets)
     return updated
 
 @router.delete("/delete/{subscription_id}", response_model=SubscriptionOut)
-def delete_subscription(subscription_id: int, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
-    existing_sub = crud.get_subscription(db, subscription_id)
+async def delete_subscription(subscription_id: int, db: AsyncSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    existing_sub = await crud.get_subscription(db, subscription_id)
     if not existing_sub:
         raise HTTPException(status_code=404, detail="Subscription not found")
     if existing_sub.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this subscription")
 
-    crud.delete_subscription(db, subscription_id)
+    await crud.delete_subscription(db, subscription_id)
     return existing_sub
+
+def _check_bulk_size(items):
+    if len(items) > MAX_BULK_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_SIZE} items per request")
+
+async def _check_owned(db, user_id, ids):
+    """One query for the ownership of every id in a batch; 404/403 if any is missing or foreign"""
+    owners = await crud.get_subscription_owners(db, ids)
+    missing = [i for i in ids if i not in owners]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Subscription(s) not found: {missing}")
+    foreign = [i for i in ids if owners[i] != user_id]
+    if foreign:
+        raise HTTPException(status_code=403, detail=f"Not authorized to modify subscription(s): {foreign}")
+
+@router.post("/bulk-add", response_model=List[SubscriptionOut])
+async def bulk_add_subscriptions(subs: List[SubscriptionCreate], db: AsyncSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Create many subscriptions in one transaction"""
+    _check_bulk_size(subs)
+    return await crud.create_subscriptions(db, user_id, [sub.model_dump() for sub in subs])
+
+@router.put("/bulk-update", response_model=List[SubscriptionOut])
+async def bulk_update_subscriptions(subs: List[SubscriptionBulkUpdate], db: AsyncSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Update many subscriptions in one transaction; nothing changes unless the caller owns them all"""
+    _check_bulk_size(subs)
+    await _check_owned(db, user_id, [sub.id for sub in subs])
+    # As for a single update, items without alert_offsets keep the ones they have
+    return await crud.update_subscriptions(db, user_id, [
+        sub.model_dump(exclude=None if "alert_offsets" in sub.model_fields_set else {"alert_offsets"}) for sub in subs
+    ])
+
+@router.post("/bulk-delete", response_model=BulkDeleteResult)
+async def bulk_delete_subscriptions(body: SubscriptionIds, db: AsyncSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Delete many subscriptions by id in one transaction; nothing is deleted unless the caller owns them all"""
+    _check_bulk_size(body.ids)
+    await _check_owned(db, user_id, body.ids)
+    deleted = await crud.delete_subscriptions(db, user_id, body.ids)
+    return {"deleted": len(deleted), "ids": deleted}
+
+@router.delete("/delete-all", response_model=BulkDeleteResult)
+async def delete_all_subscriptions(db: AsyncSession = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Delete every subscription the caller owns"""
+    deleted = await crud.delete_all_subscriptions_for_user(db, user_id)
+    return {"deleted": deleted}
+
+def _import_file(user_id, upload, fmt):
+    db = SessionLocal()
+    try:
+        return subscription_io.import_subscriptions(db, user_id, upload.file, fmt)
+    finally:
+        db.close()
+
+@router.post("/import")
+async def import_subscriptions(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    user_id: int = Depends(get_current_user_id),
+):
+    """Import subscriptions from a CSV or NDJSON upload (format guessed from the file name if not given).
+
+    Valid rows are inserted in batches; invalid ones are skipped and listed in `errors`.
+    """
+    fmt = format or subscription_io.guess_format(file.filename, file.content_type)
+    # Parsing and validating a large file is CPU-bound; keep it off the event loop
+    return await run_in_threadpool(_import_file, user_id, file, fmt)
+
+@router.get("/export")
+async def export_subscriptions(format: Literal["csv", "ndjson"] = "csv", user_id: int = Depends(get_current_user_id)):
+    """Stream every subscription of the caller as CSV or NDJSON"""
+    return StreamingResponse(
+        subscription_io.export_subscriptions(user_id, format),
+        media_type=subscription_io.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="subscriptions.{format}"'},
+    )
@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from backend.database import SessionLocal
+from starlette.concurrency import run_in_threadpool
 from backend.schemas import UserCreate, UserOut, UserUpdate, TestEmailRequest
 from backend.models import User
-from backend import crud, auth
+from backend import async_crud as crud, auth
+from backend.dependencies import get_db, get_current_user_id, get_current_principal
 from backend.send_email import send_email_alert
+from backend.channels import check_webhook_url, UnsafeWebhookURL
+from backend.password_hasher import PasswordHasherBusy
 from jose import jwt
 from jose import JWTError, ExpiredSignatureError
 import os
@@ -15,93 +18,88 @@ from backend import auth as auth_module
 
 router = APIRouter()
 
-# Shared JWT secret from environment
-SECRET_KEY = os.getenv("SECRET_KEY", "change_me_to_a_random_secret")
+def _hasher_busy():
+    # Password hashing pool is saturated; shed load instead of queueing without bound
+    return HTTPException(status_code=503, detail="Server busy, please retry shortly", headers={"Retry-After": "1"})
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def get_current_user_id(authorization: str = Header(None)):
-    """Extract user ID from JWT token"""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing auth header")
-    parts = authorization.split()
-    if len(parts) != 2:
-        raise HTTPException(status_code=401, detail="Invalid auth header")
-    token = parts[1]
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        return int(payload.get("user_id"))
-    except ExpiredSignatureError:
-        # Token expired
-        raise HTTPException(status_code=401, detail="Token expired")
-    except JWTError:
-        # General JWT decode/validation error
-        raise HTTPException(status_code=401, detail="Invalid token")
+# Same secret the tokens are signed with (kept here for the debug helpers below)
+SECRET_KEY = auth.SECRET_KEY
 
 @router.post("/register", response_model=UserOut)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     try:
-        existing = crud.get_user_by_email(db, user.email)
+        existing = await crud.get_user_by_email(db, user.email)
         if existing:
             raise HTTPException(status_code=400, detail="Email already registered")
         try:
-            created = crud.create_user(db, user.email, user.password, user.phone)
+            created = await crud.create_user(db, user.email, user.password, user.phone)
             return created
         except IntegrityError as e:
-            db.rollback()
+            await db.rollback()
             if "UNIQUE constraint failed" in str(e):
                 raise HTTPException(status_code=400, detail="Email already registered")
             raise HTTPException(status_code=400, detail="Registration failed")
     except HTTPException:
         raise
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Registration error: {str(e)}")
 
 @router.post("/login")
-def login(form_data: UserCreate, db: Session = Depends(get_db)):
-    user = crud.authenticate_user(db, form_data.email, form_data.password)
+async def login(form_data: UserCreate, db: AsyncSession = Depends(get_db)):
+    try:
+        user = await crud.authenticate_user(db, form_data.email, form_data.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     token = auth.create_access_token({"sub": user.email, "user_id": user.id})
-    return {"access_token": token, "token_type": "bearer", "user": {"id": user.id, "email": user.email, "phone": user.phone, "email_alerts_enabled": user.email_alerts_enabled}}
+    return {"access_token": token, "token_type": "bearer", "user": {"id": user.id, "email": user.email, "phone": user.phone, "email_alerts_enabled": user.email_alerts_enabled, "email_digest_enabled": user.email_digest_enabled}}
 
 @router.get("/profile", response_model=UserOut)
-def get_profile(user_id: int = Depends(get_current_user_id), db: Session = Depends(get_db)):
-    """Get current user profile"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+async def get_profile(user = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
+    """Get current user profile (cached with the principal until the user changes it)"""
+    profile = auth.get_cached_profile(user.id)
+    if profile is None:
+        profile = auth.cache_profile(user.id, {**user._asdict(),
+                                               "alert_offsets": await crud.get_user_alert_offsets(db, user.id)})
+    return profile
 
 @router.put("/profile", response_model=UserOut)
-def update_profile(update_data: UserUpdate, user_id: int = Depends(get_current_user_id), db: Session = Depends(get_db)):
+async def update_profile(update_data: UserUpdate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     """Update user profile preferences"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await crud.get_user(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    if update_data.webhook_url:
+        try:
+            await run_in_threadpool(check_webhook_url, update_data.webhook_url)
+        except UnsafeWebhookURL as e:
+            raise HTTPException(status_code=422, detail=str(e))
     
-    if update_data.email_alerts_enabled is not None:
-        user.email_alerts_enabled = update_data.email_alerts_enabled
-    if update_data.phone is not None:
-        user.phone = update_data.phone
-    
-    db.commit()
-    db.refresh(user)
-    return user
+    user = await crud.update_user(
+        db, user,
+        email_alerts_enabled=update_data.email_alerts_enabled,
+        email_digest_enabled=update_data.email_digest_enabled,
+        phone=update_data.phone,
+        timezone=update_data.timezone,
+        send_window_start=update_data.send_window_start,
+        send_window_end=update_data.send_window_end,
+        whatsapp_alerts_enabled=update_data.whatsapp_alerts_enabled,
+        sms_alerts_enabled=update_data.sms_alerts_enabled,
+        webhook_url=update_data.webhook_url,
+    )
+    if update_data.alert_offsets is not None:
+        # Subscriptions without their own offsets are rescheduled on the new default
+        await crud.set_user_alert_offsets(db, user_id, update_data.alert_offsets)
+    auth.invalidate_user(user_id)
+    return {**UserOut.model_validate(user).model_dump(), "alert_offsets": await crud.get_user_alert_offsets(db, user_id)}
 
 @router.post("/send-test-email")
-def send_test_email(request: TestEmailRequest, user_id: int = Depends(get_current_user_id), db: Session = Depends(get_db)):
+async def send_test_email(request: TestEmailRequest, user = Depends(get_current_principal)):
     """Send a test email to verify email configuration"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     subject = request.subject or "Test Email from Subscription Reminder"
     message = request.message or "This is a test email."
     
@@ -109,26 +107,22 @@ def send_test_email(request: TestEmailRequest, user_id: int = Depends(get_curren
         raise HTTPException(status_code=400, detail="Email alerts are disabled. Please enable them first.")
     
     try:
-        send_email_alert(user.email, subject, message)
+        # SMTP/SendGrid calls block; keep them off the event loop
+        await run_in_threadpool(send_email_alert, user.email, subject, message)
         return {"status": "success", "message": f"Test email sent successfully to {user.email}"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to send test email: {str(e)}")
 
 
 @router.post("/smtp-config")
-def update_smtp_config(
+async def update_smtp_config(
     smtp_user: str,
     smtp_pass: str,
     smtp_server: str = "smtp.gmail.com",
     smtp_port: int = 465,
-    user_id: int = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    user = Depends(get_current_principal)
 ):
     """Update SMTP configuration in .env file (admin-only in production)"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # For now, allow any authenticated user to update (restrict to admin role in production)
     env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env")
     
@@ -1,7 +1,23 @@
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from datetime import date
-from typing import Optional
+from typing import Optional, List
+
+from .delivery_window import is_valid_timezone
+from .alert_schedule import MAX_ALERT_OFFSET
+from .channels import check_webhook_url
+
+# Most reminders one user default or subscription may have
+MAX_ALERT_OFFSETS = 10
+
+def _check_offsets(value):
+    """Days-before-renewal list: each 0..MAX_ALERT_OFFSET, returned deduplicated and largest first."""
+    if value is None:
+        return value
+    for offset in value:
+        if not 0 <= offset <= MAX_ALERT_OFFSET:
+            raise ValueError(f"Alert offsets must be between 0 and {MAX_ALERT_OFFSET} days")
+    return sorted(set(value), reverse=True)
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -13,17 +29,76 @@ class UserOut(BaseModel):
     email: EmailStr
     phone: Optional[str] = None
     email_alerts_enabled: bool = True
+    email_digest_enabled: bool = False
+    timezone: Optional[str] = None
+    send_window_start: Optional[int] = None
+    send_window_end: Optional[int] = None
+    whatsapp_alerts_enabled: bool = True
+    sms_alerts_enabled: bool = False
+    webhook_url: Optional[str] = None
+    alert_offsets: Optional[List[int]] = None
     class Config:
         from_attributes = True
 
 class UserUpdate(BaseModel):
     email_alerts_enabled: Optional[bool] = None
+    email_digest_enabled: Optional[bool] = None
     phone: Optional[str] = None
+    # Alerts go out between these local hours in this IANA timezone
+    timezone: Optional[str] = None
+    send_window_start: Optional[int] = Field(None, ge=0, le=23)
+    send_window_end: Optional[int] = Field(None, ge=0, le=24)
+    # Default days-before-renewal reminders for subscriptions without their own; [] for none
+    alert_offsets: Optional[List[int]] = Field(None, max_length=MAX_ALERT_OFFSETS)
+    # Other channels; WhatsApp and SMS go to `phone`. webhook_url "" turns the webhook off
+    whatsapp_alerts_enabled: Optional[bool] = None
+    sms_alerts_enabled: Optional[bool] = None
+    webhook_url: Optional[str] = Field(None, max_length=2048)
+
+    @field_validator("timezone")
+    @classmethod
+    def check_timezone(cls, value):
+        if value is not None and not is_valid_timezone(value):
+            raise ValueError(f"Unknown timezone '{value}'")
+        return value
+
+    @field_validator("webhook_url")
+    @classmethod
+    def check_webhook_url(cls, value):
+        # The host is resolved and checked by the route, off the event loop
+        return check_webhook_url(value, resolve=False) if value else value
+
+    @field_validator("alert_offsets")
+    @classmethod
+    def check_alert_offsets(cls, value):
+        return _check_offsets(value)
 
 class SubscriptionCreate(BaseModel):
     name: str
     renewal_date: date
     note: Optional[str] = None
+    # Days-before-renewal reminders for this subscription only; None uses the owner's default, [] none.
+    # Updates that leave it out keep the subscription's current offsets
+    alert_offsets: Optional[List[int]] = Field(None, max_length=MAX_ALERT_OFFSETS)
+
+    @field_validator("alert_offsets")
+    @classmethod
+    def check_alert_offsets(cls, value):
+        return _check_offsets(value)
+
+class SubscriptionBulkUpdate(SubscriptionCreate):
+    id: int
+
+class SubscriptionImport(SubscriptionCreate):
+    # Import files carry the start_date that exports write
+    start_date: Optional[date] = None
+
+class SubscriptionIds(BaseModel):
+    ids: List[int]
+
+class BulkDeleteResult(BaseModel):
+    deleted: int
+    ids: List[int] = []
 
 class SubscriptionOut(BaseModel):
     id: int
@@ -31,6 +106,7 @@ class SubscriptionOut(BaseModel):
     renewal_date: date
     note: Optional[str] = None
     user_id: int
+    alert_offsets: Optional[List[int]] = None
     class Config:
         from_attributes = True
 
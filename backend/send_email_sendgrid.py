@@ -2,8 +2,9 @@
 SendGrid email sender - alternative to SMTP (Gmail)
 Useful if you don't want to use Gmail or prefer SendGrid's service
 
-Installation:
-    pip install sendgrid
+Talks to the v3 Mail Send API directly over one shared keep-alive HTTP
+session, and can pack up to 1000 recipients into a single request using
+personalizations (see send_email_batch_sendgrid).
 
 Setup:
     1. Create a SendGrid account at https://sendgrid.com
@@ -12,47 +13,161 @@ Setup:
     4. Add to .env:
        SENDGRID_API_KEY=SG.xxx...xxx
        SENDGRID_FROM_EMAIL=your-verified@example.com
+       SENDGRID_API_URL=https://api.sendgrid.com/v3/mail/send   (optional, e.g. a local fake)
+       SENDGRID_CONNECT_TIMEOUT=5   (optional, seconds to establish the connection)
+       SENDGRID_TIMEOUT=30          (optional, seconds to wait for the response)
 """
 
+import logging
 import os
+import re
+import threading
+import requests
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def send_email_alert_sendgrid(to_email, subject, message):
-    """Send email using SendGrid API instead of SMTP"""
+logger = logging.getLogger(__name__)
+
+DEFAULT_SENDGRID_API_URL = "https://api.sendgrid.com/v3/mail/send"
+MAX_PERSONALIZATIONS = 1000  # SendGrid limit per request
+
+# Substitution tag used when a message has no template of its own
+BODY_TAG = "-body-"
+
+API_ERROR = "SendGrid API error:"
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session():
+    """One requests.Session (connection pool + keep-alive) shared by every send."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+        return _session
+
+
+def _env_float(name, default):
     try:
-        from sendgrid import SendGridAPIClient  # type: ignore
-        from sendgrid.helpers.mail import Mail  # type: ignore
-    except ImportError:
-        raise Exception("SendGrid not installed. Run: pip install sendgrid")
-    
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _timeout():
+    """(connect, read) timeouts for requests, so an unreachable API fails fast."""
+    return _env_float("SENDGRID_CONNECT_TIMEOUT", 5), _env_float("SENDGRID_TIMEOUT", 30)
+
+
+def is_recipient_error(error):
+    """True for a 400 that SendGrid blamed on the message (e.g. an invalid address) rather than the service failing."""
+    return error.startswith(f"{API_ERROR} 400")
+
+
+def _config():
     api_key = os.getenv("SENDGRID_API_KEY")
     from_email = os.getenv("SENDGRID_FROM_EMAIL")
-    
     if not api_key or not from_email:
         raise Exception(
             "SendGrid not configured. Set SENDGRID_API_KEY and SENDGRID_FROM_EMAIL in .env"
         )
-    
+    return api_key, from_email, os.getenv("SENDGRID_API_URL", DEFAULT_SENDGRID_API_URL)
+
+
+def _personalization(message):
+    substitutions = message.get("substitutions") or {BODY_TAG: message["body"]}
+    return {
+        "to": [{"email": message["to"]}],
+        "subject": message["subject"],
+        "substitutions": substitutions,
+    }
+
+
+def _failed_indexes(response):
+    """Indexes of personalizations a 400 response blames, e.g. field 'personalizations.3.to.0.email'."""
     try:
-        mail = Mail(
-            from_email=from_email,
-            to_emails=to_email,
-            subject=subject,
-            plain_text_content=message
+        errors = response.json().get("errors", [])
+    except ValueError:
+        return set()
+    indexes = set()
+    for err in errors:
+        match = re.match(r"personalizations\.(\d+)", err.get("field") or "")
+        if match:
+            indexes.add(int(match.group(1)))
+    return indexes
+
+
+def _post_chunk(api_key, from_email, url, template, chunk):
+    """Send one request for `chunk` (list of (position, message)); return {position: error}."""
+    payload = {
+        "from": {"email": from_email},
+        "personalizations": [_personalization(m) for _, m in chunk],
+        "content": [{"type": "text/plain", "value": template}],
+    }
+    try:
+        response = _get_session().post(
+            url, json=payload, timeout=_timeout(),
+            headers={"Authorization": f"Bearer {api_key}"},
         )
-        sg = SendGridAPIClient(api_key)
-        response = sg.send(mail)
-        
-        if response.status_code in [200, 201, 202]:
-            print(f"Email sent successfully via SendGrid to {to_email}")
-            return True
-        else:
-            raise Exception(f"SendGrid API error: {response.status_code}")
     except Exception as e:
-        print(f"SendGrid email failed: {e}")
-        raise Exception(f"Failed to send email via SendGrid: {str(e)}")
+        return {pos: f"SendGrid request failed: {e}" for pos, _ in chunk}
+
+    if response.status_code in [200, 201, 202]:
+        return {}
+    error = f"{API_ERROR} {response.status_code} {response.text[:200]}"
+    bad = _failed_indexes(response) if response.status_code == 400 else set()
+    if not bad or len(bad) == len(chunk):
+        return {pos: error for pos, _ in chunk}
+    # Drop only the recipients SendGrid rejected and resend the rest
+    failures = {chunk[i][0]: error for i in bad if i < len(chunk)}
+    rest = [item for i, item in enumerate(chunk) if i not in bad]
+    failures.update(_post_chunk(api_key, from_email, url, template, rest))
+    return failures
+
+
+def send_email_batch_sendgrid(messages):
+    """Send many emails with as few API calls as possible.
+
+    `messages` is a list of dicts with `to`, `subject` and `body`. A message may
+    instead carry a shared `template` plus per-recipient `substitutions`; messages
+    with the same template go out together, up to 1000 per request.
+
+    Returns a list aligned with `messages`: None for accepted, an error string otherwise.
+    """
+    results = [None] * len(messages)
+    if not messages:
+        return results
+    try:
+        api_key, from_email, url = _config()
+    except Exception as e:
+        return [str(e)] * len(messages)
+
+    groups = {}
+    for pos, message in enumerate(messages):
+        groups.setdefault(message.get("template") or BODY_TAG, []).append((pos, message))
+
+    for template, items in groups.items():
+        for start in range(0, len(items), MAX_PERSONALIZATIONS):
+            chunk = items[start:start + MAX_PERSONALIZATIONS]
+            for pos, error in _post_chunk(api_key, from_email, url, template, chunk).items():
+                results[pos] = error
+
+    sent = sum(1 for r in results if r is None)
+    logger.debug("SendGrid batch: %d/%d email(s) accepted", sent, len(messages))
+    return results
+
+
+def send_email_alert_sendgrid(to_email, subject, message):
+    """Send email using SendGrid API instead of SMTP"""
+    error = send_email_batch_sendgrid([{"to": to_email, "subject": subject, "body": message}])[0]
+    if error:
+        logger.debug("SendGrid email failed: %s", error)
+        raise Exception(f"Failed to send email via SendGrid: {error}")
+    logger.debug("Email sent successfully via SendGrid to %s", to_email)
+    return True
 
 
 if __name__ == "__main__":
@@ -0,0 +1,186 @@
+"""
+Pooled SMTP sessions.
+
+Opening an SMTP connection costs a TCP connect, a TLS handshake and a LOGIN
+round-trip. SMTPConnectionPool keeps up to `size` authenticated sessions open
+and hands them out to callers (scheduler worker threads and API routes alike).
+
+- Sessions idle longer than `idle_timeout` seconds are closed instead of reused.
+- Sessions idle longer than `noop_after` seconds are probed with NOOP first.
+- A send that fails because the server dropped the connection is retried once
+  on a fresh session.
+
+Configuration (ENV):
+    SMTP_POOL_SIZE          max open sessions (default 4)
+    SMTP_POOL_IDLE_TIMEOUT  seconds before an idle session is discarded (default 60)
+    SMTP_POOL_NOOP_AFTER    idle seconds after which NOOP is sent before reuse (default 5)
+    SMTP_SECURITY           ssl | starttls | none (default: ssl on port 465, else starttls)
+    SMTP_CONNECT_TIMEOUT    seconds allowed to connect, handshake and log in (default 10)
+    SMTP_TIMEOUT            socket timeout for each command once connected (default 30)
+"""
+from collections import deque
+from contextlib import contextmanager
+import os
+import smtplib
+import threading
+import time
+
+
+# Errors meaning the session is unusable but a fresh one may well work
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+# Errors where the server answered, so the session itself is still healthy
+SERVER_REPLY_ERRORS = (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)
+
+
+class SMTPConnectionPool:
+    def __init__(self, host, port, user=None, password=None, size=4, idle_timeout=60,
+                 noop_after=5, security="ssl", timeout=30, connect_timeout=10):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.noop_after = noop_after
+        self.security = security
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._idle = deque()  # (connection, last_used) pairs, most recent on the right
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self.stats = {"connects": 0, "reuses": 0, "reconnects": 0}
+
+    def _connect(self):
+        # A throttling or unreachable server should fail within connect_timeout, not the send timeout
+        if self.security == "ssl":
+            conn = smtplib.SMTP_SSL(self.host, self.port, timeout=self.connect_timeout)
+        else:
+            conn = smtplib.SMTP(self.host, self.port, timeout=self.connect_timeout)
+        try:
+            if self.security == "starttls":
+                conn.starttls()
+            if self.user:
+                conn.login(self.user, self.password)
+            conn.sock.settimeout(self.timeout)
+        except Exception:
+            self._close(conn)
+            raise
+        with self._lock:
+            self.stats["connects"] += 1
+        return conn
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, conn):
+        try:
+            return conn.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, last_used = self._idle.pop()
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.idle_timeout:
+                self._close(conn)
+                continue
+            if idle_for > self.noop_after and not self._is_alive(conn):
+                self._close(conn)
+                continue
+            with self._lock:
+                self.stats["reuses"] += 1
+            return conn
+        return self._connect()
+
+    def _checkin(self, conn):
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        """Borrow a session; it is discarded instead of returned if the caller hit a non-reply error."""
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        except Exception as e:
+            if conn is not None and not isinstance(e, SERVER_REPLY_ERRORS):
+                self._close(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._checkin(conn)
+            self._slots.release()
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        try:
+            with self.connection() as conn:
+                return conn.sendmail(from_addr, to_addrs, msg)
+        except RECONNECT_ERRORS:
+            with self._lock:
+                self.stats["reconnects"] += 1
+            with self.connection() as conn:
+                return conn.sendmail(from_addr, to_addrs, msg)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._close(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def get_smtp_pool():
+    """Return the shared pool for the SMTP settings currently in the environment."""
+    server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+    port = int(os.getenv("SMTP_PORT", "465"))
+    user = os.getenv("SMTP_USER", "your_email@gmail.com")
+    password = os.getenv("SMTP_PASS", "your_app_password")
+    security = os.getenv("SMTP_SECURITY") or ("ssl" if port == 465 else "starttls")
+    key = (server, port, user, password, security)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SMTPConnectionPool(
+                server, port, user, password,
+                size=max(1, _env_int("SMTP_POOL_SIZE", 4)),
+                idle_timeout=_env_int("SMTP_POOL_IDLE_TIMEOUT", 60),
+                noop_after=_env_int("SMTP_POOL_NOOP_AFTER", 5),
+                security=security,
+                timeout=_env_int("SMTP_TIMEOUT", 30),
+                connect_timeout=_env_int("SMTP_CONNECT_TIMEOUT", 10),
+            )
+            _pools[key] = pool
+        return pool
+
+
+def close_smtp_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,139 @@
+"""
+Streaming CSV / NDJSON import and export of a user's subscriptions.
+
+Imports read the uploaded file line by line, validate each record with
+SubscriptionImport and insert valid rows IMPORT_BATCH_SIZE at a time (one
+transaction per batch), so memory stays flat however large the file is.
+Invalid rows are skipped and reported with their line number.
+
+Exports stream rows from a server-side cursor in EXPORT_CHUNK_SIZE partitions
+and encode each partition as it arrives.
+
+CSV columns: id, name, renewal_date (YYYY-MM-DD), note, start_date (YYYY-MM-DD),
+so an export can be imported again as is. Only name and renewal_date are
+required; id and any other columns are ignored on import.
+
+Configuration (ENV):
+    IMPORT_BATCH_SIZE   rows inserted per transaction (default 1000)
+    EXPORT_CHUNK_SIZE   rows fetched per round trip while exporting (default 1000)
+"""
+import csv
+import io
+import json
+import os
+from datetime import date
+
+from pydantic import ValidationError
+from sqlalchemy import select
+
+from . import crud
+from .database import AsyncSessionLocal
+from .models import Subscription
+from .schemas import SubscriptionImport
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+EXPORT_COLUMNS = ["id", "name", "renewal_date", "note", "start_date"]
+
+# Only the first errors are returned to the client; the rest are just counted
+MAX_REPORTED_ERRORS = 1000
+
+
+def _env_int(name, default):
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except ValueError:
+        return default
+
+def guess_format(filename, content_type=None):
+    """'csv' or 'ndjson' from an upload's file name / content type (CSV when unsure)."""
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or (content_type or "").endswith(("ndjson", "jsonlines")):
+        return "ndjson"
+    return "csv"
+
+
+def _csv_records(text):
+    reader = csv.DictReader(text)
+    for record in reader:
+        # Spreadsheets export missing cells as "", which should mean "not set"
+        yield reader.line_num, {k: v for k, v in record.items() if k and v not in ("", None)}
+
+def _ndjson_records(text):
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, e
+            continue
+        yield line_no, record if isinstance(record, dict) else ValueError("expected a JSON object")
+
+def _describe(error):
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(str(p) for p in e['loc']) or 'row'}: {e['msg']}" for e in error.errors())
+    return str(error)
+
+
+def import_subscriptions(db, user_id, fileobj, fmt="csv", batch_size=None):
+    """Import subscriptions for `user_id` from a binary file object.
+
+    Runs synchronously (call it from a worker thread). Returns a summary dict:
+    imported / failed counts and up to MAX_REPORTED_ERRORS {"line", "error"} entries.
+    """
+    batch_size = batch_size or _env_int("IMPORT_BATCH_SIZE", 1000)
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    records = _ndjson_records(text) if fmt == "ndjson" else _csv_records(text)
+    summary = {"imported": 0, "failed": 0, "errors": [], "aborted": None}
+    batch = []
+    line_no = 0
+    try:
+        for line_no, record in records:
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                batch.append(SubscriptionImport.model_validate(record).model_dump())
+            except (ValidationError, ValueError) as e:
+                summary["failed"] += 1
+                if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                    summary["errors"].append({"line": line_no, "error": _describe(e)})
+                continue
+            if len(batch) >= batch_size:
+                summary["imported"] += crud.insert_subscription_rows(db, user_id, batch)
+                batch.clear()
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Unreadable input: keep the rows parsed so far and say where reading stopped
+        summary["aborted"] = f"Could not read the file after line {line_no}: {e}"
+    finally:
+        # Don't let the wrapper close the upload's file; the framework owns it
+        text.detach()
+    summary["imported"] += crud.insert_subscription_rows(db, user_id, batch)
+    return summary
+
+
+def _encode(rows, fmt):
+    if fmt == "ndjson":
+        return "".join(
+            json.dumps({col: value.isoformat() if isinstance(value, date) else value
+                        for col, value in zip(EXPORT_COLUMNS, row)}) + "\n"
+            for row in rows
+        )
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue()
+
+async def export_subscriptions(user_id, fmt="csv", session_factory=AsyncSessionLocal, chunk_size=None):
+    """Async generator of text chunks holding every subscription of `user_id`, oldest renewal first."""
+    chunk_size = chunk_size or _env_int("EXPORT_CHUNK_SIZE", 1000)
+    if fmt == "csv":
+        yield _encode([EXPORT_COLUMNS], fmt)
+    stmt = (
+        select(*[getattr(Subscription, col) for col in EXPORT_COLUMNS])
+        .where(Subscription.user_id == user_id)
+        .order_by(Subscription.renewal_date, Subscription.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    async with session_factory() as db:
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            yield _encode(rows, fmt)
@@ -0,0 +1,56 @@
+"""
+API tests against a throwaway SQLite database.
+
+Run from the project root:
+    python -m pytest backend/tests
+"""
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# Must be set before backend.database is imported
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ.setdefault("DEFAULT_SEND_WINDOW", "none")
+# No real email provider, whatever backend/.env configures
+os.environ["EMAIL_PROVIDERS"] = "none"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from backend.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def _register(client):
+    email = f"user-{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/auth/register", json={"email": email, "password": "password"})
+    token = client.post("/auth/login", json={"email": email, "password": "password"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def register(client):
+    """Call it for the Authorization headers of another freshly registered user."""
+    return lambda: _register(client)
+
+
+@pytest.fixture
+def auth_headers(client):
+    """Authorization headers for a freshly registered user."""
+    return _register(client)
+
+
+@pytest.fixture
+def db(client):
+    """A session on the test database, for checking what the API and the sweep wrote."""
+    from backend.database import SessionLocal
+
+    session = SessionLocal()
+    yield session
+    session.close()
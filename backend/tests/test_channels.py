@@ -0,0 +1,124 @@
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.channels import Channel, UnsafeWebhookURL, WebhookChannel, check_webhook_url
+from backend.models import User
+
+
+class RecordingChannel(Channel):
+    name = "recording"
+
+    def __init__(self):
+        self.sent = []
+
+    def reachable(self):
+        return User.phone.isnot(None)
+
+    def recipient(self):
+        return User.phone
+
+    def send(self, recipient, subject, body):
+        if recipient == "bad":
+            raise Exception("rejected")
+        self.sent.append(recipient)
+
+
+def test_channel_without_send_cannot_be_created():
+    class Incomplete(Channel):
+        name = "incomplete"
+
+        def reachable(self):
+            return User.phone.isnot(None)
+
+        def recipient(self):
+            return User.phone
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_default_send_batch_sends_each_message():
+    channel = RecordingChannel()
+    errors = channel.send_batch([{"to": "a", "subject": "s", "body": "b"},
+                                 {"to": "bad", "subject": "s", "body": "b"},
+                                 {"to": "c", "subject": "s", "body": "b"}])
+    assert errors == [None, "rejected", None]
+    assert channel.sent == ["a", "c"]
+
+
+@pytest.fixture
+def resolves_to(monkeypatch):
+    """Make every hostname resolve to the given address."""
+    def resolve(address):
+        family = socket.AF_INET6 if ":" in address else socket.AF_INET
+        monkeypatch.setattr(socket, "getaddrinfo", lambda host, port, *args, **kwargs:
+                            [(family, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (address, port))])
+    return resolve
+
+
+@pytest.mark.parametrize("url", [
+    "http://hooks.example.com/alert",
+    "https:///alert",
+    "https://127.0.0.1/alert",
+    "https://169.254.169.254/latest/meta-data",
+    "https://10.0.0.8/alert",
+    "https://100.64.0.1/alert",
+    "https://[::1]/alert",
+    "https://[::ffff:127.0.0.1]/alert",
+])
+def test_unsafe_webhook_urls_are_rejected_without_a_lookup(url):
+    with pytest.raises(UnsafeWebhookURL):
+        check_webhook_url(url, resolve=False)
+
+
+def test_hostname_resolving_to_a_private_address_is_rejected(resolves_to):
+    resolves_to("192.168.1.10")
+    with pytest.raises(UnsafeWebhookURL, match="non-public"):
+        check_webhook_url("https://hooks.example.com/alert")
+    resolves_to("93.184.216.34")
+    assert check_webhook_url("https://hooks.example.com/alert") == "https://hooks.example.com/alert"
+
+
+def test_profile_rejects_an_unsafe_webhook_url(client, auth_headers, resolves_to):
+    response = client.put("/auth/profile", headers=auth_headers, json={"webhook_url": "https://10.1.2.3/hook"})
+    assert response.status_code == 422
+    resolves_to("127.0.0.1")
+    response = client.put("/auth/profile", headers=auth_headers, json={"webhook_url": "https://hooks.example.com/hook"})
+    assert response.status_code == 422
+    assert client.get("/auth/profile", headers=auth_headers).json()["webhook_url"] is None
+
+
+def test_send_refuses_a_host_that_now_resolves_to_loopback(resolves_to):
+    # Saved while public; DNS now points the host at the machine itself
+    resolves_to("127.0.0.1")
+    with pytest.raises(UnsafeWebhookURL):
+        WebhookChannel().send("https://hooks.example.com/alert", "Reminder", "Renews soon")
+
+
+class WebhookStub(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.server.payloads.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_loopback_is_allowed_only_when_configured(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), WebhookStub)
+    server.payloads = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/hook"
+    try:
+        with pytest.raises(UnsafeWebhookURL):
+            WebhookChannel().send(url, "Reminder", "Renews soon")
+        monkeypatch.setenv("WEBHOOK_ALLOW_LOOPBACK", "1")
+        WebhookChannel().send(url, "Reminder", "Renews soon")
+    finally:
+        server.shutdown()
+    assert server.payloads == [{"event": "subscription.reminder", "subject": "Reminder", "body": "Renews soon"}]
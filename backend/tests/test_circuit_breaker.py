@@ -0,0 +1,88 @@
+from backend.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _breaker(clock, **kwargs):
+    return CircuitBreaker("test", **{"error_rate": 0.5, "min_calls": 4, "window": 60, "cooldown": 30,
+                                     "max_cooldown": 100, "clock": clock, **kwargs})
+
+
+def _fail(breaker, times):
+    for _ in range(times):
+        assert breaker.allow()
+        breaker.record(False, "timeout")
+
+
+def test_opens_only_once_the_window_holds_enough_calls():
+    breaker = _breaker(FakeClock())
+    _fail(breaker, 3)
+    assert breaker.state == CLOSED
+    _fail(breaker, 1)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.snapshot()["last_error"] == "timeout"
+
+
+def test_old_failures_age_out_of_the_window():
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    _fail(breaker, 3)
+    clock.now = 61
+    for _ in range(3):
+        breaker.record(True)
+    breaker.record(False, "timeout")
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["error_rate"] == 0.25
+
+
+def test_half_open_probe_success_closes():
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    _fail(breaker, 4)
+    clock.now = 29
+    assert not breaker.allow()
+    clock.now = 30
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # One probe at a time
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["calls"] == 0
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_with_a_longer_cooldown_up_to_the_cap():
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    _fail(breaker, 4)
+    for cooldown in (60, 100, 100):
+        clock.now += breaker.cooldown
+        _fail(breaker, 1)
+        assert breaker.state == OPEN
+        assert breaker.cooldown == cooldown
+        assert breaker.snapshot()["retry_in"] == cooldown
+    # Closing resets the cooldown
+    clock.now += breaker.cooldown
+    assert breaker.allow()
+    breaker.record(True)
+    assert (breaker.state, breaker.cooldown, breaker.trips) == (CLOSED, 30, 4)
+
+
+def test_lost_probe_is_retried_after_a_cooldown():
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    _fail(breaker, 4)
+    clock.now = 30
+    assert breaker.allow()
+    clock.now = 59
+    assert not breaker.allow()
+    clock.now = 60
+    assert breaker.allow()
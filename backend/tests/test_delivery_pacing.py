@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+from backend.database import SessionLocal
+from backend.delivery_window import send_time
+from backend.token_bucket import SharedTokenBucket, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_shared_bucket_is_one_budget_for_every_process(client):
+    clock = FakeClock()
+    # Two workers spending from the same row: 1 token a second, 2 at most
+    first, second = (SharedTokenBucket(SessionLocal, "test-shared", 1, 2, clock=clock, sleep=clock.sleep)
+                     for _ in range(2))
+    assert first.take(2) == 0
+    waited = second.take(1)
+    assert 0.9 < waited <= 1.1
+    clock.now += 1
+    assert first.take(1) == 0
+    assert second.take(1) > 0
+
+
+def test_send_slot_is_the_same_for_every_sweep_of_the_day():
+    morning = datetime(2026, 10, 19, 6, 0)
+    key = "42:2026-10-19"
+    slot = send_time(morning, "UTC", 9, 18, key)
+    assert datetime(2026, 10, 19, 9) <= slot < datetime(2026, 10, 19, 18)
+    # A sweep fifteen minutes later (or any time before the slot) picks the same one
+    assert send_time(morning + timedelta(minutes=15), "UTC", 9, 18, key) == slot
+    assert send_time(slot - timedelta(minutes=1), "UTC", 9, 18, key) == slot
+    # Once it has passed, while the window is still open, the alert goes now
+    late = slot + timedelta(minutes=1)
+    assert send_time(late, "UTC", 9, 18, key) == late
+
+
+def test_token_bucket_allows_a_burst_then_paces():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=4, clock=clock, sleep=clock.sleep)
+    assert bucket.take(4) == 0
+    assert bucket.take(1) == 0.5
+    # Asking for more than the bucket holds waits for a full one and leaves the rest as debt
+    assert bucket.take(10) == 2.0
+    assert bucket.take(1) == 3.5
+
+
+def test_alert_due_before_the_window_waits_for_it():
+    slot = send_time(datetime(2026, 10, 19, 6, 0), "UTC", 9, 18, "7:2026-10-19")
+    assert datetime(2026, 10, 19, 9) <= slot < datetime(2026, 10, 19, 18)
+
+
+def test_alert_due_after_the_window_goes_in_the_next_one():
+    slot = send_time(datetime(2026, 10, 19, 20, 0), "UTC", 9, 18, "7:2026-10-19")
+    assert datetime(2026, 10, 20, 9) <= slot < datetime(2026, 10, 20, 18)
+
+
+def test_window_is_in_the_users_timezone():
+    # 09-18 in Tokyo (UTC+9) is 00-09 UTC
+    slot = send_time(datetime(2026, 10, 19, 12, 0), "Asia/Tokyo", 9, 18, "7:2026-10-19")
+    assert datetime(2026, 10, 20, 0) <= slot < datetime(2026, 10, 20, 9)
+
+
+def test_window_may_wrap_past_midnight():
+    # 22-06 is still open at 02:00, in the window that opened the evening before
+    now = datetime(2026, 10, 19, 2, 0)
+    slot = send_time(now, "UTC", 22, 6, "7:2026-10-19")
+    assert now <= slot < datetime(2026, 10, 19, 6)
+
+
+def test_no_default_window_sends_at_once(monkeypatch):
+    monkeypatch.setenv("DEFAULT_SEND_WINDOW", "none")
+    now = datetime(2026, 10, 19, 3, 0)
+    assert send_time(now, spread_key="7:2026-10-19") == now
+
+
+def test_users_are_spread_over_the_window():
+    slots = {send_time(datetime(2026, 10, 19, 6, 0), "UTC", 9, 18, f"{user}:2026-10-19") for user in range(50)}
+    assert len(slots) > 40
+    assert max(slots) - min(slots) > timedelta(hours=6)
@@ -0,0 +1,82 @@
+import pytest
+
+from backend.circuit_breaker import CLOSED, OPEN
+from backend.email_providers import EmailProvider, EmailRouter, RecipientRejected
+
+
+class FakeProvider(EmailProvider):
+    """Sends through a list; `down` makes every send fail, `unknown` recipients are refused."""
+    name = "fake"
+
+    def __init__(self, down=False, name="fake"):
+        self.name = name
+        super().__init__()
+        self.down = down
+        self.sent = []
+
+    def configured(self):
+        return True
+
+    def send(self, to_email, subject, message):
+        if self.down:
+            raise Exception("connection refused")
+        if to_email.startswith("unknown"):
+            raise RecipientRejected(f"no such mailbox: {to_email}")
+        self.sent.append(to_email)
+
+
+def _messages(*recipients):
+    return [{"to": to, "subject": "Reminder", "body": "Renews soon"} for to in recipients]
+
+
+def test_provider_without_send_cannot_be_created():
+    class Incomplete(EmailProvider):
+        name = "incomplete"
+
+        def configured(self):
+            return True
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_default_send_batch_sends_each_and_marks_refusals():
+    provider = FakeProvider()
+    errors = provider.send_batch(_messages("a@example.com", "unknown@example.com"))
+    assert errors[0] is None
+    assert provider.rejects(errors[1])
+    assert provider.sent == ["a@example.com"]
+
+
+def test_router_batches_through_a_provider_with_the_default_send_batch(monkeypatch):
+    monkeypatch.setenv("EMAIL_PROVIDERS", "fake")
+    provider = FakeProvider()
+    provider.batches = True
+    results = EmailRouter([provider]).send_batch(_messages("a@example.com", "unknown@example.com", "b@example.com"))
+    assert results[0] is None and results[2] is None
+    assert "no such mailbox" in results[1]
+    assert provider.sent == ["a@example.com", "b@example.com"]
+
+
+def test_router_fails_over_while_a_breaker_is_open_and_returns_once_it_closes(monkeypatch):
+    monkeypatch.setenv("EMAIL_PROVIDERS", "primary,backup")
+    primary, backup = FakeProvider(down=True, name="primary"), FakeProvider(name="backup")
+    router = EmailRouter([primary, backup])
+    clock = [0.0]
+    primary.breaker._clock = lambda: clock[0]
+    for i in range(primary.breaker.min_calls):
+        assert router.send_batch(_messages(f"u{i}@example.com")) == [None]
+    assert primary.breaker.state == OPEN
+    assert router.preferred() is backup
+
+    # While open the primary isn't tried at all
+    primary.down = False
+    router.send_batch(_messages("open@example.com"))
+    assert primary.sent == [] and backup.sent[-1] == "open@example.com"
+
+    # After the cooldown one probe goes to the primary and closes it
+    clock[0] += primary.breaker.cooldown
+    router.send_batch(_messages("probe@example.com"))
+    assert primary.sent == ["probe@example.com"]
+    assert primary.breaker.state == CLOSED
+    assert router.health()["primary"]["state"] == CLOSED
@@ -0,0 +1,57 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from backend import leases
+from backend.database import SessionLocal
+from backend.models import Outbox
+from backend.reminder_job import due_subscription_keys, run_sweep
+
+TODAY = date.today()
+
+
+@pytest.fixture
+def due_ids(client, auth_headers):
+    """Six subscriptions whose 5-day reminder is due today."""
+    renewal = str(TODAY + timedelta(days=5))
+    return [client.post("/subscription/add", headers=auth_headers,
+                        json={"name": f"Sub {i}", "renewal_date": renewal, "alert_offsets": [5]}).json()["id"]
+            for i in range(6)]
+
+
+def test_lease_is_exclusive_until_it_expires(db):
+    now = datetime.utcnow()
+    assert leases.try_acquire(db, "test:exclusive", owner="a", ttl=60, now=now)
+    assert not leases.try_acquire(db, "test:exclusive", owner="b", ttl=60, now=now)
+    assert leases.renew(db, "test:exclusive", owner="a", ttl=60, now=now)
+    # a stopped renewing: b takes over once the lease has run out, and a can't renew it back
+    later = now + timedelta(seconds=61)
+    assert leases.try_acquire(db, "test:exclusive", owner="b", ttl=60, now=later)
+    assert not leases.renew(db, "test:exclusive", owner="a", ttl=60, now=later)
+
+
+def test_released_lease_is_free_at_once(db):
+    assert leases.try_acquire(db, "test:release", owner="a", ttl=60)
+    leases.release(db, "test:release", owner="a")
+    assert leases.try_acquire(db, "test:release", owner="b", ttl=60)
+
+
+def test_shards_split_the_due_subscriptions(db, due_ids):
+    everything = {key.id for key in due_subscription_keys(db, TODAY)}
+    shards = [{key.id for key in due_subscription_keys(db, TODAY, shard, 3)} for shard in range(3)]
+    assert set.union(*shards) == everything
+    assert sum(len(shard) for shard in shards) == len(everything)
+    assert set(due_ids) <= everything
+
+
+def test_sweep_skips_shards_leased_by_another_worker(db, due_ids, monkeypatch):
+    monkeypatch.setenv("SCHEDULER_SHARDS", "2")
+    assert leases.try_acquire(db, "sweep:0", owner="other-worker", ttl=60)
+    try:
+        totals = run_sweep(SessionLocal, today=TODAY)
+    finally:
+        leases.release(db, "sweep:0", owner="other-worker")
+    assert totals["shards"] == 1
+    queued = set(db.scalars(select(Outbox.subscription_id).where(Outbox.subscription_id.in_(due_ids))))
+    assert queued == {i for i in due_ids if i % 2 == 1}
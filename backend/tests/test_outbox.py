@@ -0,0 +1,115 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+
+from backend import outbox_worker
+from backend.models import AlertLog, Outbox
+
+
+@pytest.fixture
+def subscription_id(client, auth_headers):
+    response = client.post("/subscription/add", headers=auth_headers,
+                           json={"name": "Netflix", "renewal_date": str(date.today() + timedelta(days=40))})
+    return response.json()["id"]
+
+
+def _queue(db, subscription_id, status="pending", **values):
+    row = {"subscription_id": subscription_id, "offset": 30, "channel": "email", "recipient": "to@example.com",
+           "subject": "Reminder", "body": "Renews soon", "status": status, "attempts": 0,
+           "next_attempt_at": datetime.utcnow() - timedelta(seconds=1), "created_at": datetime.utcnow(), **values}
+    row_id = db.execute(insert(Outbox).values(**row)).inserted_primary_key[0]
+    db.commit()
+    return row_id
+
+
+def _row(db, row_id):
+    db.expire_all()
+    return db.get(Outbox, row_id)
+
+
+def test_requeue_dead_puts_rows_back_with_fresh_attempts(db, subscription_id):
+    dead = _queue(db, subscription_id, status="dead", attempts=5, channel="sms")
+    other = _queue(db, subscription_id, status="dead", attempts=5, channel="whatsapp")
+
+    assert outbox_worker.requeue_dead(db, channel="sms") == 1
+    assert (_row(db, dead).status, _row(db, dead).attempts) == ("pending", 0)
+    assert _row(db, other).status == "dead"
+
+
+def test_prune_deletes_old_sent_and_dead_rows_only(db, subscription_id, monkeypatch):
+    monkeypatch.setenv("OUTBOX_RETENTION_DAYS", "30")
+    old = datetime.utcnow() - timedelta(days=31)
+    old_sent = _queue(db, subscription_id, status="sent", sent_at=old, created_at=old)
+    old_dead = _queue(db, subscription_id, status="dead", created_at=old)
+    old_pending = _queue(db, subscription_id, created_at=old, next_attempt_at=datetime.utcnow() + timedelta(days=1))
+    recent_sent = _queue(db, subscription_id, status="sent", sent_at=datetime.utcnow())
+
+    outbox_worker.prune_outbox(db)
+    remaining = set(db.scalars(select(Outbox.id).where(Outbox.subscription_id == subscription_id)))
+    assert old_sent not in remaining and old_dead not in remaining
+    assert {old_pending, recent_sent} <= remaining
+
+
+@pytest.fixture
+def sends(monkeypatch):
+    """Replaces delivery: records (channel, recipient) and fails for recipients starting with 'fail'."""
+    sent = []
+
+    def deliver(channel, recipient, subject, body):
+        if recipient.startswith("fail"):
+            raise Exception("provider unavailable")
+        sent.append((channel, recipient))
+
+    monkeypatch.setattr(outbox_worker, "deliver", deliver)
+    monkeypatch.setenv("OUTBOX_MAX_ATTEMPTS", "3")
+    monkeypatch.setenv("OUTBOX_BACKOFF_SECONDS", "60")
+    monkeypatch.setenv("OUTBOX_MAX_BACKOFF", "100")
+    return sent
+
+
+def test_sent_row_is_logged(db, subscription_id, sends):
+    row_id = _queue(db, subscription_id, channel="sms", recipient="+15550101")
+    outbox_worker.drain_outbox(db=db)
+    row = _row(db, row_id)
+    assert (row.status, row.attempts) == ("sent", 1)
+    assert ("sms", "+15550101") in sends
+    logged = db.scalars(select(AlertLog.channel).where(AlertLog.subscription_id == subscription_id)).all()
+    assert logged == ["sms"]
+
+
+def test_failed_send_is_retried_with_backoff(db, subscription_id, sends):
+    row_id = _queue(db, subscription_id, channel="sms", recipient="fail-1")
+    before = datetime.utcnow()
+    outbox_worker.drain_outbox(db=db)
+    row = _row(db, row_id)
+    assert (row.status, row.attempts, row.last_error) == ("pending", 1, "provider unavailable")
+    assert timedelta(seconds=59) < row.next_attempt_at - before < timedelta(seconds=62)
+    # Not due again yet, so a second drain leaves it alone
+    outbox_worker.drain_outbox(db=db)
+    assert _row(db, row_id).attempts == 1
+
+
+def test_backoff_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setenv("OUTBOX_BACKOFF_SECONDS", "60")
+    monkeypatch.setenv("OUTBOX_MAX_BACKOFF", "200")
+    assert [outbox_worker.backoff_delay(n) for n in (1, 2, 3, 4)] == [60, 120, 200, 200]
+
+
+def test_row_is_dead_lettered_after_max_attempts(db, subscription_id, sends):
+    row_id = _queue(db, subscription_id, channel="sms", recipient="fail-2", attempts=2)
+    summary = outbox_worker.drain_outbox(db=db)
+    row = _row(db, row_id)
+    assert (row.status, row.attempts) == ("dead", 3)
+    assert summary["dead"] >= 1
+
+
+def test_row_left_sending_by_a_crashed_worker_is_reclaimed(db, subscription_id, sends, monkeypatch):
+    monkeypatch.setenv("OUTBOX_CLAIM_TIMEOUT", "600")
+    stale = _queue(db, subscription_id, channel="sms", recipient="+15550102", status="sending",
+                   attempts=1, claimed_at=datetime.utcnow() - timedelta(minutes=11), claimed_by="gone:1")
+    fresh = _queue(db, subscription_id, channel="sms", recipient="+15550103", status="sending",
+                   attempts=1, claimed_at=datetime.utcnow(), claimed_by="alive:1")
+    outbox_worker.drain_outbox(db=db)
+    assert _row(db, stale).status == "sent"
+    assert _row(db, fresh).status == "sending"
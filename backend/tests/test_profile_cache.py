@@ -0,0 +1,34 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from backend.database import async_engine
+
+
+@contextmanager
+def _count_statements():
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+
+def test_cached_profile_needs_no_queries(client, auth_headers):
+    first = client.get("/auth/profile", headers=auth_headers).json()
+    with _count_statements() as statements:
+        second = client.get("/auth/profile", headers=auth_headers).json()
+    assert second == first
+    assert statements == []
+
+
+def test_profile_update_replaces_the_cached_profile(client, auth_headers):
+    client.get("/auth/profile", headers=auth_headers)
+    response = client.put("/auth/profile", headers=auth_headers, json={"alert_offsets": [14, 3]})
+    assert response.status_code == 200
+    assert client.get("/auth/profile", headers=auth_headers).json()["alert_offsets"] == [14, 3]
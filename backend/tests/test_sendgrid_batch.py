@@ -0,0 +1,74 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.send_email_sendgrid import send_email_batch_sendgrid, is_recipient_error
+
+
+class SendGridStub(BaseHTTPRequestHandler):
+    """Answers like the Mail Send API: 503 if a 'down' address is in the batch,
+    400 naming every personalization sent to a 'bad' address, else 202."""
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(payload)
+        recipients = [p["to"][0]["email"] for p in payload["personalizations"]]
+        if any(to.startswith("down") for to in recipients):
+            status, body = 503, {"errors": [{"message": "service unavailable"}]}
+        else:
+            errors = [{"message": "Invalid email", "field": f"personalizations.{i}.to.0.email"}
+                      for i, to in enumerate(recipients) if to.startswith("bad")]
+            status, body = (400, {"errors": errors}) if errors else (202, {})
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def sendgrid(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SendGridStub)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("SENDGRID_API_KEY", "SG.test")
+    monkeypatch.setenv("SENDGRID_FROM_EMAIL", "alerts@example.com")
+    monkeypatch.setenv("SENDGRID_API_URL", f"http://127.0.0.1:{server.server_address[1]}/v3/mail/send")
+    yield server
+    server.shutdown()
+
+
+def _messages(*recipients):
+    return [{"to": to, "subject": "Reminder", "body": f"Hello {to}"} for to in recipients]
+
+
+def test_batch_goes_out_in_one_request(sendgrid):
+    results = send_email_batch_sendgrid(_messages("a@example.com", "b@example.com", "c@example.com"))
+    assert results == [None, None, None]
+    assert len(sendgrid.requests) == 1
+    assert len(sendgrid.requests[0]["personalizations"]) == 3
+
+
+def test_rejected_recipients_fail_alone_and_the_rest_are_resent(sendgrid):
+    results = send_email_batch_sendgrid(_messages("a@example.com", "bad@example.com", "c@example.com"))
+    assert results[0] is None and results[2] is None
+    assert is_recipient_error(results[1])
+    resent = [p["to"][0]["email"] for p in sendgrid.requests[1]["personalizations"]]
+    assert resent == ["a@example.com", "c@example.com"]
+
+
+def test_service_error_fails_the_whole_batch(sendgrid):
+    results = send_email_batch_sendgrid(_messages("a@example.com", "down@example.com"))
+    assert all(r and not is_recipient_error(r) for r in results)
+    assert len(sendgrid.requests) == 1
+
+
+def test_large_batches_are_split_at_the_personalization_limit(sendgrid):
+    results = send_email_batch_sendgrid(_messages(*(f"user{i}@example.com" for i in range(1001))))
+    assert results == [None] * 1001
+    assert [len(r["personalizations"]) for r in sendgrid.requests] == [1000, 1]
@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from backend.models import Outbox
+from backend.reminder_job import check_expiring_subscriptions
+
+TODAY = date.today()
+
+
+def _add_due(client, headers):
+    """A subscription whose 5-day reminder is due today."""
+    response = client.post("/subscription/add", headers=headers, json={
+        "name": "Netflix", "renewal_date": str(TODAY + timedelta(days=5)), "alert_offsets": [5]})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def _queued(db, subscription_id):
+    return db.scalars(select(Outbox.offset).where(Outbox.subscription_id == subscription_id)).all()
+
+
+def test_bulk_delete_removes_queued_alerts_and_a_new_subscription_is_swept(client, db, auth_headers):
+    old_id = _add_due(client, auth_headers)
+    check_expiring_subscriptions(db, today=TODAY)
+    assert _queued(db, old_id) == [5]
+
+    response = client.post("/subscription/bulk-delete", headers=auth_headers, json={"ids": [old_id]})
+    assert response.json()["ids"] == [old_id]
+    assert _queued(db, old_id) == []
+
+    # On SQLite the new subscription usually gets the deleted one's id back
+    new_id = _add_due(client, auth_headers)
+    check_expiring_subscriptions(db, today=TODAY)
+    assert _queued(db, new_id) == [5]
+
+
+def test_delete_all_removes_queued_alerts(client, db, auth_headers):
+    ids = [_add_due(client, auth_headers) for _ in range(2)]
+    check_expiring_subscriptions(db, today=TODAY)
+
+    response = client.delete("/subscription/delete-all", headers=auth_headers)
+    assert response.json()["deleted"] == 2
+    assert all(_queued(db, i) == [] for i in ids)
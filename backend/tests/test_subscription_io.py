@@ -0,0 +1,52 @@
+import io
+import json
+
+import pytest
+
+CSV = (
+    "name,renewal_date,note,start_date\n"
+    "Netflix,2027-03-01,family plan,2024-03-01\n"
+    "Spotify,2027-05-15,,\n"
+)
+
+
+def _import(client, headers, content, filename):
+    response = client.post("/subscription/import", headers=headers,
+                           files={"file": (filename, io.BytesIO(content.encode()))})
+    assert response.status_code == 200
+    return response.json()
+
+
+def _export(client, headers, fmt):
+    response = client.get("/subscription/export", headers=headers, params={"format": fmt})
+    assert response.status_code == 200
+    return response.text
+
+
+def _rows(text, fmt):
+    """Exported records without their ids, which differ between users."""
+    if fmt == "ndjson":
+        records = [json.loads(line) for line in text.splitlines() if line]
+    else:
+        header, *lines = text.splitlines()
+        records = [dict(zip(header.split(","), line.split(","))) for line in lines]
+    return [{k: v for k, v in r.items() if k != "id"} for r in records]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson"])
+def test_export_then_import_round_trips(client, auth_headers, register, fmt):
+    assert _import(client, auth_headers, CSV, "subs.csv")["imported"] == 2
+    exported = _export(client, auth_headers, fmt)
+    assert "2024-03-01" in exported
+
+    # A second user imports the export as is and exports the same rows
+    other = register()
+    summary = _import(client, other, exported, f"subs.{fmt}")
+    assert summary["imported"] == 2 and summary["failed"] == 0
+    assert _rows(_export(client, other, fmt), fmt) == _rows(exported, fmt)
+
+
+def test_import_rejects_invalid_start_date(client, auth_headers):
+    summary = _import(client, auth_headers, "name,renewal_date,start_date\nHulu,2027-01-01,someday\n", "subs.csv")
+    assert summary["imported"] == 0
+    assert summary["errors"][0]["line"] == 2 and "start_date" in summary["errors"][0]["error"]
@@ -0,0 +1,71 @@
+from datetime import date, timedelta
+
+import pytest
+
+START = date(2027, 1, 1)
+
+
+@pytest.fixture
+def listed(client, auth_headers):
+    """Seven subscriptions renewing on consecutive days, added out of order; two share a name."""
+    names = ["Gym", "Netflix", "Adobe", "Spotify", "Cloud", "Netflix", "Bank"]
+    for i in (3, 0, 6, 1, 5, 2, 4):
+        client.post("/subscription/add", headers=auth_headers,
+                    json={"name": names[i], "renewal_date": str(START + timedelta(days=i))})
+    return auth_headers
+
+
+def _pages(client, headers, **params):
+    """Every page of /subscription/list, following X-Next-Cursor."""
+    pages = []
+    cursor = None
+    while True:
+        response = client.get("/subscription/list", headers=headers,
+                              params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+
+
+def test_keyset_pages_cover_every_row_once_in_order(client, listed):
+    pages = _pages(client, listed, limit=3)
+    assert [len(page) for page in pages] == [3, 3, 1]
+    dates = [row["renewal_date"] for page in pages for row in page]
+    assert dates == [str(START + timedelta(days=i)) for i in range(7)]
+
+
+def test_descending_name_pages_break_ties_by_id(client, listed):
+    rows = [row for page in _pages(client, listed, limit=2, sort="-name") for row in page]
+    assert [row["name"] for row in rows] == ["Spotify", "Netflix", "Netflix", "Gym", "Cloud", "Bank", "Adobe"]
+    netflix = [row["id"] for row in rows if row["name"] == "Netflix"]
+    assert netflix == sorted(netflix, reverse=True)
+
+
+def test_filters_apply_to_every_page(client, listed):
+    pages = _pages(client, listed, limit=2, renewal_from=str(START + timedelta(days=2)), name_prefix="N")
+    assert [row["name"] for page in pages for row in page] == ["Netflix"]
+
+
+def test_cursor_from_another_sort_is_rejected(client, listed):
+    cursor = client.get("/subscription/list", headers=listed, params={"limit": 2}).headers["X-Next-Cursor"]
+    response = client.get("/subscription/list", headers=listed, params={"limit": 2, "sort": "name", "cursor": cursor})
+    assert response.status_code == 400
+
+
+def test_unchanged_list_answers_304_until_a_write(client, listed):
+    first = client.get("/subscription/list", headers=listed, params={"limit": 3})
+    etag = first.headers["ETag"]
+    again = client.get("/subscription/list", headers={**listed, "If-None-Match": etag}, params={"limit": 3})
+    assert again.status_code == 304
+    assert again.content == b""
+    # A different page has its own tag
+    other = client.get("/subscription/list", headers={**listed, "If-None-Match": etag}, params={"limit": 2})
+    assert other.status_code == 200
+
+    client.post("/subscription/add", headers=listed, json={"name": "Zoom", "renewal_date": str(START)})
+    changed = client.get("/subscription/list", headers={**listed, "If-None-Match": etag}, params={"limit": 3})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert "Zoom" in [row["name"] for row in changed.json()]
@@ -0,0 +1,37 @@
+from datetime import date, timedelta
+
+RENEWAL = str(date.today() + timedelta(days=40))
+
+
+def _add(client, headers, **fields):
+    response = client.post("/subscription/add", headers=headers,
+                           json={"name": "Netflix", "renewal_date": RENEWAL, **fields})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_update_without_alert_offsets_keeps_them(client, auth_headers):
+    sub = _add(client, auth_headers, alert_offsets=[5, 2])
+    response = client.put(f"/subscription/update/{sub['id']}", headers=auth_headers,
+                          json={"name": "Netflix HD", "renewal_date": RENEWAL})
+    assert response.status_code == 200
+    assert response.json()["name"] == "Netflix HD"
+    assert response.json()["alert_offsets"] == [5, 2]
+
+
+def test_update_with_null_alert_offsets_resets_them(client, auth_headers):
+    sub = _add(client, auth_headers, alert_offsets=[5, 2])
+    response = client.put(f"/subscription/update/{sub['id']}", headers=auth_headers,
+                          json={"name": "Netflix", "renewal_date": RENEWAL, "alert_offsets": None})
+    assert response.json()["alert_offsets"] is None
+
+
+def test_bulk_update_keeps_offsets_only_where_left_out(client, auth_headers):
+    kept = _add(client, auth_headers, alert_offsets=[7])
+    changed = _add(client, auth_headers, alert_offsets=[7])
+    response = client.put("/subscription/bulk-update", headers=auth_headers, json=[
+        {"id": kept["id"], "name": "Kept", "renewal_date": RENEWAL},
+        {"id": changed["id"], "name": "Changed", "renewal_date": RENEWAL, "alert_offsets": [3]},
+    ])
+    assert response.status_code == 200
+    assert {s["name"]: s["alert_offsets"] for s in response.json()} == {"Kept": [7], "Changed": [3]}
@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+
+from sqlalchemy import func, select
+
+from backend import reminder_job
+from backend.models import Outbox, SweepCheckpoint, SweepWatermark
+
+DAY = date.today() + timedelta(days=1)
+
+
+def _add_due(client, headers, count):
+    """Subscriptions whose 5-day reminder is due on DAY."""
+    renewal = str(DAY + timedelta(days=5))
+    return [client.post("/subscription/add", headers=headers,
+                        json={"name": f"Sub {i}", "renewal_date": renewal, "alert_offsets": [5]}).json()["id"]
+            for i in range(count)]
+
+
+def test_sweep_resumes_after_the_last_committed_chunk(client, db, auth_headers, monkeypatch):
+    # Anything other tests left due is swept first, so only this test's subscriptions are due below
+    reminder_job.check_expiring_subscriptions(db, today=DAY)
+    ids = _add_due(client, auth_headers, 5)
+    monkeypatch.setenv("SWEEP_BATCH_SIZE", "2")
+
+    find_due_alerts = reminder_job.find_due_alerts
+    chunks = []
+
+    def crash_on_second_chunk(db, today, shard=None, shards=1, subscription_ids=None):
+        chunks.append(subscription_ids)
+        if len(chunks) == 2:
+            raise RuntimeError("worker killed")
+        return find_due_alerts(db, today, shard, shards, subscription_ids)
+
+    monkeypatch.setattr(reminder_job, "find_due_alerts", crash_on_second_chunk)
+    crashed = reminder_job.check_expiring_subscriptions(db, today=DAY)
+    assert crashed["enqueued"] == 2 and "error" in crashed
+    checkpoint = db.get(SweepCheckpoint, "sweep:0/1")
+    assert (checkpoint.day, checkpoint.last_subscription_id) == (DAY, ids[1])
+
+    monkeypatch.setattr(reminder_job, "find_due_alerts", find_due_alerts)
+    resumed = reminder_job.check_expiring_subscriptions(db, today=DAY)
+    assert (resumed["due"], resumed["enqueued"]) == (3, 3)
+
+    per_subscription = dict(db.execute(select(Outbox.subscription_id, func.count())
+                                       .where(Outbox.subscription_id.in_(ids)).group_by(Outbox.subscription_id)).all())
+    assert per_subscription == {i: 1 for i in ids}
+    db.expire_all()
+    assert db.get(SweepCheckpoint, "sweep:0/1") is None
+    assert db.get(SweepWatermark, "sweep:0/1").day >= DAY
+
+
+def test_checkpoint_from_another_day_is_ignored(db):
+    db.merge(SweepCheckpoint(name="sweep:0/1", day=DAY - timedelta(days=1), last_alert_at=DAY,
+                             last_subscription_id=10**9))
+    db.commit()
+    assert reminder_job._resume_point(db, "sweep:0/1", DAY) is None
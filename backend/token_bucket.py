@@ -0,0 +1,103 @@
+"""
+Token buckets used to hold outbound sends to a messages-per-minute budget.
+
+TokenBucket keeps its tokens in memory (one process); SharedTokenBucket keeps
+them in the rate_limits table, so every process draining the outbox spends
+from the same budget.
+"""
+import threading
+import time
+
+from sqlalchemy import case, select, update
+from sqlalchemy.exc import IntegrityError
+
+from .models import RateLimit
+
+
+class TokenBucket:
+    """`rate` tokens per second, at most `capacity` banked (the largest burst).
+
+    take(n) blocks until the tokens are there. Asking for more than `capacity`
+    waits for a full bucket and leaves the rest as debt, which later callers
+    pay off by waiting longer, so the long-run rate never exceeds `rate`.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = max(1, int(capacity))
+        self._tokens = float(self.capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _try_take(self, need, n):
+        """Spend `n` tokens if `need` are there; returns None, or the seconds until they will be."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= need:
+                self._tokens -= n
+                return None
+            return (need - self._tokens) / self.rate
+
+    def take(self, n=1):
+        """Spend `n` tokens; returns the seconds spent waiting for them."""
+        waited = 0.0
+        need = min(n, self.capacity)
+        while True:
+            delay = self._try_take(need, n)
+            if delay is None:
+                return waited
+            self._sleep(delay)
+            waited += delay
+
+
+class SharedTokenBucket(TokenBucket):
+    """A TokenBucket whose tokens live in the rate_limits row `name`.
+
+    Refilling and spending is one conditional UPDATE, so processes on any
+    number of hosts together stay within `rate`. Uses wall-clock time, which
+    the hosts are assumed to agree on.
+    """
+
+    def __init__(self, session_factory, name, rate, capacity, clock=time.time, sleep=time.sleep):
+        super().__init__(rate, capacity, clock=clock, sleep=sleep)
+        self.session_factory = session_factory
+        self.name = name
+
+    def _ensure_row(self, db):
+        if db.get(RateLimit, self.name) is not None:
+            return
+        try:
+            db.add(RateLimit(name=self.name, tokens=float(self.capacity), updated_at=self._clock()))
+            db.commit()
+        except IntegrityError:
+            # another process created it first
+            db.rollback()
+
+    def _try_take(self, need, n):
+        now = self._clock()
+        # A clock behind the stored one refills nothing rather than draining the bucket
+        elapsed = case((RateLimit.updated_at < now, now - RateLimit.updated_at), else_=0.0)
+        refilled = RateLimit.tokens + elapsed * self.rate
+        tokens = case((refilled > self.capacity, float(self.capacity)), else_=refilled)
+        db = self.session_factory()
+        try:
+            self._ensure_row(db)
+            result = db.execute(
+                update(RateLimit).where(RateLimit.name == self.name, tokens >= need)
+                .values(tokens=tokens - n,
+                        updated_at=case((RateLimit.updated_at < now, now), else_=RateLimit.updated_at))
+            )
+            db.commit()
+            if result.rowcount == 1:
+                return None
+            available = db.scalar(select(tokens).where(RateLimit.name == self.name))
+        finally:
+            db.close()
+        return max(0.01, (need - available) / self.rate)
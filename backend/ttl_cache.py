@@ -0,0 +1,66 @@
+"""
+Small thread-safe LRU cache whose entries also expire after a TTL.
+
+Used for in-process caches (verified tokens, user principals) where a bounded
+size matters more than sharing between processes.
+"""
+from collections import OrderedDict
+import threading
+import time
+
+
+class TTLCache:
+    """At most `maxsize` entries, each kept for `ttl` seconds (or until its own expiry if sooner).
+
+    A `maxsize` of 0 disables the cache: every get is a miss and set is a no-op.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = max(0, int(maxsize))
+        self.ttl = max(0, ttl)
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, expires_at=None):
+        """Store `value`; `expires_at` (unix time) shortens the TTL, e.g. to a token's exp."""
+        if not self.maxsize:
+            return
+        deadline = time.time() + self.ttl
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        with self._lock:
+            self._data[key] = (deadline, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def stats(self):
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}